@@ -1,7 +1,6 @@
 import streamlit as st
-from google.oauth2 import service_account
 
-from data import get_service_account_info, get_bad_debt_inputs_data, get_collections_curve_data, get_evictions_data
+from data import get_warehouse, get_bad_debt_inputs_data, get_collections_curve_data, get_evictions_data
 from tabs.data_tab import data_filters, late_collections_over_ar, ar_over_gpr
 from tabs.ontime_collections_tab import ontime_collections_curve_filters, ontime_collections_curve, ontime_collections_drilldown
 from tabs.late_collections_tab import late_collections_curve_filters, late_collections_curve, late_collections_drilldown
@@ -26,32 +25,42 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Data Retrieval
-credentials = service_account.Credentials.from_service_account_info(get_service_account_info())
-bad_debt_inputs_data = get_bad_debt_inputs_data(credentials)
-collections_curve_data = get_collections_curve_data(credentials)
-evictions_data = get_evictions_data(credentials)
+# Data Retrieval, started together in the background; only the selected view waits, for just the datasets it shows
+warehouse = get_warehouse()
+for get_dataset in [get_collections_curve_data, get_bad_debt_inputs_data, get_evictions_data]:
+    get_dataset.prefetch(warehouse)
 
 # Application
 st.title("Collections Dashboard")
-ontime_collections_tab, late_collections_tab, bad_debt_tab, evictions_tab, data_tab = st.tabs(["On-Time Collections", "Late Collections", "Bad Debt", "Evictions", "Data"])
-with ontime_collections_tab:
-    ontime_collections_selected_fund = ontime_collections_curve_filters(collections_curve_data)
-    ontime_collections_curve(collections_curve_data, ontime_collections_selected_fund)
-    ontime_collections_drilldown(bad_debt_inputs_data, ontime_collections_selected_fund)
-with late_collections_tab:
-    late_collections_selected_fund = late_collections_curve_filters(collections_curve_data)
-    late_collections_curve(collections_curve_data, late_collections_selected_fund)
-    late_collections_drilldown(bad_debt_inputs_data, late_collections_selected_fund)
-with bad_debt_tab:
-    bad_debt_selected_fund = bad_debt_over_time_filters(bad_debt_inputs_data)
-    bad_debt_over_time(bad_debt_inputs_data, bad_debt_selected_fund)
-    bad_debt_projection(bad_debt_inputs_data, bad_debt_selected_fund)
-with evictions_tab:
-    evictions(evictions_data)
-with data_tab:
-    filtered_bad_debt_inputs, selected_month_year = data_filters(bad_debt_inputs_data)
-    late_collections_over_ar(filtered_bad_debt_inputs, selected_month_year)
-    ar_over_gpr(filtered_bad_debt_inputs, selected_month_year)
-
-
+# Streamlit runs the body of every st.tabs tab on each rerun, so views are picked here and only the selected one runs
+selected_view = st.radio(
+    "View",
+    ["On-Time Collections", "Late Collections", "Bad Debt", "Evictions", "Data"],
+    horizontal=True,
+    label_visibility="collapsed",
+    key="collections_view"
+)
+if selected_view == "On-Time Collections":
+    collections_curve_data, collections_curve_partitions, collections_curves, collections_curve_specs = get_collections_curve_data(warehouse)
+    ontime_collections_selected_fund = ontime_collections_curve_filters(collections_curve_data, collections_curve_partitions)
+    ontime_collections_curve(collections_curves, collections_curve_specs, ontime_collections_selected_fund)
+    bad_debt_cube, bad_debt_partitions, bad_debt_projections, bad_debt_scenarios = get_bad_debt_inputs_data(warehouse)
+    ontime_collections_drilldown(bad_debt_partitions, ontime_collections_selected_fund)
+elif selected_view == "Late Collections":
+    collections_curve_data, collections_curve_partitions, collections_curves, collections_curve_specs = get_collections_curve_data(warehouse)
+    late_collections_selected_fund = late_collections_curve_filters(collections_curve_data, collections_curve_partitions)
+    late_collections_curve(collections_curves, collections_curve_specs, late_collections_selected_fund)
+    bad_debt_cube, bad_debt_partitions, bad_debt_projections, bad_debt_scenarios = get_bad_debt_inputs_data(warehouse)
+    late_collections_drilldown(bad_debt_partitions, late_collections_selected_fund)
+elif selected_view == "Bad Debt":
+    bad_debt_cube, bad_debt_partitions, bad_debt_projections, bad_debt_scenarios = get_bad_debt_inputs_data(warehouse)
+    bad_debt_selected_fund = bad_debt_over_time_filters(bad_debt_cube)
+    bad_debt_over_time(bad_debt_cube, bad_debt_selected_fund)
+    bad_debt_projection(bad_debt_projections, bad_debt_scenarios, bad_debt_selected_fund)
+elif selected_view == "Evictions":
+    evictions(*get_evictions_data(warehouse))
+elif selected_view == "Data":
+    bad_debt_cube, bad_debt_partitions, bad_debt_projections, bad_debt_scenarios = get_bad_debt_inputs_data(warehouse)
+    filtered_bad_debt_cube, month_bad_debt_inputs = data_filters(bad_debt_cube, bad_debt_partitions)
+    late_collections_over_ar(filtered_bad_debt_cube, month_bad_debt_inputs)
+    ar_over_gpr(filtered_bad_debt_cube, month_bad_debt_inputs)
@@ -0,0 +1,141 @@
+import altair as alt
+
+
+def chart_spec(chart):
+    """ Vega-Lite spec of an Altair chart, converted without Altair's default theme like st.altair_chart does,
+    so it can be kept and drawn again with st.vega_lite_chart """
+    with alt.theme.enable('none'):
+        return chart.to_dict()
+
+# Color and dash mapping
+color_scale = alt.Scale(domain=[
+    'Last Month',
+    'Last 3 Months',
+    'Last 12 Months',
+    'This Month Succeeded',
+    'This Month Succeeded + Processing'
+], range=[
+    '#d1c4e9',  # soft lavender (Last Month)
+    '#9575cd',  # light-medium purple (Last 3 Months)
+    '#512da8',  # deep purple (Last 12 Months)
+    '#15b8a6',  # teal (This Month Succeeded)
+    '#15b8a6'   # teal (This Month Succeeded + Processing, dotted)
+])
+
+dash_scale = alt.Scale(domain=[
+    'Last Month',
+    'Last 3 Months',
+    'Last 12 Months',
+    'This Month Succeeded',
+    'This Month Succeeded + Processing'
+], range=[
+    [1,0],      # solid
+    [1,0],      # solid
+    [1,0],      # solid
+    [1,0],      # solid
+    [4,4]       # dotted
+])
+
+
+def ontime_collections_curve_spec(chart_df, day_of_month):
+    chart_df = chart_df[(
+        ((chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing'])) & (chart_df['day_of_month'] <= day_of_month)) |
+        (~chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing']))
+    )]
+
+    chart = alt.Chart(chart_df).mark_line().encode(
+        x=alt.X('day_of_month:O', title='Day of Month'),
+        y=alt.Y(
+            'ratio:Q',
+            title='Collections Rate',
+            axis=alt.Axis(format='%'),
+            scale=alt.Scale(domain=[0.5, 1])
+        ),
+        color=alt.Color(
+            'curve:N',
+            title='Curve',
+            scale=color_scale,
+            legend=alt.Legend(orient='bottom-right', labelLimit=210)
+        ),
+        strokeDash=alt.StrokeDash('curve:N', scale=dash_scale),
+        tooltip=[
+            'day_of_month', 
+            'curve', 
+            alt.Tooltip('ratio:Q', format='.2%')
+        ]
+    ).properties(
+        width='container',
+        height=400
+    ).interactive()
+
+    # Add points only for "This Month Succeeded" and "This Month Succeeded + Processing"
+    point_chart = alt.Chart(chart_df[chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing'])]).mark_point(
+        filled=True,
+        size=60
+    ).encode(
+        x=alt.X('day_of_month:O'),
+        y=alt.Y('ratio:Q'),
+        color=alt.Color('curve:N', scale=color_scale, legend=None),
+        tooltip=[
+            'day_of_month', 
+            'curve', 
+            alt.Tooltip('ratio:Q', format='.2%'),
+            alt.Tooltip('rent_paid_ontime_this_month:Q', format='$,.0f', title='Rent Paid On Time'),
+            alt.Tooltip('rent_succeeded_ontime_this_month:Q', format='$,.0f', title='Rent Succeeded On Time'),
+            alt.Tooltip('rent_processing_ontime_this_month:Q', format='$,.0f', title='Rent Processing On Time')
+        ]
+    )
+    return chart_spec(chart + point_chart)
+
+
+def late_collections_curve_spec(chart_df, day_of_month):
+    chart_df = chart_df[(
+        ((chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing'])) & (chart_df['day_of_month'] <= day_of_month)) |
+        (~chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing']))
+    )]
+
+    chart = alt.Chart(chart_df).mark_line().encode(
+        x=alt.X('day_of_month:O', title='Day of Month'),
+        y=alt.Y(
+            'ratio:Q',
+            title='Collections Rate',
+            axis=alt.Axis(format='%')
+        ),
+        color=alt.Color(
+            'curve:N',
+            title='Curve',
+            scale=color_scale,
+            legend=alt.Legend(orient='bottom-right', labelLimit=210)
+        ),
+        strokeDash=alt.StrokeDash('curve:N', scale=dash_scale),
+        tooltip=['day_of_month', 'curve', alt.Tooltip('ratio:Q', format='.2%')]
+    ).properties(
+        width='container'
+    ).interactive()
+
+    # Add points only for "This Month (Succeeded)" and "This Month (Succeeded + Processing)"
+    point_chart = alt.Chart(chart_df[chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing'])]).mark_point(
+        filled=True,
+        size=60
+    ).encode(
+        x=alt.X('day_of_month:O'),
+        y=alt.Y('ratio:Q'),
+        color=alt.Color('curve:N', scale=color_scale, legend=None),
+        tooltip=[
+            'day_of_month', 
+            'curve', 
+            alt.Tooltip('ratio:Q', format='.2%'),
+            alt.Tooltip('rent_paid_late_this_month:Q', format='$,.0f', title='Rent Paid Late'),
+            alt.Tooltip('rent_succeeded_late_this_month:Q', format='$,.0f', title='Rent Succeeded Late'), 
+            alt.Tooltip('rent_processing_late_this_month:Q', format='$,.0f', title='Rent Processing Late')
+        ]
+    )
+    
+    return chart_spec(chart + point_chart)
+
+
+# Spec builder for each chart in COLLECTIONS_CURVES
+COLLECTIONS_CURVE_SPECS = {
+    'ontime': ontime_collections_curve_spec,
+    'late': late_collections_curve_spec,
+}
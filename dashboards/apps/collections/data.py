@@ -1,6 +1,82 @@
 import json
+import os
+from datetime import datetime, timedelta
 import streamlit as st
+import numpy as np
 import pandas as pd
+from google.oauth2 import service_account
+
+from charts import COLLECTIONS_CURVE_SPECS
+from datasets import dataset
+from partitions import PartitionIndex
+from projections import BadDebtProjection, scenario_curves
+from warehouse import BigQueryWarehouse, DuckDBWarehouse
+
+# The bad debt cube sums bad_debt_inputs by these columns, which are all the charts and metrics filter on
+BAD_DEBT_CUBE_DIMENSIONS = ['fund', 'month', 'rental_status', 'was_evicted']
+# Row-level measures summed into the bad debt cube as they are
+BAD_DEBT_CUBE_MEASURES = [
+    'bom_rent_balance',
+    'gpr_this_month',
+    'rent_charged',
+    'ontime_rent_collections_succeeded',
+    'ontime_rent_collections_processing',
+    'late_rent_collections_succeeded',
+    'late_rent_collections_processing',
+    'unpaid_rent_this_month',
+    'unpaid_rent_covered_by_wallet',
+    'bom_bad_debt_recovered_by_late_collections',
+    'bom_bad_debt_rent',
+]
+
+# Lines on each collections curve chart, from rate column to label
+COLLECTIONS_CURVES = {
+    'ontime': {
+        'ontime_collections_rate_succeeded_this_month': 'This Month Succeeded',
+        'ontime_collections_rate_this_month': 'This Month Succeeded + Processing',
+        'ontime_collections_rate_last_month': 'Last Month',
+        'ontime_collections_rate_l3m': 'Last 3 Months',
+        'ontime_collections_rate_l12m': 'Last 12 Months'
+    },
+    'late': {
+        'late_collections_rate_succeeded_this_month': 'This Month Succeeded',
+        'late_collections_rate_this_month': 'This Month Succeeded + Processing',
+        'late_collections_rate_last_month': 'Last Month',
+        'late_collections_rate_l3m': 'Last 3 Months',
+        'late_collections_rate_l12m': 'Last 12 Months'
+    },
+}
+# Amounts kept with each day's curve points for the chart tooltips
+COLLECTIONS_CURVE_AMOUNTS = {
+    'ontime': ['rent_charged_this_month', 'rent_paid_ontime_this_month', 'rent_succeeded_ontime_this_month', 'rent_processing_ontime_this_month'],
+    'late': ['rent_paid_late_this_month', 'rent_succeeded_late_this_month', 'rent_processing_late_this_month'],
+}
+
+# Columns of the evictions tables and their display names, in order
+EVICTION_COLUMNS = {
+    'rental_link': 'rental_link',
+    'address': 'Address',
+    'fund': 'Fund',
+    'status': 'Status',
+    'created_at': 'Created At',
+    'updated_at': 'Updated At',
+    'canceled_at': 'Canceled At',
+    'canceled_by_admin_name': 'Canceled By',
+    'cancelation_reason': 'Cancelation Reason',
+    'completed_at': 'Completed At',
+    'completed_by_admin_name': 'Completed By',
+    'file_sent_to_attorney_at': 'Sent to Attorney At',
+    'file_sent_to_attorney_by_admin_name': 'Sent to Attorney By',
+    'filed_at': 'Filed At',
+    'filed_by_admin_name': 'Filed By',
+    'court_date': 'Court Date',
+    'writ_date': 'Writ Date',
+    'projected_possession_date': 'Projected Possession Date',
+    'set_out_date': 'Set Out Date',
+    'notes': 'Notes'
+}
+# Marker shown with each eviction status, in place of coloring the status text
+EVICTION_STATUS_MARKERS = {'pending': '🟠', 'completed': '🔴', 'canceled': '⚪'}
 
 
 def get_service_account_info(local=False):
@@ -12,33 +88,113 @@ def get_service_account_info(local=False):
     return service_account_info
 
 
-@st.cache_data
-def get_bad_debt_inputs_data(_credentials):
+@st.cache_resource
+def get_warehouse(local=False):
+    if os.environ.get('WAREHOUSE') == 'duckdb':
+        return DuckDBWarehouse(os.environ.get('DUCKDB_PATH', 'local.duckdb'), read_only=True)
+    credentials = service_account.Credentials.from_service_account_info(get_service_account_info(local))
+    return BigQueryWarehouse(project=credentials.project_id, credentials=credentials)
+
+
+@dataset(ttl=timedelta(hours=6))
+def get_bad_debt_inputs_data(_warehouse):
     bad_debt_inputs_query = """
         SELECT * 
         FROM `homevest-data.dbt_prod_tin.bad_debt_inputs` 
-        WHERE month >= DATE_SUB(LAST_DAY(CURRENT_DATE(), MONTH), INTERVAL 11 MONTH) 
-        AND month <= LAST_DAY(CURRENT_DATE(), MONTH)
+        WHERE month >= @start_month
+        AND month <= @end_month
     """
-    bad_debt_inputs = pd.read_gbq(bad_debt_inputs_query, credentials=_credentials)
+    # Last 12 months, same bounds as LAST_DAY(CURRENT_DATE(), MONTH) and 11 months before it
+    end_month = pd.Timestamp.today().normalize() + pd.offsets.MonthEnd(0)
+    start_month = end_month - pd.DateOffset(months=11)
+    bad_debt_inputs = _warehouse.query_df(bad_debt_inputs_query, {
+        'start_month': start_month.date(),
+        'end_month': end_month.date()
+    }, cache=True)
     # Convert month to first of the month for charting purposes
     bad_debt_inputs['month'] = pd.to_datetime(bad_debt_inputs['month']).dt.to_period('M').dt.to_timestamp()
     bad_debt_inputs['display_month'] = bad_debt_inputs['month'].dt.strftime('%B %Y')
-    return bad_debt_inputs
+    bad_debt_inputs['hudson_link'] = "https://hudson.upandup.co/rent-roll/" + bad_debt_inputs['rental_id'].astype(str)
+    bad_debt_inputs['buildium_link'] = "https://upandup.managebuilding.com/manager/app/rentroll/" + bad_debt_inputs['buildium_lease_id'].astype(str) + "/financials/ledger?isByAccountView=0&isByDateView=1"
+    # Drilldowns look up a month's rentals, for all funds or one
+    bad_debt_partitions = PartitionIndex(bad_debt_inputs, ['display_month', 'fund'])
+    # The projection's inputs for each fund and month, so moving its sliders never touches rows
+    bad_debt_projections = {
+        key: BadDebtProjection(bad_debt_fund_inputs)
+        for key, bad_debt_fund_inputs in bad_debt_inputs.groupby(['display_month', 'fund'], sort=False)
+    }
+    # OCR and LCR scenarios of every fund for the latest month, the one the projection covers
+    latest_months = set(bad_debt_inputs.loc[bad_debt_inputs['month'] == bad_debt_inputs['month'].max(), 'display_month'])
+    bad_debt_scenarios = scenario_curves({
+        key: projection for key, projection in bad_debt_projections.items() if key[0] in latest_months
+    })
+    return get_bad_debt_cube(bad_debt_inputs), bad_debt_partitions, bad_debt_projections, bad_debt_scenarios
 
 
-@st.cache_data
-def get_collections_curve_data(_credentials):
+def get_bad_debt_cube(bad_debt_inputs):
+    """ Measures of bad_debt_inputs summed by fund, month, rental status and eviction, built once per load so
+    charts and metrics never regroup the row-level data """
+    bom_rent_balance = bad_debt_inputs['bom_rent_balance']
+    in_ar = bom_rent_balance > 0
+    cube_inputs = bad_debt_inputs[BAD_DEBT_CUBE_DIMENSIONS + BAD_DEBT_CUBE_MEASURES].assign(
+        # Bad debt is floored at zero per rental, so it's summed from row-level values
+        bad_debt=np.maximum(
+            bad_debt_inputs['unpaid_rent_this_month']
+            - bad_debt_inputs['unpaid_rent_covered_by_wallet']
+            - bad_debt_inputs['bom_bad_debt_recovered_by_late_collections'], 0
+        ),
+        # Late collections over AR only counts rentals with a positive BOM balance, AR over GPR a non-negative one
+        ar_rentals=in_ar.astype(int),
+        ar_bom_rent_balance=bom_rent_balance.where(in_ar, 0),
+        ar_late_rent_collections=(
+            bad_debt_inputs['late_rent_collections_succeeded'] + bad_debt_inputs['late_rent_collections_processing']
+        ).where(in_ar, 0),
+        non_negative_ar_rentals=(bom_rent_balance >= 0).astype(int),
+        non_negative_ar_gpr_this_month=bad_debt_inputs['gpr_this_month'].where(bom_rent_balance >= 0, 0),
+    )
+    bad_debt_cube = cube_inputs.groupby(BAD_DEBT_CUBE_DIMENSIONS, dropna=False, sort=True).sum().reset_index()
+    bad_debt_cube['display_month'] = bad_debt_cube['month'].dt.strftime('%B %Y')
+    return bad_debt_cube
+
+
+@dataset(ttl=timedelta(hours=6))
+def get_collections_curve_data(_warehouse):
     collections_curve_query = """
         SELECT * 
         FROM `homevest-data.dbt_prod_tin.rent_collections_curve`
     """
-    collections_curve_data = pd.read_gbq(collections_curve_query, credentials=_credentials)
-    return collections_curve_data
+    collections_curve_data = _warehouse.query_df(collections_curve_query, cache=True)
+    # Metrics read a fund's row for today
+    collections_curve_partitions = PartitionIndex(collections_curve_data, ['fund', 'day_of_month'])
+    # Each chart's curves per fund in long format, and the chart specs drawn from them for today, keyed by
+    # (chart, fund, day of month) so they are built once here and only read by the curve tabs
+    collections_curves = get_collections_curves(collections_curve_data)
+    day_of_month = datetime.today().day
+    collections_curve_specs = {
+        (chart, fund, day_of_month): COLLECTIONS_CURVE_SPECS[chart](chart_df, day_of_month)
+        for (chart, fund), chart_df in collections_curves.items()
+    }
+    return collections_curve_data, collections_curve_partitions, collections_curves, collections_curve_specs
+
 
+def get_collections_curves(collections_curve_data):
+    """ Each chart's curves for each fund, keyed by (chart, fund), with one row per day and curve """
+    collections_curves = {}
+    for chart, curves in COLLECTIONS_CURVES.items():
+        for fund, fund_curve_data in collections_curve_data.groupby('fund', sort=False):
+            chart_df = fund_curve_data.melt(
+                id_vars=['day_of_month'] + COLLECTIONS_CURVE_AMOUNTS[chart],
+                value_vars=list(curves),
+                var_name='curve',
+                value_name='ratio'
+            )
+            chart_df['curve'] = chart_df['curve'].map(curves)
+            collections_curves[(chart, fund)] = chart_df
+    return collections_curves
 
-@st.cache_data
-def get_evictions_data(_credentials):
+
+@dataset(ttl=timedelta(hours=1))
+def get_evictions_data(_warehouse):
     evictions_query = """
         WITH 
         evictions AS (
@@ -94,5 +250,16 @@ def get_evictions_data(_credentials):
             ON ev.id = an.eviction_id
         WHERE address IS NOT NULL
     """
-    evictions_data = pd.read_gbq(evictions_query, credentials=_credentials)
-    return evictions_data
+    evictions_data = _warehouse.query_df(evictions_query, cache=True)
+    return evictions_data, get_eviction_tables(evictions_data)
+
+
+def get_eviction_tables(evictions_data):
+    """ Evictions formatted for the evictions tables, most recently updated first, looked up by status and fund """
+    evictions_data = evictions_data.sort_values(by='updated_at', ascending=False, kind='stable')
+    evictions_data['rental_link'] = "https://hudson.upandup.co/rent-roll/" + evictions_data['rental_id'].astype(str)
+    eviction_tables = evictions_data[list(EVICTION_COLUMNS)].rename(columns=EVICTION_COLUMNS)
+    eviction_tables['Status'] = evictions_data['status'].map(EVICTION_STATUS_MARKERS).fillna('') + ' ' + evictions_data['status']
+    # Unformatted status to look tables up by; the tab hides it
+    eviction_tables['status'] = evictions_data['status']
+    return PartitionIndex(eviction_tables, ['status', 'Fund'])
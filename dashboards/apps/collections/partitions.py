@@ -0,0 +1,23 @@
+import numpy as np
+
+
+class PartitionIndex:
+    """ Row positions of a frame per distinct value of its key columns, and of each leading subset of them,
+    so looking up a partition only reads its own rows """
+
+    def __init__(self, df, by):
+        self.df = df
+        self.by = list(by)
+        # One level per leading subset of by, keyed by tuples of that many values; positions keep frame order
+        self.levels = [
+            {
+                key if isinstance(key, tuple) else (key,): positions
+                for key, positions in df.groupby(self.by[:length], dropna=False, sort=False).indices.items()
+            }
+            for length in range(1, len(self.by) + 1)
+        ]
+
+    def get(self, *key):
+        """ Rows whose leading key columns equal key, in frame order; empty if there are none """
+        positions = self.levels[len(key) - 1].get(key, np.array([], dtype=np.intp))
+        return self.df.iloc[positions]
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+# OCR and LCR targets, in percent, the scenario curves are evaluated at
+SCENARIO_PERCENTS = np.arange(0, 101)
+# Simulated months per Monte Carlo projection; the seed keeps bands steady across reruns
+MONTE_CARLO_DRAWS = 2000
+MONTE_CARLO_SEED = 0
+# Simulated months drawn at a time, bounding the months by rentals matrix of draws
+MONTE_CARLO_CHUNK_DRAWS = 250
+# Percentiles of the simulated months shown as a projection's range
+RANGE_PERCENTILES = [10, 50, 90]
+
+
+class BadDebtProjection:
+    """ A fund's rentals for a month reduced to the arrays the bad debt projection reads, so each OCR or LCR
+    target is a few array operations """
+
+    def __init__(self, bad_debt_fund_inputs):
+        ontime_rent_collections = (
+            bad_debt_fund_inputs['ontime_rent_collections_succeeded'] + bad_debt_fund_inputs['ontime_rent_collections_processing']
+        )
+        late_rent_collections = (
+            bad_debt_fund_inputs['late_rent_collections_succeeded'] + bad_debt_fund_inputs['late_rent_collections_processing']
+        )
+        self.rent_charged = bad_debt_fund_inputs['rent_charged'].sum()
+        bom_rent_balance = bad_debt_fund_inputs['bom_rent_balance'].sum()
+        self.today_ocr = ontime_rent_collections.sum() / self.rent_charged
+        self.today_lcr = 0 if bom_rent_balance == 0 else late_rent_collections.sum() / bom_rent_balance
+
+        # Rentals that haven't paid this month's rent in full on time
+        unpaid = (ontime_rent_collections < bad_debt_fund_inputs['rent_charged']).to_numpy()
+        self.amount_unpaid = _values(bad_debt_fund_inputs['rent_charged'] - ontime_rent_collections)[unpaid]
+        self.usable_wallet = _values(bad_debt_fund_inputs['bom_usable_wallet_or_deposit'])[unpaid]
+
+        # Rentals that started the month owing rent
+        late = (bad_debt_fund_inputs['bom_rent_balance'] > 0).to_numpy()
+        self.remaining_bom_balance = _values(bad_debt_fund_inputs['bom_rent_balance'] - late_rent_collections)[late]
+        self.bom_bad_debt_rent = _values(bad_debt_fund_inputs['bom_bad_debt_rent'])[late]
+
+    def new_bad_debt(self, expected_ocr):
+        """ Unpaid rent left once on-time collections reach expected_ocr, less each rental's usable wallet """
+        return _running_total(self.new_bad_debts(expected_ocr))
+
+    def recovered_bad_debt(self, expected_lcr):
+        """ Bad debt recovered once late collections reach expected_lcr, up to each rental's BOM bad debt """
+        return _running_total(self.recovered_bad_debts(expected_lcr))
+
+    def new_bad_debts(self, expected_ocr):
+        """ Each unpaid rental's part of new_bad_debt """
+        # today_ocr is 1 when every rental paid on time, leaving no unpaid rentals to project
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected_collections_pct = (expected_ocr - self.today_ocr) / (1 - self.today_ocr)
+        increases = self.amount_unpaid * (1 - expected_collections_pct) - self.usable_wallet
+        return np.where(increases > 0, increases, 0)
+
+    def recovered_bad_debts(self, expected_lcr):
+        """ Each late rental's part of recovered_bad_debt """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected_collections_pct = (expected_lcr - self.today_lcr) / (1 - self.today_lcr)
+        expected_late_collections = self.remaining_bom_balance * expected_collections_pct
+        return np.where(expected_late_collections < self.bom_bad_debt_rent, expected_late_collections, self.bom_bad_debt_rent)
+
+    def simulate(self, expected_ocrs, expected_lcr, draws=MONTE_CARLO_DRAWS, seed=MONTE_CARLO_SEED):
+        """ Net projected bad debt, as a percent of rent charged, of each simulated month (rows) at each OCR target
+        (columns). Each unpaid rental misses its rent or not, and each late rental pays off its balance or not, with
+        the chances the targets leave; one that does adds its new_bad_debts or recovered_bad_debts part over that
+        chance, so on average the simulated months come to the point projection """
+        # Separate streams for unpaid and late rentals, so the months don't depend on how many are drawn at a time
+        unpaid_rng, late_rng = (np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(2))
+        expected_ocrs = np.atleast_1d(np.asarray(expected_ocrs, dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            miss_chances = 1 - (expected_ocrs - self.today_ocr) / (1 - self.today_ocr)
+            recovery_chance = (expected_lcr - self.today_lcr) / (1 - self.today_lcr)
+            miss_chances, new_costs = zip(*(
+                _outcome(miss_chance, self.new_bad_debts(expected_ocr))
+                for miss_chance, expected_ocr in zip(miss_chances, expected_ocrs)
+            ))
+            recovery_chance, recoveries = _outcome(recovery_chance, self.recovered_bad_debts(expected_lcr))
+
+        # Each rental draws once per month and every target reads the same draws, so the months are comparable
+        # across targets; a rental misses at every target whose miss chance is above its draw
+        net_bad_debt = np.empty((draws, len(expected_ocrs)))
+        for start in range(0, draws, MONTE_CARLO_CHUNK_DRAWS):
+            chunk = min(MONTE_CARLO_CHUNK_DRAWS, draws - start)
+            unpaid_draws = unpaid_rng.random((chunk, len(self.amount_unpaid)))
+            recovered_bad_debt = (late_rng.random((chunk, len(recoveries))) < recovery_chance) @ recoveries
+            for position, (miss_chance, new_cost) in enumerate(zip(miss_chances, new_costs)):
+                net_bad_debt[start:start + chunk, position] = (unpaid_draws < miss_chance) @ new_cost - recovered_bad_debt
+        return net_bad_debt * 100 / self.rent_charged
+
+    def simulated_range(self, expected_ocrs, expected_lcr, percentiles=RANGE_PERCENTILES):
+        """ Each OCR target with percentiles of its simulated net bad debt, as p10, p50, ... columns """
+        expected_ocrs = np.atleast_1d(np.asarray(expected_ocrs, dtype=float))
+        range_df = pd.DataFrame({'expected_ocr': expected_ocrs})
+        for percentile, values in zip(percentiles, np.percentile(self.simulate(expected_ocrs, expected_lcr), percentiles, axis=0)):
+            range_df[f'p{percentile}'] = values
+        return range_df
+
+
+def scenario_curves(projections, percents=SCENARIO_PERCENTS):
+    """ New and recovered bad debt, as percents of rent charged, of every projection at every OCR and LCR target in
+    percents, computed together for all projections' rentals. Keyed like projections; since new bad debt only
+    depends on OCR and recovery only on LCR, any (OCR, LCR) scenario is the difference of the two curves """
+    keys = list(projections)
+    projections = [projections[key] for key in keys]
+    targets = np.asarray(percents, dtype=float)[:, None] / 100
+    rent_charged = np.array([projection.rent_charged for projection in projections], dtype=float)
+
+    # Every unpaid rental of every projection, against every OCR target
+    unpaid_codes = np.repeat(np.arange(len(projections)), [len(projection.amount_unpaid) for projection in projections])
+    today_ocr = np.array([projection.today_ocr for projection in projections], dtype=float)[unpaid_codes]
+    amount_unpaid = _concatenate([projection.amount_unpaid for projection in projections])
+    usable_wallet = _concatenate([projection.usable_wallet for projection in projections])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        increases = amount_unpaid * (1 - (targets - today_ocr) / (1 - today_ocr)) - usable_wallet
+    new_bad_debt = _sum_by(np.where(increases > 0, increases, 0), unpaid_codes, len(projections))
+
+    # Every late rental of every projection, against every LCR target
+    late_codes = np.repeat(np.arange(len(projections)), [len(projection.remaining_bom_balance) for projection in projections])
+    today_lcr = np.array([projection.today_lcr for projection in projections], dtype=float)[late_codes]
+    remaining_bom_balance = _concatenate([projection.remaining_bom_balance for projection in projections])
+    bom_bad_debt_rent = _concatenate([projection.bom_bad_debt_rent for projection in projections])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected_late_collections = remaining_bom_balance * ((targets - today_lcr) / (1 - today_lcr))
+    recovered_bad_debt = _sum_by(
+        np.where(expected_late_collections < bom_bad_debt_rent, expected_late_collections, bom_bad_debt_rent),
+        late_codes, len(projections)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_bad_debt_pct = new_bad_debt * 100 / rent_charged
+        recovery_pct = recovered_bad_debt * 100 / rent_charged
+    return {
+        key: pd.DataFrame({
+            'percent': percents,
+            'new_bad_debt_pct': new_bad_debt_pct[:, position],
+            'recovery_pct': recovery_pct[:, position],
+        })
+        for position, key in enumerate(keys)
+    }
+
+
+def _outcome(chance, amounts):
+    """ Chance of an all-or-nothing outcome, clipped to a probability, and each rental's amount when it happens, so
+    the expected amounts are amounts; outside (0, 1] the amounts are certain """
+    if not 0 < chance <= 1:
+        return 1.0, amounts
+    return chance, amounts / chance
+
+
+def _concatenate(arrays):
+    return np.concatenate(arrays) if arrays else np.array([], dtype=float)
+
+
+def _sum_by(values, codes, num_codes):
+    """ Each row of values summed per code, as a targets by codes array """
+    rows = np.arange(values.shape[0])[:, None] * num_codes + codes
+    return np.bincount(
+        rows.ravel(), weights=values.ravel(), minlength=values.shape[0] * num_codes
+    ).reshape(values.shape[0], num_codes)
+
+
+def _values(series):
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+
+def _running_total(values):
+    """ Sum added up in row order, so it rounds exactly like adding the rentals one at a time """
+    return values.cumsum()[-1] if len(values) else 0
@@ -6,34 +6,29 @@ from datetime import datetime
 
 from tabs.utils import fund_filter
 
-def bad_debt_over_time_filters(bad_debt_inputs):
-    selected_fund = fund_filter(key='bad_debt_over_time_select_fund', data=bad_debt_inputs)
+def bad_debt_over_time_filters(bad_debt_cube):
+    selected_fund = fund_filter(key='bad_debt_over_time_select_fund', data=bad_debt_cube)
     return selected_fund
 
-def bad_debt_over_time(bad_debt_inputs, selected_fund):
+def bad_debt_over_time(bad_debt_cube, selected_fund):
     st.subheader("Bad Debt Over Time")
 
-    bad_debt = bad_debt_inputs[bad_debt_inputs['fund'] == selected_fund].copy()
-
-    bad_debt['bad_debt'] = np.maximum(
-        bad_debt['unpaid_rent_this_month']
-        - bad_debt['unpaid_rent_covered_by_wallet']
-        - bad_debt['bom_bad_debt_recovered_by_late_collections'], 0
-    )
+    bad_debt = bad_debt_cube[bad_debt_cube['fund'] == selected_fund]
 
     bad_debt_fund = (
         bad_debt.groupby(['fund', 'month'])
         .agg({'bad_debt': 'sum', 'rent_charged': 'sum', 'unpaid_rent_this_month': 'sum', 'unpaid_rent_covered_by_wallet': 'sum', 'bom_bad_debt_recovered_by_late_collections': 'sum'})
         .reset_index()
-    )
-    bad_debt_fund['bad_debt_ratio_percent'] = bad_debt_fund['bad_debt'] * 100 / bad_debt_fund['rent_charged']
-
-    # Set 'month' to the 15th of each month for centering
-    bad_debt_fund['month'] = (
-        pd.to_datetime(bad_debt_fund['month'])
-        .dt.to_period('M')
-        .dt.to_timestamp()
-        + pd.Timedelta(days=7)
+        .assign(
+            bad_debt_ratio_percent=lambda df: df['bad_debt'] * 100 / df['rent_charged'],
+            # Set 'month' to the 15th of each month for centering
+            month=lambda df: (
+                pd.to_datetime(df['month'])
+                .dt.to_period('M')
+                .dt.to_timestamp()
+                + pd.Timedelta(days=7)
+            )
+        )
     )
 
     # Create a list of months for the domain (15th of each month)
@@ -44,7 +39,7 @@ def bad_debt_over_time(bad_debt_inputs, selected_fund):
     ) + pd.Timedelta(days=1)
     
 
-    bad_debt_fund['month_str'] = bad_debt_fund['month'].dt.strftime('%Y-%m')
+    bad_debt_fund = bad_debt_fund.assign(month_str=bad_debt_fund['month'].dt.strftime('%Y-%m'))
     latest_month = bad_debt_fund['month_str'].max()
     chart = alt.Chart(bad_debt_fund).mark_bar(size=40, color='#15b8a6').encode(
         x=alt.X(
@@ -85,14 +80,15 @@ def bad_debt_over_time(bad_debt_inputs, selected_fund):
     st.altair_chart(final_chart)
 
 
-def bad_debt_projection(bad_debt_inputs, selected_fund):
+def bad_debt_projection(bad_debt_projections, bad_debt_scenarios, selected_fund):
     st.subheader("Bad Debt Projection")
-    bad_debt_fund_inputs = bad_debt_inputs[(bad_debt_inputs['fund'] == selected_fund) & (bad_debt_inputs['month'] == datetime.now().strftime('%Y-%m-01'))]
-    bad_debt_fund_inputs['ontime_rent_collections'] = bad_debt_fund_inputs['ontime_rent_collections_succeeded'] + bad_debt_fund_inputs['ontime_rent_collections_processing']
-    bad_debt_fund_inputs['late_rent_collections'] = bad_debt_fund_inputs['late_rent_collections_succeeded'] + bad_debt_fund_inputs['late_rent_collections_processing']
-
-    today_ocr = bad_debt_fund_inputs['ontime_rent_collections'].sum() / bad_debt_fund_inputs['rent_charged'].sum()
-    today_lcr = 0 if bad_debt_fund_inputs['bom_rent_balance'].sum() == 0 else bad_debt_fund_inputs['late_rent_collections'].sum() / bad_debt_fund_inputs['bom_rent_balance'].sum()
+    projection_key = (datetime.now().strftime('%B %Y'), selected_fund)
+    projection = bad_debt_projections.get(projection_key)
+    if projection is None:
+        st.info(f"No {selected_fund} rentals for {datetime.now().strftime('%B %Y')} yet")
+        return
+    today_ocr = projection.today_ocr
+    today_lcr = projection.today_lcr
 
     # New bad debt with OCR slider
     col_new, col_ocr = st.columns([0.5, 1])
@@ -120,28 +116,12 @@ def bad_debt_projection(bad_debt_inputs, selected_fund):
         
 
     # Calculate all projections
-    total_expected_bad_debt_increase = 0
-    unpaid_rentals = bad_debt_fund_inputs[bad_debt_fund_inputs['ontime_rent_collections'] < bad_debt_fund_inputs['rent_charged']]
-    for _, ur in unpaid_rentals.iterrows(): 
-        amount_unpaid = ur['rent_charged'] - ur['ontime_rent_collections']
-        expected_collections_pct = (expected_ocr - today_ocr) / (1 - today_ocr)
-        expected_unpaid = amount_unpaid * (1 - expected_collections_pct)
-        expected_bad_debt_increase = max(0, expected_unpaid - ur['bom_usable_wallet_or_deposit'])
-        total_expected_bad_debt_increase += expected_bad_debt_increase
-
-    total_expected_bad_debt_decrease = 0
-    late_rentals = bad_debt_fund_inputs[bad_debt_fund_inputs['bom_rent_balance'] > 0]
-    for _, lr in late_rentals.iterrows():	
-        remaining_bom_balance = lr['bom_rent_balance'] - lr['late_rent_collections']
-        expected_collections_pct = (expected_lcr - today_lcr) / (1 - today_lcr)
-        expected_late_collections = remaining_bom_balance * expected_collections_pct
-        expected_bad_debt_decrease = min(lr['bom_bad_debt_rent'], expected_late_collections)
-        total_expected_bad_debt_decrease += expected_bad_debt_decrease
-
+    total_expected_bad_debt_increase = projection.new_bad_debt(expected_ocr)
+    total_expected_bad_debt_decrease = projection.recovered_bad_debt(expected_lcr)
     fund_bad_debt_projection = total_expected_bad_debt_increase - total_expected_bad_debt_decrease
 
     # Calculate percentages of rent charged
-    total_rent_charged = bad_debt_fund_inputs['rent_charged'].sum()
+    total_rent_charged = projection.rent_charged
     new_bad_debt_pct = (total_expected_bad_debt_increase / total_rent_charged) * 100
     recovery_pct = (total_expected_bad_debt_decrease / total_rent_charged) * 100
     net_projection_pct = (fund_bad_debt_projection / total_rent_charged) * 100
@@ -180,6 +160,76 @@ Based on:
 - Bad debt balance from beginning of month"""
         )
 
+    if projection_key in bad_debt_scenarios:
+        bad_debt_scenario_surface(bad_debt_scenarios[projection_key], today_ocr, today_lcr)
+    bad_debt_projection_range(projection, today_ocr, expected_ocr, expected_lcr)
+
+
+def bad_debt_scenario_surface(scenario, today_ocr, today_lcr):
+    st.subheader("Bad Debt Scenarios")
+
+    # Net projection at every OCR and LCR target still reachable this month
+    ocr_curve = scenario[scenario['percent'] >= today_ocr * 100].rename(columns={'percent': 'ocr'})
+    lcr_curve = scenario[scenario['percent'] >= today_lcr * 100].rename(columns={'percent': 'lcr'})
+    surface = ocr_curve[['ocr', 'new_bad_debt_pct']].merge(lcr_curve[['lcr', 'recovery_pct']], how='cross')
+    surface['net_projection_pct'] = surface['new_bad_debt_pct'] - surface['recovery_pct']
+
+    chart = alt.Chart(surface).mark_rect().encode(
+        x=alt.X('ocr:O', title='Expected OCR %', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('lcr:O', title='Expected LCR %', sort='descending', axis=alt.Axis(values=list(range(0, 101, 10)))),
+        color=alt.Color(
+            'net_projection_pct:Q',
+            title='Net Bad Debt (%)',
+            scale=alt.Scale(scheme='redblue', reverse=True, domainMid=0)
+        ),
+        tooltip=[
+            alt.Tooltip('ocr:O', title='Expected OCR %'),
+            alt.Tooltip('lcr:O', title='Expected LCR %'),
+            alt.Tooltip('new_bad_debt_pct:Q', title='Projected New Bad Debt (%)', format='.2f'),
+            alt.Tooltip('recovery_pct:Q', title='Projected Old Bad Debt Recovery (%)', format='.2f'),
+            alt.Tooltip('net_projection_pct:Q', title='Net Bad Debt Projection (%)', format='.2f'),
+        ]
+    ).properties(
+        width='container',
+        height=400
+    )
+    st.altair_chart(chart)
+
+
+def bad_debt_projection_range(projection, today_ocr, expected_ocr, expected_lcr):
+    if not st.toggle("Simulate projection range (Monte Carlo)", key='bad_debt_projection_range'):
+        return
+    st.subheader("Bad Debt Projection Range")
+
+    # Simulated months at every whole OCR percent still reachable this month, and at the selected one
+    ocr_percents = np.arange(np.ceil(today_ocr * 100), 101)
+    range_df = projection.simulated_range(np.append(ocr_percents, expected_ocr * 100) / 100, expected_lcr)
+    range_df['ocr'] = range_df['expected_ocr'] * 100
+    selected = range_df.iloc[-1]
+    range_df = range_df.iloc[:-1]
+
+    col_low, col_median, col_high = st.columns(3)
+    with col_low:
+        st.metric("P10 Net Bad Debt", f"{selected['p10']:.2f}%")
+    with col_median:
+        st.metric("P50 Net Bad Debt", f"{selected['p50']:.2f}%")
+    with col_high:
+        st.metric("P90 Net Bad Debt", f"{selected['p90']:.2f}%")
+
+    band = alt.Chart(range_df).mark_area(opacity=0.3, color='#15b8a6').encode(
+        x=alt.X('ocr:Q', title='Expected OCR %', scale=alt.Scale(zero=False)),
+        y=alt.Y('p10:Q', title='Net Bad Debt (%)'),
+        y2='p90:Q',
+        tooltip=[
+            alt.Tooltip('ocr:Q', title='Expected OCR %', format='.0f'),
+            alt.Tooltip('p10:Q', title='P10 (%)', format='.2f'),
+            alt.Tooltip('p50:Q', title='P50 (%)', format='.2f'),
+            alt.Tooltip('p90:Q', title='P90 (%)', format='.2f'),
+        ]
+    )
+    line = band.mark_line(color='#0f5e73').encode(y='p50:Q')
+    st.altair_chart((band + line).properties(width='container'))
+
 
 
 
@@ -1,13 +1,13 @@
 import streamlit as st
 import altair as alt
 
-from tabs.utils import date_month_filter, fund_filter
+from tabs.utils import date_month_filter, fund_filter, month_fund_rows
 
 
-def data_filters(bad_debt_inputs_data):
+def data_filters(bad_debt_cube, bad_debt_partitions):
     fund, rental_status, eviction_status, month_year, bom_ar = st.columns([2, 1.5, 1.5, 1.5, 1])
     with fund:
-        selected_fund = fund_filter(key='data_select_fund', data=bad_debt_inputs_data, include_all=True)
+        selected_fund = fund_filter(key='data_select_fund', data=bad_debt_cube, include_all=True)
     with rental_status: 
         selected_rental_status = st.selectbox(
             "Select a rental status",
@@ -22,38 +22,46 @@ def data_filters(bad_debt_inputs_data):
         )
     with month_year:
         selected_month_year = date_month_filter(key='data_select_month_year')
-    
-    filtered_bad_debt_inputs = bad_debt_inputs_data.copy()
+
+    # Charts and metrics read the cube; only the selected month's rentals are filtered for the tables
+    filtered_bad_debt_cube = filter_bad_debt(bad_debt_cube, selected_fund, selected_rental_status, selected_eviction_status)
+    month_bad_debt_inputs = filter_bad_debt(
+        month_fund_rows(bad_debt_partitions, selected_month_year, selected_fund),
+        selected_fund, selected_rental_status, selected_eviction_status
+    )
+
+    with bom_ar:
+        st.metric(f"BOM AR ({selected_month_year})", f"${filtered_bad_debt_cube[filtered_bad_debt_cube['display_month'] == selected_month_year]['bom_rent_balance'].sum():,.0f}")
+
+    return filtered_bad_debt_cube, month_bad_debt_inputs
+
+
+def filter_bad_debt(bad_debt_df, selected_fund, selected_rental_status, selected_eviction_status):
+    """ Rows of bad_debt_inputs or the bad debt cube matching the data tab's filters """
     if selected_fund != 'All':
-        filtered_bad_debt_inputs = filtered_bad_debt_inputs[filtered_bad_debt_inputs['fund'] == selected_fund]
+        bad_debt_df = bad_debt_df[bad_debt_df['fund'] == selected_fund]
 
     if selected_rental_status == 'In Home':
-        filtered_bad_debt_inputs = filtered_bad_debt_inputs[filtered_bad_debt_inputs['rental_status'] == 'active']
+        bad_debt_df = bad_debt_df[bad_debt_df['rental_status'] == 'active']
     elif selected_rental_status == 'Moved Out':
-        filtered_bad_debt_inputs = filtered_bad_debt_inputs[filtered_bad_debt_inputs['rental_status'] != 'active']
+        bad_debt_df = bad_debt_df[bad_debt_df['rental_status'] != 'active']
     
     if selected_eviction_status == 'Yes':
-        filtered_bad_debt_inputs = filtered_bad_debt_inputs[filtered_bad_debt_inputs['was_evicted'] == True]
+        bad_debt_df = bad_debt_df[bad_debt_df['was_evicted'] == True]
     elif selected_eviction_status == 'No':
-        filtered_bad_debt_inputs = filtered_bad_debt_inputs[filtered_bad_debt_inputs['was_evicted'] == False]
-    
-    with bom_ar:
-        st.metric(f"BOM AR ({selected_month_year})", f"${filtered_bad_debt_inputs[filtered_bad_debt_inputs['display_month'] == selected_month_year]['bom_rent_balance'].sum():,.0f}")
-
-    return filtered_bad_debt_inputs, selected_month_year
+        bad_debt_df = bad_debt_df[bad_debt_df['was_evicted'] == False]
+    return bad_debt_df
     
 
-def late_collections_over_ar(bad_debt_inputs_data, selected_month_year):
+def late_collections_over_ar(bad_debt_cube, bad_debt_inputs_data):
     st.subheader("Late Collections over BOM AR")
 
-    bad_debt_inputs_data = bad_debt_inputs_data[bad_debt_inputs_data['bom_rent_balance'] > 0]
-    bad_debt_inputs_data['total_late_rent_collections'] = bad_debt_inputs_data['late_rent_collections_succeeded'] + bad_debt_inputs_data['late_rent_collections_processing']
-
     # Graph the past 12 months
-    monthly_summary = bad_debt_inputs_data.groupby('month').agg({
-        'total_late_rent_collections': 'sum',
-        'bom_rent_balance': 'sum'
-    }).reset_index()
+    bad_debt_cube = bad_debt_cube[bad_debt_cube['ar_rentals'] > 0]
+    monthly_summary = bad_debt_cube.groupby('month').agg(
+        total_late_rent_collections=('ar_late_rent_collections', 'sum'),
+        bom_rent_balance=('ar_bom_rent_balance', 'sum')
+    ).reset_index()
     monthly_summary['late_collections_ratio'] = (
         monthly_summary['total_late_rent_collections']/ monthly_summary['bom_rent_balance']
     )
@@ -72,10 +80,12 @@ def late_collections_over_ar(bad_debt_inputs_data, selected_month_year):
     st.altair_chart(chart)
 
     # Table for selected month
-    bad_debt_inputs_data['late_collections_ratio'] = round(
-        bad_debt_inputs_data['total_late_rent_collections'] / bad_debt_inputs_data['bom_rent_balance'], 2
+    bad_debt_inputs_data = bad_debt_inputs_data[bad_debt_inputs_data['bom_rent_balance'] > 0].assign(
+        total_late_rent_collections=lambda df: df['late_rent_collections_succeeded'] + df['late_rent_collections_processing']
+    ).assign(
+        late_collections_ratio=lambda df: round(df['total_late_rent_collections'] / df['bom_rent_balance'], 2)
     )
-    display_df = bad_debt_inputs_data[bad_debt_inputs_data['display_month'] == selected_month_year].sort_values(by='total_late_rent_collections', ascending=False).reset_index(drop=True)
+    display_df = bad_debt_inputs_data.sort_values(by='total_late_rent_collections', ascending=False).reset_index(drop=True)
     st.dataframe(display_df[[
         'fund',
         'address',
@@ -96,16 +106,15 @@ def late_collections_over_ar(bad_debt_inputs_data, selected_month_year):
 
 
 
-def ar_over_gpr(bad_debt_inputs_data, selected_month_year):
+def ar_over_gpr(bad_debt_cube, bad_debt_inputs_data):
     st.subheader("BOM AR over GPR")
 
-    bad_debt_inputs_data = bad_debt_inputs_data[bad_debt_inputs_data['bom_rent_balance'] >= 0]
-
     # Graph the past 12 months
-    monthly_summary = bad_debt_inputs_data.groupby('month').agg({
-        'bom_rent_balance': 'sum',
-        'gpr_this_month': 'sum'
-    }).reset_index()
+    bad_debt_cube = bad_debt_cube[bad_debt_cube['non_negative_ar_rentals'] > 0]
+    monthly_summary = bad_debt_cube.groupby('month').agg(
+        bom_rent_balance=('ar_bom_rent_balance', 'sum'),
+        gpr_this_month=('non_negative_ar_gpr_this_month', 'sum')
+    ).reset_index()
     monthly_summary['ar_over_gpr'] = (
         monthly_summary['bom_rent_balance'] / monthly_summary['gpr_this_month']
     )
@@ -118,10 +127,10 @@ def ar_over_gpr(bad_debt_inputs_data, selected_month_year):
     st.altair_chart(chart)
 
      # Table for selected month
-    bad_debt_inputs_data['ar_over_gpr'] = round(
-        bad_debt_inputs_data['bom_rent_balance'] / bad_debt_inputs_data['gpr_this_month'], 2
+    bad_debt_inputs_data = bad_debt_inputs_data[bad_debt_inputs_data['bom_rent_balance'] > 0].assign(
+        ar_over_gpr=lambda df: round(df['bom_rent_balance'] / df['gpr_this_month'], 2)
     )
-    display_df = bad_debt_inputs_data[(bad_debt_inputs_data['display_month'] == selected_month_year) & (bad_debt_inputs_data['bom_rent_balance'] > 0)].sort_values(by='bom_rent_balance', ascending=False).reset_index(drop=True)
+    display_df = bad_debt_inputs_data.sort_values(by='bom_rent_balance', ascending=False).reset_index(drop=True)
     st.dataframe(display_df[[
         'fund',
         'address',
@@ -2,14 +2,15 @@ import streamlit as st
 import altair as alt
 from datetime import datetime
 
-from tabs.utils import date_month_filter, fund_filter, color_scale, dash_scale
+from charts import ontime_collections_curve_spec
+from tabs.utils import date_month_filter, fund_filter, month_fund_rows
 
 
-def ontime_collections_curve_filters(collections_curve_data):
+def ontime_collections_curve_filters(collections_curve_data, collections_curve_partitions):
     selected_fund = fund_filter(key='ontime_collections_curve_select_fund', data=collections_curve_data)
     col_month, col_rent_charged, col_today_paid, col_today_succeeded, col_today_l1m, col_today_l3m, col_today_l12m = st.columns([2, 1, 1, 1, 1, 1, 1])
 
-    datapoint = collections_curve_data[(collections_curve_data['fund'] == selected_fund) & (collections_curve_data['day_of_month'] == datetime.now().day)].iloc[0]
+    datapoint = collections_curve_partitions.get(selected_fund, datetime.now().day).iloc[0]
     with col_month:
         st.metric(f"{datetime.now().strftime('%Y')}", f"{datetime.now().strftime('%B %d')}")
     with col_rent_charged:
@@ -27,94 +28,26 @@ def ontime_collections_curve_filters(collections_curve_data):
     return selected_fund
 
 
-def ontime_collections_curve(collections_curve_data, selected_fund):
+def ontime_collections_curve(collections_curves, collections_curve_specs, selected_fund):
     st.subheader("On-Time Collections Curve")
 
-    chart_df = collections_curve_data[collections_curve_data['fund'] == selected_fund].copy()
-    # Melt to long format for Altair
-    chart_df = chart_df.melt(
-        id_vars=['day_of_month', 'rent_charged_this_month', 'rent_paid_ontime_this_month', 'rent_succeeded_ontime_this_month', 'rent_processing_ontime_this_month'],  
-        value_vars=[
-            'ontime_collections_rate_succeeded_this_month',
-            'ontime_collections_rate_this_month',
-            'ontime_collections_rate_last_month',
-            'ontime_collections_rate_l3m',
-            'ontime_collections_rate_l12m'
-        ],
-        var_name='curve',
-        value_name='ratio'
-    )
-
-    chart_df['curve'] = chart_df['curve'].map({
-        'ontime_collections_rate_succeeded_this_month': 'This Month Succeeded',
-        'ontime_collections_rate_this_month': 'This Month Succeeded + Processing',
-        'ontime_collections_rate_last_month': 'Last Month',
-        'ontime_collections_rate_l3m': 'Last 3 Months',
-        'ontime_collections_rate_l12m': 'Last 12 Months'
-    })
-    chart_df = chart_df[(
-        ((chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing'])) & (chart_df['day_of_month'] <= datetime.today().day)) |
-        (~chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing']))
-    )]
+    # Specs are built with the data for the day it was loaded; past midnight, until the next load, draw today's here
+    day_of_month = datetime.today().day
+    spec = collections_curve_specs.get(('ontime', selected_fund, day_of_month))
+    if spec is None:
+        spec = ontime_collections_curve_spec(collections_curves[('ontime', selected_fund)], day_of_month)
+    st.vega_lite_chart(spec=spec)
 
-    chart = alt.Chart(chart_df).mark_line().encode(
-        x=alt.X('day_of_month:O', title='Day of Month'),
-        y=alt.Y(
-            'ratio:Q',
-            title='Collections Rate',
-            axis=alt.Axis(format='%'),
-            scale=alt.Scale(domain=[0.5, 1])
-        ),
-        color=alt.Color(
-            'curve:N',
-            title='Curve',
-            scale=color_scale,
-            legend=alt.Legend(orient='bottom-right', labelLimit=210)
-        ),
-        strokeDash=alt.StrokeDash('curve:N', scale=dash_scale),
-        tooltip=[
-            'day_of_month', 
-            'curve', 
-            alt.Tooltip('ratio:Q', format='.2%')
-        ]
-    ).properties(
-        width='container',
-        height=400
-    ).interactive()
-
-    # Add points only for "This Month Succeeded" and "This Month Succeeded + Processing"
-    point_chart = alt.Chart(chart_df[chart_df['curve'].isin(['This Month Succeeded', 'This Month Succeeded + Processing'])]).mark_point(
-        filled=True,
-        size=60
-    ).encode(
-        x=alt.X('day_of_month:O'),
-        y=alt.Y('ratio:Q'),
-        color=alt.Color('curve:N', scale=color_scale, legend=None),
-        tooltip=[
-            'day_of_month', 
-            'curve', 
-            alt.Tooltip('ratio:Q', format='.2%'),
-            alt.Tooltip('rent_paid_ontime_this_month:Q', format='$,.0f', title='Rent Paid On Time'),
-            alt.Tooltip('rent_succeeded_ontime_this_month:Q', format='$,.0f', title='Rent Succeeded On Time'),
-            alt.Tooltip('rent_processing_ontime_this_month:Q', format='$,.0f', title='Rent Processing On Time')
-        ]
-    )
-    st.altair_chart(chart + point_chart)
 
-
-def ontime_collections_drilldown(bad_debt_inputs_data, selected_fund):
+def ontime_collections_drilldown(bad_debt_partitions, selected_fund):
     st.subheader("On-Time Collections Drilldown")
     
     selected_month_year = date_month_filter(key='ontime_collections_select_month_year')
 
-    display_df = bad_debt_inputs_data[(bad_debt_inputs_data['rent_charged'] > 0)]
-    display_df = display_df[(display_df['display_month'] == selected_month_year)]
-    if selected_fund != 'All':
-        display_df = display_df[display_df['fund'] == selected_fund]
-    
-    display_df['unpaid_rent_this_month'] = round(display_df['unpaid_rent_this_month'], 2)
-    display_df['hudson_link'] = "https://hudson.upandup.co/rent-roll/" + display_df['rental_id'].astype(str)
-    display_df['buildium_link'] = "https://upandup.managebuilding.com/manager/app/rentroll/" + display_df['buildium_lease_id'].astype(str) + "/financials/ledger?isByAccountView=0&isByDateView=1"
+    display_df = month_fund_rows(bad_debt_partitions, selected_month_year, selected_fund)
+    display_df = display_df[display_df['rent_charged'] > 0].assign(
+        unpaid_rent_this_month=lambda df: round(df['unpaid_rent_this_month'], 2)
+    )
     
     st.dataframe(
         display_df[[
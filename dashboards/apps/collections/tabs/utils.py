@@ -27,31 +27,8 @@ def fund_filter(key, data, include_all=False):
         key=key
     )
 
-# Color and dash mapping
-color_scale = alt.Scale(domain=[
-    'Last Month',
-    'Last 3 Months',
-    'Last 12 Months',
-    'This Month Succeeded',
-    'This Month Succeeded + Processing'
-], range=[
-    '#d1c4e9',  # soft lavender (Last Month)
-    '#9575cd',  # light-medium purple (Last 3 Months)
-    '#512da8',  # deep purple (Last 12 Months)
-    '#15b8a6',  # teal (This Month Succeeded)
-    '#15b8a6'   # teal (This Month Succeeded + Processing, dotted)
-])
-
-dash_scale = alt.Scale(domain=[
-    'Last Month',
-    'Last 3 Months',
-    'Last 12 Months',
-    'This Month Succeeded',
-    'This Month Succeeded + Processing'
-], range=[
-    [1,0],      # solid
-    [1,0],      # solid
-    [1,0],      # solid
-    [1,0],      # solid
-    [4,4]       # dotted
-])
\ No newline at end of file
+def month_fund_rows(bad_debt_partitions, selected_month_year, selected_fund):
+    """ bad_debt_inputs rows of a month, for one fund or for 'All' """
+    if selected_fund == 'All':
+        return bad_debt_partitions.get(selected_month_year)
+    return bad_debt_partitions.get(selected_month_year, selected_fund)
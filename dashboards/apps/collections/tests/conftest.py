@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the app's modules by name, like app.py does when run from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
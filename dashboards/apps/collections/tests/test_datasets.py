@@ -0,0 +1,98 @@
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+import datasets
+from datasets import Dataset, dataset
+
+
+class Loader:
+    """ Loader returning a new frame per call, or raising while failing is set """
+    __name__ = 'get_rentals'
+
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+        self.failing = False
+        self.lock = threading.Lock()
+
+    def __call__(self, fund):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        if self.failing:
+            raise RuntimeError('warehouse unavailable')
+        return rentals(fund, calls)
+
+
+def rentals(fund, load):
+    return pd.DataFrame({'fund': [fund] * 3, 'load': load, 'rent': [1000.0, 1500.0, 2000.0]})
+
+
+def test_first_get_loads_and_later_gets_reuse_it():
+    loader = Loader()
+    cached = Dataset('rentals', loader, ('Fund I',), timedelta(hours=1))
+    pd.testing.assert_frame_equal(cached.get(), rentals('Fund I', 1))
+    pd.testing.assert_frame_equal(cached.get(), rentals('Fund I', 1))
+    assert loader.calls == 1
+
+
+def test_concurrent_first_gets_load_once():
+    loader = Loader(delay=0.2)
+    cached = Dataset('rentals', loader, ('Fund I',), timedelta(hours=1))
+    threads = [threading.Thread(target=cached.get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == 1
+
+
+def test_refresh_replaces_the_value_and_schedules_the_next():
+    loader = Loader()
+    cached = Dataset('rentals', loader, ('Fund I',), timedelta(hours=1))
+    cached.get()
+    cached.refresh()
+    assert cached.get()['load'].tolist() == [2] * 3
+    assert cached.refresh_due - cached.snapshot[1] == pytest.approx(3600 * datasets.REFRESH_AT)
+
+
+def test_failed_refresh_keeps_the_last_good_value():
+    loader = Loader()
+    cached = Dataset('rentals', loader, ('Fund I',), timedelta(hours=1))
+    good = cached.get()
+    loader.failing = True
+    before = time.monotonic()
+    cached.refresh()
+    pd.testing.assert_frame_equal(cached.get(), good)
+    assert before + datasets.RETRY_SECONDS <= cached.refresh_due <= time.monotonic() + datasets.RETRY_SECONDS
+
+
+def test_cached_loader_matches_the_loader_and_keys_by_arguments():
+    loader = Loader()
+    get_rentals = dataset(ttl=timedelta(hours=1))(loader)
+    pd.testing.assert_frame_equal(get_rentals('Fund I'), rentals('Fund I', 1))
+    pd.testing.assert_frame_equal(get_rentals('Fund II'), rentals('Fund II', 2))
+    get_rentals('Fund I')
+    assert loader.calls == 2
+
+
+def test_sessions_writing_in_place_leave_the_cached_frames_alone():
+    def get_rental_views(fund):
+        return rentals(fund, 1), {fund: rentals(fund, 1)}, {'mark': 'bar'}
+
+    get_rentals = dataset(ttl=timedelta(hours=1))(get_rental_views)
+    session_df, by_fund, spec = get_rentals('Fund I')
+    session_df.loc[0, 'rent'] = 0.0
+    session_df['rent'] *= 2
+    by_fund['Fund I'].fillna({'rent': 0.0}, inplace=True)
+    by_fund['Fund I'].iloc[1, 2] = -1.0
+
+    fresh_df, fresh_by_fund, fresh_spec = get_rentals('Fund I')
+    pd.testing.assert_frame_equal(fresh_df, rentals('Fund I', 1))
+    pd.testing.assert_frame_equal(fresh_by_fund['Fund I'], rentals('Fund I', 1))
+    assert fresh_spec == spec
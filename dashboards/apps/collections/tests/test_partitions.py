@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from partitions import PartitionIndex
+
+
+def bad_debt_inputs(num_rentals=2000, seed=0):
+    """ Rentals per display month and fund, with a few funds missing from some months """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'display_month': rng.choice(['May 2025', 'June 2025', 'July 2025'], num_rentals),
+        'fund': rng.choice(['Fund I', 'Fund II', 'Fund III'], num_rentals, p=[0.6, 0.39, 0.01]),
+        'rent_charged': rng.uniform(1000, 3000, num_rentals),
+    })
+    return df[~((df['display_month'] == 'May 2025') & (df['fund'] == 'Fund III'))]
+
+
+def test_partitions_match_boolean_filters():
+    df = bad_debt_inputs()
+    index = PartitionIndex(df, ['display_month', 'fund'])
+    for month in ['May 2025', 'June 2025', 'July 2025', 'August 2025']:
+        pd.testing.assert_frame_equal(index.get(month), df[df['display_month'] == month])
+        for fund in ['Fund I', 'Fund II', 'Fund III']:
+            pd.testing.assert_frame_equal(
+                index.get(month, fund), df[(df['display_month'] == month) & (df['fund'] == fund)]
+            )
+
+
+def test_missing_partition_is_empty_with_the_frames_columns():
+    df = bad_debt_inputs()
+    partition = PartitionIndex(df, ['display_month', 'fund']).get('May 2025', 'Fund III')
+    assert partition.empty
+    assert list(partition.columns) == list(df.columns)
+    assert partition.dtypes.equals(df.dtypes)
+
+
+def test_numeric_keys():
+    df = pd.DataFrame({'fund': ['Fund I', 'Fund II'] * 31, 'day_of_month': np.repeat(np.arange(1, 32), 2)})
+    index = PartitionIndex(df, ['fund', 'day_of_month'])
+    pd.testing.assert_frame_equal(index.get('Fund II', 7), df[(df['fund'] == 'Fund II') & (df['day_of_month'] == 7)])
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from projections import SCENARIO_PERCENTS, BadDebtProjection, scenario_curves
+
+
+def bad_debt_fund_inputs(num_rentals=400, seed=1):
+    """ A fund's rentals for a month, with some paid in full, some part paid and some owing from past months """
+    rng = np.random.default_rng(seed)
+    rent_charged = rng.uniform(1000, 3000, num_rentals).round(2)
+    paid_share = rng.choice([1, 0.5, 0], num_rentals, p=[0.85, 0.05, 0.1])
+    bom_rent_balance = np.where(rng.random(num_rentals) < 0.2, rng.uniform(0, 6000, num_rentals), 0).round(2)
+    return pd.DataFrame({
+        'rent_charged': rent_charged,
+        'ontime_rent_collections_succeeded': (rent_charged * paid_share * 0.9).round(2),
+        'ontime_rent_collections_processing': (rent_charged * paid_share * 0.1).round(2),
+        'late_rent_collections_succeeded': (bom_rent_balance * rng.uniform(0, 0.3, num_rentals)).round(2),
+        'late_rent_collections_processing': 0.0,
+        'bom_rent_balance': bom_rent_balance,
+        'bom_bad_debt_rent': (bom_rent_balance * rng.uniform(0, 1, num_rentals)).round(2),
+        'bom_usable_wallet_or_deposit': np.where(rng.random(num_rentals) < 0.5, rng.uniform(0, 1500, num_rentals), 0).round(2),
+    })
+
+
+def reference_projection(bad_debt_fund_inputs, expected_ocr, expected_lcr):
+    """ The iterrows loop BadDebtProjection replaced: today's OCR and LCR, new bad debt and recovered bad debt """
+    bad_debt_fund_inputs = bad_debt_fund_inputs.copy()
+    bad_debt_fund_inputs['ontime_rent_collections'] = bad_debt_fund_inputs['ontime_rent_collections_succeeded'] + bad_debt_fund_inputs['ontime_rent_collections_processing']
+    bad_debt_fund_inputs['late_rent_collections'] = bad_debt_fund_inputs['late_rent_collections_succeeded'] + bad_debt_fund_inputs['late_rent_collections_processing']
+    today_ocr = bad_debt_fund_inputs['ontime_rent_collections'].sum() / bad_debt_fund_inputs['rent_charged'].sum()
+    today_lcr = 0 if bad_debt_fund_inputs['bom_rent_balance'].sum() == 0 else bad_debt_fund_inputs['late_rent_collections'].sum() / bad_debt_fund_inputs['bom_rent_balance'].sum()
+
+    total_expected_bad_debt_increase = 0
+    unpaid_rentals = bad_debt_fund_inputs[bad_debt_fund_inputs['ontime_rent_collections'] < bad_debt_fund_inputs['rent_charged']]
+    for _, ur in unpaid_rentals.iterrows():
+        amount_unpaid = ur['rent_charged'] - ur['ontime_rent_collections']
+        expected_collections_pct = (expected_ocr - today_ocr) / (1 - today_ocr)
+        expected_unpaid = amount_unpaid * (1 - expected_collections_pct)
+        total_expected_bad_debt_increase += max(0, expected_unpaid - ur['bom_usable_wallet_or_deposit'])
+
+    total_expected_bad_debt_decrease = 0
+    late_rentals = bad_debt_fund_inputs[bad_debt_fund_inputs['bom_rent_balance'] > 0]
+    for _, lr in late_rentals.iterrows():
+        remaining_bom_balance = lr['bom_rent_balance'] - lr['late_rent_collections']
+        expected_collections_pct = (expected_lcr - today_lcr) / (1 - today_lcr)
+        expected_late_collections = remaining_bom_balance * expected_collections_pct
+        total_expected_bad_debt_decrease += min(lr['bom_bad_debt_rent'], expected_late_collections)
+
+    return today_ocr, today_lcr, total_expected_bad_debt_increase, total_expected_bad_debt_decrease
+
+
+FUND_INPUTS = {
+    'mixed': bad_debt_fund_inputs(),
+    'all paid on time': bad_debt_fund_inputs().assign(
+        ontime_rent_collections_succeeded=lambda df: df['rent_charged'], ontime_rent_collections_processing=0.0
+    ),
+    'nothing owed from past months': bad_debt_fund_inputs().assign(bom_rent_balance=0.0, bom_bad_debt_rent=0.0),
+    'one unpaid late rental': bad_debt_fund_inputs().iloc[[16]],
+}
+
+
+@pytest.mark.parametrize('inputs', list(FUND_INPUTS))
+@pytest.mark.parametrize('expected_ocr, expected_lcr', [(0.96, 0.25), (0.9, 0.6), (1.0, 1.0), (0.5, 0.0)])
+def test_projection_matches_iterrows_loop(inputs, expected_ocr, expected_lcr):
+    projection = BadDebtProjection(FUND_INPUTS[inputs])
+    today_ocr, today_lcr, new_bad_debt, recovered_bad_debt = reference_projection(
+        FUND_INPUTS[inputs], expected_ocr, expected_lcr
+    )
+    assert projection.today_ocr == today_ocr
+    assert projection.today_lcr == today_lcr
+    assert projection.new_bad_debt(expected_ocr) == new_bad_debt
+    assert projection.recovered_bad_debt(expected_lcr) == recovered_bad_debt
+
+
+@pytest.mark.parametrize('expected_lcr', [0.25, 0.6, 1.0])
+def test_simulated_mean_matches_point_projection(expected_lcr):
+    projection = BadDebtProjection(bad_debt_fund_inputs())
+    expected_ocrs = np.array([projection.today_ocr, 0.9, 0.93, 0.96, 0.99, 1.0])
+    simulated = projection.simulate(expected_ocrs, expected_lcr)
+
+    point = np.array([
+        (projection.new_bad_debt(expected_ocr) - projection.recovered_bad_debt(expected_lcr)) * 100 / projection.rent_charged
+        for expected_ocr in expected_ocrs
+    ])
+    # Within four standard errors of the simulated mean
+    tolerance = 4 * simulated.std(axis=0) / np.sqrt(len(simulated)) + 1e-9
+    assert np.all(np.abs(simulated.mean(axis=0) - point) <= tolerance)
+
+
+def test_simulated_range_contains_point_projection():
+    projection = BadDebtProjection(bad_debt_fund_inputs())
+    expected_ocrs = np.array([0.9, 0.96, 0.99])
+    range_df = projection.simulated_range(expected_ocrs, 0.25)
+    point = np.array([
+        (projection.new_bad_debt(expected_ocr) - projection.recovered_bad_debt(0.25)) * 100 / projection.rent_charged
+        for expected_ocr in expected_ocrs
+    ])
+    assert np.all((range_df['p10'] <= point) & (point <= range_df['p90']))
+
+
+def test_simulation_does_not_depend_on_chunking(monkeypatch):
+    projection = BadDebtProjection(bad_debt_fund_inputs())
+    whole = projection.simulate([0.96], 0.25, draws=300)
+    monkeypatch.setattr('projections.MONTE_CARLO_CHUNK_DRAWS', 300)
+    assert np.allclose(projection.simulate([0.96], 0.25, draws=300), whole)
+
+
+def test_scenario_curves_match_point_projections():
+    projections = {('June 2025', inputs): BadDebtProjection(FUND_INPUTS[inputs]) for inputs in FUND_INPUTS}
+    projections[('July 2025', 'mixed')] = BadDebtProjection(bad_debt_fund_inputs(num_rentals=150, seed=2))
+    curves = scenario_curves(projections)
+
+    assert list(curves) == list(projections)
+    for key, projection in projections.items():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            new_bad_debt_pct = [projection.new_bad_debt(percent / 100) * 100 / projection.rent_charged for percent in SCENARIO_PERCENTS]
+            recovery_pct = [projection.recovered_bad_debt(percent / 100) * 100 / projection.rent_charged for percent in SCENARIO_PERCENTS]
+        assert curves[key]['percent'].tolist() == SCENARIO_PERCENTS.tolist()
+        assert np.allclose(curves[key]['new_bad_debt_pct'], new_bad_debt_pct, rtol=1e-12, atol=1e-12, equal_nan=True)
+        assert np.allclose(curves[key]['recovery_pct'], recovery_pct, rtol=1e-12, atol=1e-12, equal_nan=True)
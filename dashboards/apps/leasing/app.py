@@ -1,8 +1,13 @@
 import streamlit as st
-from google.oauth2 import service_account
 
-from data import get_service_account_info, get_invitation_homes_data, get_market_cycle_data
-from tabs.clearance_rates_tab import invh_filters, clearance_rates, homes_rented_stats
+from data import (
+    get_warehouse, get_invitation_homes_data, get_invitation_homes_lease_terms, get_market_cycle_data,
+    get_comparable_homes
+)
+from tabs.clearance_rates_tab import (
+    invh_filters, listing_inventory, clearance_rates, trend_filters, clearance_rate_trend, homes_rented_stats,
+    rented_home_percentiles, comparable_filters, comparable_homes, lease_terms_filters, lease_terms
+)
 
 # Configure page layout
 st.set_page_config(
@@ -13,18 +18,29 @@ st.set_page_config(
 )
 
 # Data Retrieval
-credentials = service_account.Credentials.from_service_account_info(get_service_account_info())
-ih_property_df, ih_lease_terms_df = get_invitation_homes_data(credentials)
-ih_property_cycle_df = get_market_cycle_data(ih_property_df)
+warehouse = get_warehouse()
+(
+    ih_listing_df, ih_market_cycle_df, ih_presence_index, ih_cycle_index, ih_location_index, ih_clearance_trends,
+    ih_rented_sketches
+) = get_invitation_homes_data(warehouse)
+ih_property_cycle_df = get_market_cycle_data(ih_market_cycle_df)
 
 # Application
 st.title("Leasing Dashboard")
 
 invh_tab, tab2 = st.tabs(["Invitation Homes", 'tab2'])
 with invh_tab:
-    ih_property_period_df, start_date, end_date = invh_filters(ih_property_cycle_df)
-    clearance_rates(ih_property_period_df, start_date, end_date)
+    ih_property_period_df, start_date, end_date, selected_market = invh_filters(ih_property_cycle_df, ih_cycle_index)
+    listing_inventory(ih_presence_index, start_date, end_date, selected_market)
+    clearance_rates(ih_cycle_index, ih_property_period_df, start_date, end_date)
+    trend_frequency = trend_filters()
+    clearance_rate_trend(ih_clearance_trends[trend_frequency], selected_market)
     homes_rented_stats(ih_property_period_df, start_date, end_date)
+    rented_home_percentiles(ih_rented_sketches, start_date, end_date, selected_market)
+    subject_df, miles = comparable_filters(ih_property_period_df)
+    comparable_homes(get_comparable_homes(ih_property_cycle_df, ih_location_index, subject_df, miles))
+    if lease_terms_filters():
+        lease_terms(get_invitation_homes_lease_terms(warehouse), ih_property_period_df, start_date, end_date)
 with tab2:
     st.write(ih_property_cycle_df)
 
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+class CycleIndex:
+    """ Cycle lifespans and lease dates as sorted endpoints, so date-range queries only touch matching cycles """
+
+    def __init__(self, first_pull_dates, last_pull_dates):
+        first_days = _days(first_pull_dates)
+        last_days = _days(last_pull_dates)
+
+        # Lifespans grouped by length class; a class's overlaps can only start within its longest span of the range
+        length_classes = np.ceil(np.log2(last_days - first_days + 1)).astype(np.int64)
+        self.lifespans = []
+        for length_class in np.unique(length_classes):
+            positions = np.flatnonzero(length_classes == length_class)
+            positions = positions[np.argsort(first_days[positions], kind='stable')]
+            self.lifespans.append((
+                first_days[positions],
+                last_days[positions],
+                positions,
+                int((last_days[positions] - first_days[positions]).max()),
+            ))
+
+        # A cycle counts as leased the day after its last pull
+        self.lease_positions = np.argsort(last_days, kind='stable')
+        self.lease_days = last_days[self.lease_positions] + 1
+
+    @classmethod
+    def from_cycles(cls, ih_market_cycle_df):
+        return cls(ih_market_cycle_df['first_pull_date'], ih_market_cycle_df['last_pull_date'])
+
+    def overlapping(self, start_date, end_date):
+        """ Row positions of cycles listed at some point between start_date and end_date """
+        start, end = _day(start_date), _day(end_date)
+        matches = []
+        for first_days, last_days, positions, max_length in self.lifespans:
+            candidates = slice(
+                np.searchsorted(first_days, start - max_length), np.searchsorted(first_days, end, side='right')
+            )
+            matches.append(positions[candidates][last_days[candidates] >= start])
+        return np.sort(np.concatenate(matches)) if matches else np.array([], dtype=np.int64)
+
+    def leased_between(self, start_date, end_date, today):
+        """ Row positions of cycles leased between start_date and end_date, counting only leases before today """
+        start, end = _day(start_date), min(_day(end_date), _day(today))
+        leases = slice(np.searchsorted(self.lease_days, start), np.searchsorted(self.lease_days, end, side='right'))
+        return np.sort(self.lease_positions[leases])
+
+
+def _days(dates):
+    return pd.to_datetime(pd.Series(dates)).to_numpy('datetime64[D]').astype(np.int64)
+
+
+def _day(date):
+    return pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype(np.int64)
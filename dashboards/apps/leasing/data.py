@@ -1,6 +1,109 @@
 import json
+import os
+import uuid
+from datetime import timedelta
 import streamlit as st
+import db_dtypes  # registers the dbdate dtype so cached dates load back as dates
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json
+import pyarrow.parquet as pq
+from google.oauth2 import service_account
+
+from cycle_index import CycleIndex
+from datasets import dataset
+from locations import LocationIndex
+from presence import PresenceIndex
+from sketches import QuantileSketch
+from warehouse import BigQueryWarehouse, DuckDBWarehouse, arrow_to_df
+
+# Local copy of the parsed INVH history, refreshed incrementally
+HISTORY_CACHE_DIR = os.environ.get('LEASING_CACHE_DIR', '.cache/leasing')
+# Bump when the parsed columns or their types change so the cache is rebuilt
+HISTORY_CACHE_VERSION = 7
+# Watermark of an empty history, earlier than every pull
+EMPTY_HISTORY_WATERMARK = '1970-01-01T00:00:00+00:00'
+
+# INVH property fields extracted in the query: (column, JSON path, BigQuery type); numbers are all FLOAT64, and
+# WHOLE_NUMBER_FIELDS are made int64 client-side, so a fractional or malformed value can't fail the query
+PROPERTY_FIELDS = [
+    ('slug', '$.slug', 'STRING'),
+    ('market_name', '$.market_name', 'STRING'),
+    ('address_address_1', '$.address.address_1', 'STRING'),
+    ('address_city', '$.address.city', 'STRING'),
+    ('address_state', '$.address.state', 'STRING'),
+    ('address_zip_code', '$.address.zip_code', 'STRING'),
+    ('map_location_latitude', '$.map_location.latitude', 'FLOAT64'),
+    ('map_location_longitude', '$.map_location.longitude', 'FLOAT64'),
+    ('status', '$.status', 'STRING'),
+    ('available_on', '$.available_on', 'DATE'),
+    ('beds', '$.beds', 'FLOAT64'),
+    ('baths', '$.baths', 'FLOAT64'),
+    ('square_footage', '$.square_footage', 'FLOAT64'),
+    ('rent', '$.rent', 'FLOAT64'),
+    ('total_monthly_rent', '$.total_monthly_rent', 'FLOAT64'),
+    ('is_application_enabled', '$.is_application_enabled', 'BOOL'),
+    ('is_self_show_enabled', '$.is_self_show_enabled', 'BOOL'),
+    ('is_new_construction', '$.is_new_construction', 'BOOL'),
+    ('is_on_special', '$.is_on_special', 'BOOL'),
+    ('is_btr_community', '$.is_btr_community', 'BOOL'),
+    ('is_exclusive', '$.is_exclusive', 'BOOL'),
+    ('is_featured_listing', '$.is_featured_listing', 'BOOL'),
+    ('is_model_home', '$.is_model_home', 'BOOL'),
+    ('has_virtual_tour', '$.has_virtual_tour', 'BOOL'),
+    ('application_url', '$.application_url', 'STRING'),
+]
+# Fields stored as JSON numbers, int64 like in the old client-side parse when every value is a whole number
+WHOLE_NUMBER_FIELDS = ['beds', 'baths', 'square_footage']
+PROPERTY_COLUMNS = ['pull_date', 'property_id'] + [name for name, _, _ in PROPERTY_FIELDS]
+# Pulls of a property with the same values on consecutive days are kept as one interval
+LISTING_ATTRIBUTES = PROPERTY_COLUMNS[1:]
+
+# A slug off the site for more than this many days starts a new on-market cycle
+CYCLE_GAP_DAYS = 14
+
+# Per property cycle columns: (column, property column, first or last non-null value)
+CYCLE_COLUMNS = [
+    ('market_name', 'market_name', 'last'),
+    ('address', 'address_address_1', 'last'),
+    ('city', 'address_city', 'last'),
+    ('state', 'address_state', 'last'),
+    ('zip_code', 'address_zip_code', 'last'),
+    ('latitude', 'map_location_latitude', 'last'),
+    ('longitude', 'map_location_longitude', 'last'),
+    ('beds', 'beds', 'last'),
+    ('baths', 'baths', 'last'),
+    ('square_footage', 'square_footage', 'last'),
+    ('first_pull_date', 'valid_from', 'first'),
+    ('last_pull_date', 'valid_to', 'last'),
+    ('latest_status', 'status', 'last'),
+    ('date_vacated', 'date_vacated', 'last'),
+    ('date_available', 'date_available', 'last'),
+    ('available_on', 'available_on', 'last'),
+    ('beginning_rent', 'rent', 'first'),
+    ('latest_rent', 'rent', 'last'),
+    ('beginning_total_monthly_rent', 'total_monthly_rent', 'first'),
+    ('latest_total_monthly_rent', 'total_monthly_rent', 'last'),
+]
+
+# Periods the clearance rate trend is computed for when the data loads
+CLEARANCE_TREND_FREQUENCIES = ['D', 'W', 'M']
+
+# How far comparable homes can differ from the subject home: beds, baths and fraction of square footage
+COMPARABLE_BEDS = 1
+COMPARABLE_BATHS = 1
+COMPARABLE_SQUARE_FOOTAGE = 0.2
+
+# Bytes of terms JSON parsed per block, well under the 2 GB a binary buffer's 32-bit offsets can address
+LEASE_TERMS_BLOCK_BYTES = 256 * 1024 * 1024
+
+# Latest statuses counted by each clearance rate
+CLEARANCE_GROUPS = {
+    'Pre-lease': ['Notice Unrented', 'Vacant Unrented Not Ready'],
+    'Rent Ready': ['Vacant Unrented Ready'],
+}
 
 
 def get_service_account_info(local=False):
@@ -12,183 +115,531 @@ def get_service_account_info(local=False):
     return service_account_info
 
 
-@st.cache_data
-def get_invitation_homes_data(_credentials):
-    query = """
+@st.cache_resource
+def get_warehouse(local=False):
+    if os.environ.get('WAREHOUSE') == 'duckdb':
+        return DuckDBWarehouse(os.environ.get('DUCKDB_PATH', 'local.duckdb'), read_only=True)
+    credentials = service_account.Credentials.from_service_account_info(get_service_account_info(local))
+    return BigQueryWarehouse(project=credentials.project_id, credentials=credentials)
+
+
+@dataset(ttl=timedelta(hours=6))
+def get_invitation_homes_data(_warehouse):
+    ih_listing_df, ih_market_cycle_df, ih_cycle_state_df, watermark = load_cached_history()
+    query = f"""
         SELECT 
-            *,
-            DATE(pull_timestamp) AS pull_date
+            property_id,
+            pull_timestamp,
+            DATE(pull_timestamp) AS pull_date,
+            {', '.join(json_field_sql(*field) for field in PROPERTY_FIELDS)}
         FROM `homevest-data.sfr_rental_listings.invh_raw`
-        ORDER BY property_id, pull_timestamp
+        WHERE TIMESTAMP(pull_timestamp) > TIMESTAMP(@watermark)
     """
-    # Load raw data
-    ih_raw_df = pd.read_gbq(query, credentials=_credentials)
-    ih_property_df = parse_properties(ih_raw_df)
-    ih_lease_terms_df = parse_lease_terms(ih_raw_df)
+    # Load raw data newer than the cached history, sorted here so the download can use parallel streams. Pulls
+    # are stamped with different UTC offsets, so they are compared as times rather than as strings
+    ih_raw_df = _warehouse.query_df(query, {'watermark': watermark})
+    pulled_at = pd.to_datetime(ih_raw_df['pull_timestamp'], utc=True, format='ISO8601')
+    ih_raw_df = ih_raw_df.assign(pulled_at=pulled_at).sort_values(['property_id', 'pulled_at'], ignore_index=True)
+
+    # The latest pull may still be inserting rows, so it is parsed but not cached
+    latest_pulled_at = ih_raw_df['pulled_at'].max()
+    closed_raw_df = ih_raw_df[ih_raw_df['pulled_at'] < latest_pulled_at].reset_index(drop=True)
+    latest_raw_df = ih_raw_df[ih_raw_df['pulled_at'] == latest_pulled_at].reset_index(drop=True)
+
+    if len(closed_raw_df):
+        closed_listing_df = compact_listings(parse_properties(closed_raw_df))
+        ih_listing_df = append_history(ih_listing_df, closed_listing_df)
+        ih_market_cycle_df, ih_cycle_state_df = advance_market_cycles(
+            ih_market_cycle_df, ih_cycle_state_df, closed_listing_df, ih_listing_df
+        )
+        save_cached_history(
+            ih_listing_df, ih_market_cycle_df, ih_cycle_state_df,
+            closed_raw_df['pull_timestamp'].iloc[closed_raw_df['pulled_at'].argmax()]
+        )
+    if len(latest_raw_df):
+        latest_listing_df = compact_listings(parse_properties(latest_raw_df))
+        ih_listing_df = append_history(ih_listing_df, latest_listing_df)
+        ih_market_cycle_df, _ = advance_market_cycles(
+            ih_market_cycle_df, ih_cycle_state_df, latest_listing_df, ih_listing_df
+        )
+    if ih_listing_df is None:
+        # No history and no pulls yet, so every view starts from empty frames with the parsed columns
+        ih_listing_df = compact_listings(parse_properties(ih_raw_df))
+        ih_market_cycle_df, _ = get_market_cycles(ih_listing_df)
+
+    return (
+        ih_listing_df,
+        ih_market_cycle_df,
+        PresenceIndex.from_intervals(ih_listing_df),
+        CycleIndex.from_cycles(ih_market_cycle_df),
+        LocationIndex.from_cycles(ih_market_cycle_df),
+        # Trends and sketches cover the whole history, so they are built once per load rather than per rerun
+        {freq: get_clearance_rate_trend(ih_market_cycle_df, freq) for freq in CLEARANCE_TREND_FREQUENCIES},
+        get_rented_home_sketches(get_market_cycle_data(ih_market_cycle_df)),
+    )
 
-    return ih_property_df, ih_lease_terms_df
+
+@dataset(ttl=timedelta(hours=6))
+def get_invitation_homes_lease_terms(_warehouse):
+    """ Lease terms offered on each pull, loaded only by views that use them """
+    query = """
+        SELECT 
+            property_id,
+            DATE(pull_timestamp) AS pull_date,
+            TO_JSON_STRING(JSON_QUERY(data, '$.terms')) AS terms
+        FROM `homevest-data.sfr_rental_listings.invh_raw`
+    """
+    return parse_lease_terms(_warehouse.query_arrow(query))
+
+
+def load_cached_history():
+    """ Listing intervals, their market cycles and the last pull_timestamp they cover, or empty if there is no cache """
+    try:
+        with open(os.path.join(HISTORY_CACHE_DIR, 'manifest.json')) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != HISTORY_CACHE_VERSION:
+            return None, None, None, EMPTY_HISTORY_WATERMARK
+        return (
+            _read_cached_frame(os.path.join(HISTORY_CACHE_DIR, manifest['listings'])),
+            _read_cached_frame(os.path.join(HISTORY_CACHE_DIR, manifest['market_cycles'])),
+            _read_cached_frame(os.path.join(HISTORY_CACHE_DIR, manifest['cycle_state'])),
+            manifest['watermark']
+        )
+    except (FileNotFoundError, KeyError, ValueError):
+        return None, None, None, EMPTY_HISTORY_WATERMARK
+
+
+def _read_cached_frame(path):
+    """ Cached frame with strings read back as the Arrow-backed strings of query results, which parquet doesn't keep """
+    def string_dtype(arrow_type):
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            return pd.StringDtype('pyarrow', na_value=np.nan)
+        return None
+
+    return pq.read_table(path).to_pandas(types_mapper=string_dtype)
+
+
+def save_cached_history(ih_listing_df, ih_market_cycle_df, ih_cycle_state_df, watermark):
+    """ Write new files, then swap the manifest so readers never see a partial cache """
+    os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+    manifest_path = os.path.join(HISTORY_CACHE_DIR, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            previous_files = [name for key, name in json.load(f).items() if key not in ('watermark', 'version')]
+    except (FileNotFoundError, ValueError):
+        previous_files = []
+
+    version = uuid.uuid4().hex
+    manifest = {
+        'listings': f'listings-{version}.parquet',
+        'market_cycles': f'market_cycles-{version}.parquet',
+        'cycle_state': f'cycle_state-{version}.parquet',
+        'watermark': watermark,
+        'version': HISTORY_CACHE_VERSION
+    }
+    ih_listing_df.to_parquet(os.path.join(HISTORY_CACHE_DIR, manifest['listings']), index=False)
+    ih_market_cycle_df.to_parquet(os.path.join(HISTORY_CACHE_DIR, manifest['market_cycles']), index=False)
+    ih_cycle_state_df.to_parquet(os.path.join(HISTORY_CACHE_DIR, manifest['cycle_state']), index=False)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    for previous_file in previous_files:
+        try:
+            os.remove(os.path.join(HISTORY_CACHE_DIR, previous_file))
+        except FileNotFoundError:
+            pass
+
+
+def append_history(history_df, new_df):
+    """ Append newer intervals, keeping rows ordered by property_id then valid_from """
+    if history_df is None:
+        return new_df
+    # New rows are all later than the history, so a stable sort on property_id keeps pull order
+    appended_df = pd.concat([history_df, new_df], ignore_index=True).sort_values('property_id', kind='stable', ignore_index=True)
+    # A property's first new interval may continue its last cached one
+    return compact_listings(appended_df)
+
+
+def compact_listings(ih_listing_df):
+    """ Merge each property's consecutive intervals that have the same attributes and no missed day between them """
+    if ih_listing_df.empty:
+        return ih_listing_df
+    valid_from = pd.to_datetime(ih_listing_df['valid_from']).to_numpy('datetime64[D]').astype(np.int64)
+    valid_to = pd.to_datetime(ih_listing_df['valid_to']).to_numpy('datetime64[D]').astype(np.int64)
+
+    # Every day inside an interval had a pull, so cycle gaps and status changes fall on interval edges
+    continues = np.r_[False, valid_from[1:] - valid_to[:-1] <= 1]
+    for column in LISTING_ATTRIBUTES:
+        codes, _ = pd.factorize(ih_listing_df[column])
+        continues[1:] &= codes[1:] == codes[:-1]
+
+    starts = np.flatnonzero(~continues)
+    ends = np.append(starts[1:], len(ih_listing_df)) - 1
+    compacted_df = ih_listing_df.iloc[starts].reset_index(drop=True)
+    compacted_df['valid_to'] = ih_listing_df['valid_to'].iloc[ends].reset_index(drop=True)
+    return compacted_df
+
+
+def json_field_sql(name, path, field_type):
+    """ Extract one scalar from the data JSON in the query, typed like the old client-side parse """
+    value = f"JSON_VALUE(data, '{path}')"
+    if field_type == 'DATE':
+        # ISO timestamps like '2025-08-06T00:00:00.000Z' keep their UTC calendar date
+        value = f"SUBSTR({value}, 1, 10)"
+    if field_type != 'STRING':
+        # A value that doesn't parse as its type is NULL rather than an error for the whole query
+        value = f"SAFE_CAST({value} AS {field_type})"
+    return f"{value} AS {name}"
 
 
 def parse_properties(ih_raw_data):
-    ih_property_raw_data = pd.json_normalize(
-        ih_raw_data['data'].apply(json.loads),
-        sep='_'
-    )
-    ih_property_raw_data['pull_date'] = ih_raw_data['pull_date']
-    columns = [
-        'pull_date', 
-        'property_id', 
-        'slug', 
-        'market_name',
-        'address_address_1',
-        'address_city',
-        'address_state',
-        'address_zip_code',
-        'map_location_latitude',
-        'map_location_longitude',
-        'status', 
-        'available_on',
-        'beds', 
-        'baths', 
-        'square_footage',
-        'rent', 
-        'total_monthly_rent',
-        'is_application_enabled', 
-        'is_self_show_enabled',
-        'is_new_construction', 
-        'is_on_special',
-        'is_btr_community', 
-        'is_exclusive',
-        'is_featured_listing', 
-        'is_model_home',
-        'has_virtual_tour', 
-        'application_url'
-        ]
-    ih_property_data = ih_property_raw_data[columns]
-
-    # Convert types
-    numeric_cols = ['beds', 'baths', 'square_footage', 'rent', 'total_monthly_rent']
-    for col in numeric_cols:
-        ih_property_data[col] = pd.to_numeric(ih_property_data[col])
-
-    ih_property_data['available_on'] = pd.to_datetime(ih_property_data['available_on']).dt.tz_localize(None).dt.date
-    
+    # Fields are already extracted and typed by the query; each pull starts as a one-day interval
+    ih_property_data = ih_raw_data[PROPERTY_COLUMNS].rename(columns={'pull_date': 'valid_from'})
+    ih_property_data.insert(1, 'valid_to', ih_property_data['valid_from'])
+
+    # Keep the dtypes of the old client-side parse, which had available_on as date objects
+    for name in WHOLE_NUMBER_FIELDS:
+        values = ih_property_data[name].astype('float64')
+        if values.notna().all() and (values % 1 == 0).all():
+            values = values.astype('int64')
+        ih_property_data[name] = values
+    # Missing dates are None, as they read back from the history cache
+    available_on = ih_property_data['available_on'].astype(object)
+    ih_property_data['available_on'] = available_on.where(available_on.notna(), None)
     return ih_property_data
 
 
-def parse_lease_terms(ih_raw_data):
-    ih_lease_terms_data = pd.json_normalize(ih_raw_data.apply(
-            lambda row: [
-                {
-                    'property_id': row.property_id,
-                    'pull_date': row.pull_date,
-                    **term
-                } 
-                for term in json.loads(row.data)['terms']
-            ], axis=1
-        ).explode()
-    )
+def parse_lease_terms(ih_terms_data):
+    """ One row per offered term, flattened column-wise from the terms JSON of each pull """
+    ih_terms_data = ih_terms_data.filter(pc.is_valid(ih_terms_data['terms']))
+    ih_terms_data = ih_terms_data.take(pc.sort_indices(ih_terms_data, [('property_id', 'ascending'), ('pull_date', 'ascending')]))
+    if ih_terms_data.num_rows == 0:
+        return pd.DataFrame(columns=['property_id', 'pull_date'])
+
+    # Pulls split into blocks of about LEASE_TERMS_BLOCK_BYTES; blocks whose types differ (say a term field that is
+    # null throughout one block) are promoted to a common type when put back together
+    line_ends = np.cumsum(pc.binary_length(ih_terms_data['terms']).to_numpy() + len('{"terms": }\n'))
+    starts = np.r_[0, np.flatnonzero(np.diff(line_ends // LEASE_TERMS_BLOCK_BYTES)) + 1]
+    stops = np.append(starts[1:], ih_terms_data.num_rows)
+    return arrow_to_df(pa.concat_tables(
+        [_flatten_lease_terms(ih_terms_data.slice(start, stop - start)) for start, stop in zip(starts, stops)],
+        promote_options='permissive'
+    ))
+
+
+def _flatten_lease_terms(ih_terms_data):
+    """ Parse a block of terms arrays in one pass as newline-delimited JSON, then repeat each pull's keys once per
+    term with the term fields alongside """
+    lines = pc.binary_join_element_wise('{"terms": ', ih_terms_data['terms'].combine_chunks(), '}', '')
+    ndjson = pc.binary_join(pa.ListArray.from_arrays([0, len(lines)], lines), '\n')[0].as_buffer()
+    terms = pyarrow.json.read_json(
+        pa.BufferReader(ndjson),
+        read_options=pyarrow.json.ReadOptions(block_size=ndjson.size + 1)
+    ).column('terms').combine_chunks()
+
+    ih_lease_terms_data = ih_terms_data.select(['property_id', 'pull_date']).take(pc.list_parent_indices(terms))
+    flat_terms = pc.list_flatten(terms)
+    if pa.types.is_struct(flat_terms.type):
+        for field, values in zip(flat_terms.type, flat_terms.flatten()):
+            ih_lease_terms_data = ih_lease_terms_data.append_column(field.name, values)
     return ih_lease_terms_data
 
 
-def get_market_cycle_data(ih_property_df):
-    # Get latest market cycle data
-    df = ih_property_df.copy()
-    row_id_group = ['slug', 'cycle_id']
-    market_cycle_df = get_market_cycle(df)
-    date_vacated_df = get_date_vacated(market_cycle_df, row_id_group)
-    date_available_df = get_date_available(date_vacated_df, row_id_group)
-
-    grouped_df = date_available_df.groupby(['slug', 'cycle_id', 'property_id'])
-    ih_property_cycle_df = pd.DataFrame({
-        'market_name': grouped_df['market_name'].last(), 
-        'address': grouped_df['address_address_1'].last(), 
-        'city': grouped_df['address_city'].last(), 
-        'state': grouped_df['address_state'].last(), 
-        'zip_code': grouped_df['address_zip_code'].last(), 
-        'beds': grouped_df['beds'].last(), 
-        'baths': grouped_df['baths'].last(), 
-        'square_footage': grouped_df['square_footage'].last(),
-        'first_pull_date': grouped_df['pull_date'].first(),
-        'last_pull_date': grouped_df['pull_date'].last(), 
-        "latest_status": grouped_df['status'].last(),
-        "date_vacated": grouped_df['date_vacated'].last(),
-        'date_available': grouped_df['date_available'].last(),
-        "available_on": grouped_df['available_on'].last(),
-        'beginning_rent': grouped_df['rent'].first(),
-        'latest_rent': grouped_df['rent'].last(), 
-        "beginning_total_monthly_rent": grouped_df['total_monthly_rent'].first(),
-        "latest_total_monthly_rent": grouped_df['total_monthly_rent'].last()
-    }).reset_index()
-
+def get_market_cycle_data(ih_market_cycle_df):
+    """ Market cycles with the turn and days on market measures, which change daily, as a new frame """
     today = pd.to_datetime('today').normalize()
-    ih_property_cycle_df['days_on_turn'] = (
-        pd.to_datetime(ih_property_cycle_df['available_on'].fillna(pd.Timestamp.today())) - 
-        pd.to_datetime(ih_property_cycle_df['date_vacated'])
-    ).dt.days
-    ih_property_cycle_df['vacant_leased'] = ih_property_cycle_df['last_pull_date'].apply(
-        lambda pull_date: (pd.Timestamp(pull_date) + pd.Timedelta(days=1)).date() if pd.Timestamp(pull_date) < today else None
+    last_pull_date = pd.to_datetime(ih_market_cycle_df['last_pull_date'])
+    return ih_market_cycle_df.assign(
+        days_on_turn=lambda df: (
+            pd.to_datetime(df['available_on'].fillna(pd.Timestamp.today())) - 
+            pd.to_datetime(df['date_vacated'])
+        ).dt.days,
+        vacant_leased=lambda df: pd.Series(
+            np.where(last_pull_date < today, (last_pull_date + pd.Timedelta(days=1)).dt.date, None),
+            index=df.index,
+            dtype=object
+        ),
+        days_on_market=lambda df: (
+            pd.to_datetime(df['vacant_leased'].fillna(pd.Timestamp.today())) - 
+            pd.to_datetime(df['available_on'])
+        ).dt.days
     )
-    ih_property_cycle_df['days_on_market'] = (
-        pd.to_datetime(ih_property_cycle_df['vacant_leased'].fillna(pd.Timestamp.today())) - 
-        pd.to_datetime(ih_property_cycle_df['available_on'])
-    ).dt.days
-    
-    return ih_property_cycle_df
-
-
-def get_market_cycle(ih_property_df):
-    """ Filter out rows for previous on market cycles """
-    market_cycle_df = ih_property_df.copy()
-    # Calculate date gaps
-    market_cycle_df['prev_date'] = market_cycle_df.groupby('slug')['pull_date'].shift()
-    market_cycle_df['gap'] = (market_cycle_df['pull_date'] - market_cycle_df['prev_date']).dt.days
 
-    # Mark cycle id
-    market_cycle_df['new_cycle'] = (market_cycle_df['gap'] > 14) | market_cycle_df['gap'].isna()
-    market_cycle_df['cycle_id'] = market_cycle_df.groupby('slug')['new_cycle'].cumsum()
 
-    return market_cycle_df[list(ih_property_df.columns) + ['cycle_id']]
-
-
-def get_date_vacated(ih_property_df, row_id_group):
-    """ Date status turned from 'Notice Unrented' to 'Vacant Unrented Not Ready' """
-    date_vacated_df = ih_property_df.copy()
-
-    # Find rows where status changed from 'Notice Unrented' to 'Vacant Unrented Not Ready'
-    date_vacated_df['prev_status'] = date_vacated_df.groupby(row_id_group)['status'].shift()
-    date_vacated_df['date_vacated_bool'] = (date_vacated_df['status'] == 'Vacant Unrented Not Ready') & (date_vacated_df['prev_status'] == 'Notice Unrented')
-
-    # Get date vacated
-    vacated_dates = (
-        date_vacated_df[date_vacated_df['date_vacated_bool']]
-        .groupby(row_id_group)['pull_date']
-        .last()
-        .rename('date_vacated')
+def get_clearance_rate_trend(ih_market_cycle_df, freq='D'):
+    """ Clearance rates of every period in the history, per market and for all markets, in one pass over cycle events """
+    group_names = list(CLEARANCE_GROUPS)
+    status_groups = {status: code for code, statuses in enumerate(CLEARANCE_GROUPS.values()) for status in statuses}
+    status_codes, statuses = pd.factorize(ih_market_cycle_df['latest_status'])
+    group_codes = np.append([status_groups.get(status, -1) for status in statuses], -1)[status_codes]
+    cycles = ih_market_cycle_df[group_codes >= 0]
+    group_codes = group_codes[group_codes >= 0]
+    market_codes, markets = pd.factorize(cycles['market_name'])
+    # Cycles without a market get a slot of their own, counted only towards all markets
+    market_codes = np.where(market_codes >= 0, market_codes, len(markets))
+    # astype converts dbdate columns directly, where to_datetime boxes every date
+    first_days = cycles['first_pull_date'].astype('datetime64[ns]').to_numpy('datetime64[D]')
+    last_days = cycles['last_pull_date'].astype('datetime64[ns]').to_numpy('datetime64[D]')
+    if len(cycles) == 0:
+        return pd.DataFrame(columns=['period', 'market_name', 'status_group', 'listings', 'leased', 'clearance_rate'])
+
+    periods = pd.period_range(first_days.min(), last_days.max(), freq=freq)
+    period_starts = periods.start_time.to_numpy('datetime64[D]')
+    period_ends = periods.end_time.to_numpy('datetime64[D]')
+    # Period of each day in the history, so events find their period with a lookup
+    day_periods = np.repeat(np.arange(len(periods)), (period_ends - period_starts).astype(np.int64) + 1)
+    first_periods = day_periods[(first_days - period_starts[0]).astype(np.int64)]
+    last_periods = day_periods[(last_days - period_starts[0]).astype(np.int64)]
+
+    # Start and end events counted per (market, group, period), then swept across periods with a running sum
+    shape = (len(markets) + 1, len(group_names), len(periods))
+    keys = (market_codes * len(group_names) + group_codes) * len(periods)
+
+    def tally(event_periods, mask=slice(None)):
+        return np.bincount(keys[mask] + event_periods[mask], minlength=np.prod(shape)).reshape(shape)
+
+    started = tally(first_periods).cumsum(axis=2)
+    ended = tally(last_periods).cumsum(axis=2)
+    ended_before = np.concatenate([np.zeros(shape[:2] + (1,), dtype=ended.dtype), ended[:, :, :-1]], axis=2)
+    # Leased the day after the last pull, so within its period unless that is the period's last day
+    today = np.datetime64(pd.to_datetime('today').normalize(), 'D')
+    leased = tally(last_periods, (last_days < period_ends[last_periods]) & (last_days < today))
+    listings = started - ended_before
+    listings = np.concatenate([listings[:-1], listings.sum(axis=0, keepdims=True)])
+    leased = np.concatenate([leased[:-1], leased.sum(axis=0, keepdims=True)])
+    markets = list(markets) + ['All']
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        clearance_rate = np.where(listings > 0, leased * 100 / listings, np.nan)
+    return pd.DataFrame({
+        'period': np.tile(periods.start_time.date, len(markets) * len(group_names)),
+        'market_name': np.repeat(markets, len(group_names) * len(periods)),
+        'status_group': np.tile(np.repeat(group_names, len(periods)), len(markets)),
+        'listings': listings.ravel(),
+        'leased': leased.ravel(),
+        'clearance_rate': clearance_rate.ravel(),
+    })
+
+
+def get_rented_home_sketches(ih_property_cycle_df):
+    """ Quantile sketches of each measure for homes rented in each market and week, to merge over any range """
+    rented_df = ih_property_cycle_df[ih_property_cycle_df['vacant_leased'].notna().to_numpy()]
+    leased_on = rented_df['last_pull_date'].astype('datetime64[ns]') + pd.Timedelta(days=1)
+    groups = pd.DataFrame({
+        'market_name': rented_df['market_name'].to_numpy(),
+        'week': leased_on.dt.to_period('W').dt.start_time.dt.date.to_numpy(),
+    })
+    measures = {
+        'days_on_market': rented_df['days_on_market'],
+        'days_on_turn': rented_df['days_on_turn'],
+        'rent_change': rented_df['latest_rent'] - rented_df['beginning_rent'],
+    }
+    return {name: QuantileSketch.from_values(values, groups) for name, values in measures.items()}
+
+
+def get_comparable_homes(ih_property_cycle_df, ih_location_index, subject_df, miles):
+    """ Cycles of other homes within miles of each subject with similar beds, baths and square footage """
+    subjects, positions, distances = ih_location_index.within(
+        subject_df['latitude'].to_numpy(dtype=float, na_value=np.nan),
+        subject_df['longitude'].to_numpy(dtype=float, na_value=np.nan),
+        miles
     )
-    date_vacated_df = date_vacated_df.merge(vacated_dates, on=row_id_group, how='left')
-    return date_vacated_df[list(ih_property_df.columns) + ['date_vacated']]
-
-
-def get_date_available(ih_property_df, row_id_group):
-    """ Date status turned from 'Notice Unrented' to 'Vacant Unrented Not Ready' """
-    date_available_df = ih_property_df.copy()
-
-    # Find rows where status changed from 'Notice Unrented' to 'Vacant Unrented Not Ready'
-    date_available_df['prev_status'] = date_available_df.groupby(row_id_group)['status'].shift()
-    date_available_df['date_available_bool'] = (date_available_df['status'] == 'Vacant Unrented Ready') & (date_available_df['prev_status'] == 'Vacant Unrented Not Ready')
-
-    # Get date available
-    available_dates = (
-        date_available_df[date_available_df['date_available_bool']]
-        .groupby(row_id_group)['pull_date']
-        .last()
-        .rename('date_available')
+    comparable_df = ih_property_cycle_df.iloc[positions].reset_index(drop=True)
+    subject_values = subject_df.iloc[subjects].reset_index(drop=True)
+
+    # Attributes missing on the subject don't narrow its comparables
+    similar = (comparable_df['slug'] != subject_values['slug']).fillna(True).to_numpy()
+    for column, tolerance in [('beds', COMPARABLE_BEDS), ('baths', COMPARABLE_BATHS)]:
+        difference = (comparable_df[column] - subject_values[column]).abs()
+        similar = similar & ((difference <= tolerance) | subject_values[column].isna()).to_numpy()
+    difference = (comparable_df['square_footage'] - subject_values['square_footage']).abs()
+    similar = similar & (
+        (difference <= subject_values['square_footage'] * COMPARABLE_SQUARE_FOOTAGE) | subject_values['square_footage'].isna()
+    ).to_numpy()
+
+    comparable_df.insert(0, 'subject', subject_df.index[subjects])
+    comparable_df.insert(1, 'distance_miles', distances)
+    return comparable_df[similar].sort_values(['subject', 'distance_miles'], ignore_index=True)
+
+
+def advance_market_cycles(ih_market_cycle_df, ih_cycle_state_df, new_listing_df, ih_listing_df):
+    """ Advance market cycles with intervals newer than the state, recomputing only the slugs they list """
+    if ih_market_cycle_df is None:
+        return get_market_cycles(ih_listing_df)
+
+    batch_cycle_df, batch_state_df = get_market_cycles(new_listing_df)
+    batch_state_df = batch_state_df.set_index('slug')
+    prior_state_df = ih_cycle_state_df.set_index('slug').reindex(batch_state_df.index)
+    known = prior_state_df['cycle_id'].notna()
+
+    # A slug listed under several property ids interleaves their pulls, so it is rebuilt from its history
+    rebuild = known & (
+        prior_state_df['property_id'].isna() | batch_state_df['property_id'].isna() |
+        (prior_state_df['property_id'] != batch_state_df['property_id'])
     )
-    date_available_df = date_available_df.merge(available_dates, on=row_id_group, how='left')
-    return date_available_df[list(ih_property_df.columns) + ['date_available']]
-
-
-
-
+    advance = ~rebuild
 
+    # The batch's first cycle continues the current one unless the slug was off the site for a while
+    gap = (
+        pd.to_datetime(batch_state_df['first_pull_date']) - pd.to_datetime(prior_state_df['last_pull_date'])
+    ).dt.days
+    continues = known & advance & (gap <= CYCLE_GAP_DAYS)
+    # Cast back since the reindex made the ids float, so they match a full recompute
+    offset = (prior_state_df['cycle_id'].fillna(0) - continues).astype(batch_state_df['cycle_id'].dtype)
+    batch_cycle_df['cycle_id'] = batch_cycle_df['cycle_id'] + batch_cycle_df['slug'].map(offset).to_numpy()
+    batch_state_df['cycle_id'] = batch_state_df['cycle_id'] + offset
+
+    # Status transitions between the last known pull and the batch's first pull
+    boundary_dates = pd.DataFrame({
+        'date_vacated': batch_state_df['first_pull_date'].where(
+            continues & (prior_state_df['last_status'] == 'Notice Unrented') &
+            (batch_state_df['first_status'] == 'Vacant Unrented Not Ready')
+        ),
+        'date_available': batch_state_df['first_pull_date'].where(
+            continues & (prior_state_df['last_status'] == 'Vacant Unrented Not Ready') &
+            (batch_state_df['first_status'] == 'Vacant Unrented Ready')
+        ),
+    })
+
+    # Merge the continued cycles with their existing rows, then replace those rows
+    keys = ['slug', 'cycle_id', 'property_id']
+    batch_cycle_df = batch_cycle_df[batch_cycle_df['slug'].map(advance).to_numpy()].reset_index(drop=True)
+    continued = (
+        batch_cycle_df['slug'].map(continues).to_numpy() &
+        (batch_cycle_df['cycle_id'] == batch_cycle_df['slug'].map(prior_state_df['cycle_id'])).to_numpy()
+    )
+    existing_df = batch_cycle_df[keys].merge(ih_market_cycle_df, on=keys, how='left')
+    for name, _, how in CYCLE_COLUMNS:
+        batch_values = batch_cycle_df[name]
+        if name in boundary_dates:
+            boundary_values = batch_cycle_df['slug'].map(boundary_dates[name]).where(continued)
+            batch_values = batch_values.where(batch_values.notna(), boundary_values)
+        if how == 'first':
+            batch_cycle_df[name] = existing_df[name].where(existing_df[name].notna(), batch_values)
+        else:
+            batch_cycle_df[name] = batch_values.where(batch_values.notna(), existing_df[name])
+
+    rebuild_slugs = batch_state_df.index[rebuild]
+    rebuilt_cycle_df, rebuilt_state_df = get_market_cycles(ih_listing_df[ih_listing_df['slug'].isin(rebuild_slugs)])
+    replaced = (
+        ih_market_cycle_df['slug'].isin(rebuild_slugs) |
+        pd.MultiIndex.from_frame(ih_market_cycle_df[keys]).isin(
+            pd.MultiIndex.from_frame(batch_cycle_df.loc[continued, keys])
+        )
+    )
+    ih_market_cycle_df = pd.concat(
+        [ih_market_cycle_df[~replaced], batch_cycle_df, rebuilt_cycle_df], ignore_index=True
+    ).sort_values(keys, ignore_index=True)
+
+    ih_cycle_state_df = pd.concat([
+        ih_cycle_state_df[~ih_cycle_state_df['slug'].isin(batch_state_df.index)],
+        batch_state_df[advance].reset_index(),
+        rebuilt_state_df
+    ], ignore_index=True)
+    return ih_market_cycle_df, ih_cycle_state_df
+
+
+def get_market_cycles(ih_listing_df):
+    """ One row per slug, on-market cycle and property, and each slug's latest state, in one pass over the intervals """
+    slug_codes, _ = pd.factorize(ih_listing_df['slug'], sort=True)
+    property_codes, _ = pd.factorize(ih_listing_df['property_id'], sort=True)
+
+    # Group rows by slug, keeping pull order within each slug; rows without a slug are dropped like in groupby
+    rows = np.argsort(slug_codes, kind='stable')
+    has_missing_slug = len(rows) and slug_codes[rows[0]] < 0
+    rows = rows[slug_codes[rows] >= 0]
+    slug_codes = slug_codes[rows]
+    from_days = pd.to_datetime(ih_listing_df['valid_from']).to_numpy('datetime64[D]').astype(np.int64)[rows]
+    to_days = pd.to_datetime(ih_listing_df['valid_to']).to_numpy('datetime64[D]').astype(np.int64)[rows]
+    status = ih_listing_df['status'].to_numpy(dtype=object, na_value=None)[rows]
+
+    # Cycles start at a slug's first pull or after a gap since its previous interval
+    new_slug = np.diff(slug_codes, prepend=-1) != 0
+    # The first row's wrapped-around gap is ignored since it starts a slug anyway
+    new_cycle = new_slug | (from_days - np.roll(to_days, 1) > CYCLE_GAP_DAYS)
+    cycle_starts = np.flatnonzero(new_cycle)
+    cycle_of_row = np.cumsum(new_cycle) - 1
+    cycles_before_slug = np.maximum.accumulate(np.where(new_slug, cycle_of_row, 0))
+    cycle_ids = cycle_of_row - cycles_before_slug + 1
+    if has_missing_slug:
+        # Missing slugs used to get a NaN cycle id, which made the column float
+        cycle_ids = cycle_ids.astype(float)
+
+    # Last status transition in each cycle, as a row position or -1; statuses only change between intervals
+    prev_status = np.r_[None, status[:-1]]
+    position = np.arange(len(rows))
+    vacated = ~new_cycle & (status == 'Vacant Unrented Not Ready') & (prev_status == 'Notice Unrented')
+    available = ~new_cycle & (status == 'Vacant Unrented Ready') & (prev_status == 'Vacant Unrented Not Ready')
+    vacated_rows = _segment_reduce(np.maximum, np.where(vacated, position, -1), cycle_starts)
+    available_rows = _segment_reduce(np.maximum, np.where(available, position, -1), cycle_starts)
+
+    # Output groups are (slug, cycle, property), each sorted; rows without a property_id are dropped
+    order = np.lexsort((property_codes[rows], cycle_of_row))
+    order = order[property_codes[rows][order] >= 0]
+    group_keys = np.c_[cycle_of_row[order], property_codes[rows][order]]
+    group_starts = np.flatnonzero((np.diff(group_keys, axis=0, prepend=-1) != 0).any(axis=1))
+    group_rows = rows[order]
+    group_cycles = cycle_of_row[order][group_starts]
+
+    # Transition dates are per cycle, so they are taken from the cycle's row rather than each group's rows
+    valid_from = ih_listing_df['valid_from']
+    valid_to = ih_listing_df['valid_to']
+    columns = {
+        'date_vacated': _take(valid_from, _take_rows(rows, vacated_rows[group_cycles])),
+        'date_available': _take(valid_from, _take_rows(rows, available_rows[group_cycles])),
+    }
+    ih_market_cycle_df = pd.DataFrame({
+        'slug': _take(ih_listing_df['slug'], group_rows[group_starts]),
+        'cycle_id': cycle_ids[order][group_starts],
+        'property_id': _take(ih_listing_df['property_id'], group_rows[group_starts]),
+    })
+    group_position = np.arange(len(order))
+    for name, source, how in CYCLE_COLUMNS:
+        if source in columns:
+            ih_market_cycle_df[name] = columns[source]
+            continue
+        values = ih_listing_df[source]
+        valid = ~values.isna().to_numpy()[group_rows]
+        if how == 'first':
+            picked = _segment_reduce(np.minimum, np.where(valid, group_position, len(order)), group_starts)
+            picked[picked == len(order)] = -1
+        else:
+            picked = _segment_reduce(np.maximum, np.where(valid, group_position, -1), group_starts)
+        ih_market_cycle_df[name] = _take(values, _take_rows(group_rows, picked))
+
+    # Each slug's first and last pull, used to continue its cycles with newer pulls
+    slug_starts = np.flatnonzero(new_slug)
+    slug_ends = np.append(slug_starts[1:], len(rows))[:len(slug_starts)] - 1
+    lowest_property = _segment_reduce(np.minimum, property_codes[rows], slug_starts)
+    highest_property = _segment_reduce(np.maximum, property_codes[rows], slug_starts)
+    single_property = (lowest_property >= 0) & (lowest_property == highest_property)
+    ih_cycle_state_df = pd.DataFrame({
+        'slug': _take(ih_listing_df['slug'], rows[slug_starts]),
+        'property_id': _take(ih_listing_df['property_id'], np.where(single_property, rows[slug_starts], -1)),
+        'cycle_id': cycle_ids[slug_ends],
+        'first_pull_date': _take(valid_from, rows[slug_starts]),
+        'first_status': _take(ih_listing_df['status'], rows[slug_starts]),
+        'last_pull_date': _take(valid_to, rows[slug_ends]),
+        'last_status': _take(ih_listing_df['status'], rows[slug_ends]),
+    })
+
+    return ih_market_cycle_df, ih_cycle_state_df
+
+
+def _segment_reduce(ufunc, values, starts):
+    """ ufunc over each run of values beginning at starts """
+    if len(values) == 0:
+        return values
+    return ufunc.reduceat(values, starts)
+
+
+def _take_rows(rows, positions):
+    """ Map positions to rows, keeping -1 as missing """
+    return np.where(positions >= 0, rows[positions], -1)
+
+
+def _take(column, rows):
+    """ Column values at rows with -1 as missing, keeping the column's dtype """
+    values = column.array if isinstance(column.dtype, pd.api.extensions.ExtensionDtype) else column.to_numpy()
+    return pd.api.extensions.take(values, rows, allow_fill=True)
@@ -0,0 +1,77 @@
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE = np.pi * EARTH_RADIUS_MILES / 180
+# Grid cell side; queries read the cells their radius reaches, so keep it near the usual search radius
+CELL_MILES = 1.0
+
+
+class LocationIndex:
+    """ Homes bucketed into a latitude/longitude grid, for radius queries checked with haversine distance """
+
+    def __init__(self, latitudes, longitudes, cell_miles=CELL_MILES):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        located = np.flatnonzero(~np.isnan(latitudes) & ~np.isnan(longitudes))
+        self.cell_degrees = cell_miles / MILES_PER_DEGREE
+
+        self.lat_cells = np.floor(latitudes[located] / self.cell_degrees).astype(np.int64)
+        self.lon_cells = np.floor(longitudes[located] / self.cell_degrees).astype(np.int64)
+        self.min_lon_cell = int(self.lon_cells.min()) if len(located) else 0
+        self.num_lon_cells = int(self.lon_cells.max()) - self.min_lon_cell + 1 if len(located) else 1
+
+        # Homes ordered by cell, so each grid row's cells within a radius are one contiguous range
+        cell_keys = self._cell_keys(self.lat_cells, self.lon_cells)
+        order = np.argsort(cell_keys, kind='stable')
+        self.cell_keys = cell_keys[order]
+        self.positions = located[order]
+        self.latitudes = latitudes[self.positions]
+        self.longitudes = longitudes[self.positions]
+
+    @classmethod
+    def from_cycles(cls, ih_market_cycle_df):
+        return cls(ih_market_cycle_df['latitude'], ih_market_cycle_df['longitude'])
+
+    def _cell_keys(self, lat_cells, lon_cells):
+        return lat_cells * self.num_lon_cells + (lon_cells - self.min_lon_cell)
+
+    def within(self, latitudes, longitudes, miles):
+        """ (query, row position, miles) of every home within miles of each query point """
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+        queries = np.flatnonzero(~np.isnan(latitudes) & ~np.isnan(longitudes))
+        lat_reach = int(np.ceil(miles / MILES_PER_DEGREE / self.cell_degrees))
+        # Longitude degrees shrink towards the poles, so reach as far as the widest grid row needs
+        farthest_latitudes = np.minimum(np.abs(latitudes[queries]) + (lat_reach + 1) * self.cell_degrees, 89)
+        lon_miles_per_degree = MILES_PER_DEGREE * np.cos(np.radians(farthest_latitudes))
+        lon_reach = np.ceil(miles / lon_miles_per_degree / self.cell_degrees).astype(np.int64)
+        query_lat_cells = np.floor(latitudes[queries] / self.cell_degrees).astype(np.int64)
+        query_lon_cells = np.floor(longitudes[queries] / self.cell_degrees).astype(np.int64)
+
+        # One candidate range of the sorted homes per query and grid row
+        row_offsets = np.arange(-lat_reach, lat_reach + 1)
+        range_queries = np.repeat(queries, len(row_offsets))
+        range_lat_cells = np.repeat(query_lat_cells, len(row_offsets)) + np.tile(row_offsets, len(queries))
+        range_lon_reach = np.repeat(lon_reach, len(row_offsets))
+        range_lon_cells = np.repeat(query_lon_cells, len(row_offsets))
+        first_lon_cells = np.maximum(range_lon_cells - range_lon_reach, self.min_lon_cell)
+        last_lon_cells = np.minimum(range_lon_cells + range_lon_reach, self.min_lon_cell + self.num_lon_cells - 1)
+        starts = np.searchsorted(self.cell_keys, self._cell_keys(range_lat_cells, first_lon_cells), side='left')
+        ends = np.searchsorted(self.cell_keys, self._cell_keys(range_lat_cells, last_lon_cells), side='right')
+        ends = np.where(first_lon_cells <= last_lon_cells, ends, starts)
+
+        lengths = ends - starts
+        candidate_queries = np.repeat(range_queries, lengths)
+        candidates = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        distances = haversine_miles(
+            latitudes[candidate_queries], longitudes[candidate_queries],
+            self.latitudes[candidates], self.longitudes[candidates]
+        )
+        nearby = distances <= miles
+        return candidate_queries[nearby], self.positions[candidates[nearby]], distances[nearby]
+
+
+def haversine_miles(latitudes, longitudes, other_latitudes, other_longitudes):
+    lat1, lon1, lat2, lon2 = (np.radians(values) for values in (latitudes, longitudes, other_latitudes, other_longitudes))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1)))
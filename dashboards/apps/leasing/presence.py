@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+class PresenceIndex:
+    """ Days each slug was listed, as one bitmap per slug packed into uint64 words (bit d = start_date + d days),
+    with the listings per day for all markets and for each market """
+
+    def __init__(self, slugs, start_date, bitmaps, num_days, markets, daily_counts, market_counts):
+        self.slugs = pd.Index(slugs)
+        self.start_date = pd.Timestamp(start_date)
+        self.bitmaps = bitmaps
+        self.num_days = num_days
+        # Listings per day, so inventory lookups are a single array read
+        self.daily_counts = daily_counts
+        self.markets = pd.Index(markets)
+        self.market_counts = market_counts
+
+    @classmethod
+    def from_intervals(cls, ih_listing_df):
+        """ Build from listing intervals with slug, market_name, valid_from and valid_to; rows without a slug are skipped """
+        listings = ih_listing_df[ih_listing_df['slug'].notna()]
+        slug_codes, slugs = pd.factorize(listings['slug'], sort=True)
+        market_codes, markets = pd.factorize(listings['market_name'], sort=True)
+        from_days = pd.to_datetime(listings['valid_from']).to_numpy('datetime64[D]')
+        to_days = pd.to_datetime(listings['valid_to']).to_numpy('datetime64[D]')
+        if len(from_days) == 0:
+            return cls(
+                slugs, pd.Timestamp.today().normalize(), np.zeros((0, 0), dtype=np.uint64), 0,
+                markets, np.zeros(0, dtype=np.int64), np.zeros((len(markets), 0), dtype=np.int64)
+            )
+
+        # Every day of an interval was listed, so everything is built from the interval ends and nothing is expanded
+        # per day; a slug's overlapping intervals (say under two property ids) are merged so it counts once a day
+        start = from_days.min()
+        from_offsets = (from_days - start).astype(np.int64)
+        to_offsets = (to_days - start).astype(np.int64)
+        num_days = int(to_offsets.max()) + 1
+        run_slugs, run_from, run_to = _merge_runs(slug_codes, from_offsets, to_offsets)
+        bitmaps = _bitmaps(run_slugs, run_from, run_to, len(slugs), num_days)
+        daily_counts = _running_counts(np.zeros(len(run_from), dtype=np.int64), run_from, run_to, 1, num_days)[0]
+
+        # A slug counts once a day in the market it was listed under; days without a market only count for all markets
+        with_market = market_codes >= 0
+        run_keys, run_from, run_to = _merge_runs(
+            market_codes[with_market] * len(slugs) + slug_codes[with_market], from_offsets[with_market], to_offsets[with_market]
+        )
+        market_counts = _running_counts(run_keys // len(slugs), run_from, run_to, len(markets), num_days)
+        return cls(slugs, start, bitmaps, num_days, markets, daily_counts, market_counts)
+
+    def day_offset(self, day):
+        return (pd.Timestamp(day) - self.start_date).days
+
+    def counts(self, market=None):
+        """ Listings per day in market, or in all markets if it is None """
+        if market is None:
+            return self.daily_counts
+        if market not in self.markets:
+            return np.zeros(self.num_days, dtype=np.int64)
+        return self.market_counts[self.markets.get_loc(market)]
+
+    def inventory_on(self, day, market=None):
+        """ Number of slugs listed on day """
+        offset = self.day_offset(day)
+        return int(self.counts(market)[offset]) if 0 <= offset < self.num_days else 0
+
+    def active_inventory(self, start_date=None, end_date=None, market=None):
+        """ Number of slugs listed on each day between start_date and end_date """
+        start = max(self.day_offset(start_date), 0) if start_date is not None else 0
+        end = min(self.day_offset(end_date), self.num_days - 1) if end_date is not None else self.num_days - 1
+        days = pd.date_range(self.start_date + pd.Timedelta(days=start), periods=max(end - start + 1, 0))
+        return pd.Series(self.counts(market)[start:end + 1], index=days.date, name='listings')
+
+
+def _num_words(num_days):
+    return (num_days + 63) // 64
+
+
+def _merge_runs(codes, from_offsets, to_offsets):
+    """ Intervals merged into disjoint runs of days per code, as (codes, first days, last days) sorted by code and day """
+    order = np.lexsort((from_offsets, codes))
+    codes, from_offsets, to_offsets = codes[order], from_offsets[order], to_offsets[order]
+    if len(codes) == 0:
+        return codes, from_offsets, to_offsets
+    # Codes sort the keys, so the running max of each key only reaches back to earlier intervals of the same code
+    span = int(to_offsets.max()) + 2
+    reach = np.maximum.accumulate(codes * span + to_offsets)
+    starts = np.r_[True, (codes[1:] != codes[:-1]) | (codes[1:] * span + from_offsets[1:] > reach[:-1])]
+    ends = np.append(np.flatnonzero(starts)[1:], len(codes)) - 1
+    return codes[starts], from_offsets[starts], reach[ends] - codes[starts] * span
+
+
+def _running_counts(rows, from_offsets, to_offsets, num_rows, num_days):
+    """ Runs covering each day, per row: +1 where a run starts and -1 the day after it ends, summed along the days """
+    changes = np.zeros((num_rows, num_days + 1), dtype=np.int64)
+    np.add.at(changes, (rows, from_offsets), 1)
+    np.add.at(changes, (rows, to_offsets + 1), -1)
+    return changes.cumsum(axis=1)[:, :num_days]
+
+
+def _bitmaps(slug_codes, from_offsets, to_offsets, num_slugs, num_days):
+    """ Slug bitmaps with the bits of each run set a word at a time """
+    from_words, to_words = from_offsets >> 6, to_offsets >> 6
+    num_words = to_words - from_words + 1
+    runs = np.repeat(np.arange(len(slug_codes)), num_words)
+    words = from_words[runs] + np.arange(num_words.sum()) - np.repeat(np.cumsum(num_words) - num_words, num_words)
+    # Bits from the run's first day in its first word, through its last day in its last word
+    low = np.where(words == from_words[runs], from_offsets[runs] & 63, 0).astype(np.uint64)
+    high = np.where(words == to_words[runs], to_offsets[runs] & 63, 63).astype(np.uint64)
+    all_bits = np.uint64(0xFFFFFFFFFFFFFFFF)
+    masks = (all_bits >> (np.uint64(63) - high)) & (all_bits << low)
+    bitmaps = np.zeros((num_slugs, _num_words(num_days)), dtype=np.uint64)
+    np.bitwise_or.at(bitmaps, (slug_codes[runs], words), masks)
+    return bitmaps
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Quantiles from a sketch are within this fraction of the true value
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+
+
+class QuantileSketch:
+    """ Quantile sketches as value counts in logarithmic buckets, one row per group, merged by adding rows """
+
+    def __init__(self, groups, counts, min_key):
+        self.groups = groups.reset_index(drop=True)
+        self.counts = counts
+        self.min_key = min_key
+
+    @classmethod
+    def from_values(cls, values, groups):
+        """ One sketch per distinct row of groups, from the non-null values on its rows """
+        values = pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+        valid = ~np.isnan(values)
+        group_codes, distinct = _factorize_rows(groups)
+        group_codes = group_codes[valid]
+        keys = _keys(values[valid])
+        min_key = int(keys.min()) if len(keys) else 0
+        width = int(keys.max()) - min_key + 1 if len(keys) else 1
+        counts = np.bincount(
+            group_codes * width + keys - min_key, minlength=len(distinct) * width
+        ).reshape(len(distinct), width)
+        return cls(distinct, counts, min_key)
+
+    def merge(self, by=(), rows=None):
+        """ Sketches of the given rows added up per distinct value of the by columns """
+        by = list(by)
+        groups = self.groups if rows is None else self.groups[rows]
+        counts = self.counts if rows is None else self.counts[np.asarray(rows)]
+        if not by:
+            return QuantileSketch(pd.DataFrame(index=[0]), counts.sum(axis=0, keepdims=True), self.min_key)
+        group_codes, merged_groups = _factorize_rows(groups[by])
+        merged_counts = np.zeros((len(merged_groups), counts.shape[1]), dtype=counts.dtype)
+        np.add.at(merged_counts, group_codes, counts)
+        return QuantileSketch(merged_groups, merged_counts, self.min_key)
+
+    def quantiles(self, quantiles):
+        """ Groups with the count and each quantile of their values, NaN where a group has no values """
+        cumulative = self.counts.cumsum(axis=1)
+        totals = cumulative[:, -1] if cumulative.shape[1] else np.zeros(len(self.groups), dtype=np.int64)
+        quantiles_df = self.groups.copy()
+        quantiles_df['count'] = totals
+        for quantile in quantiles:
+            ranks = np.floor(quantile * (totals - 1))
+            positions = (cumulative <= ranks[:, None]).sum(axis=1)
+            quantiles_df[f'p{round(quantile * 100)}'] = np.where(totals > 0, _value(positions + self.min_key), np.nan)
+        return quantiles_df
+
+
+def _factorize_rows(groups):
+    """ Code of each row and the distinct rows in sorted order, missing values included """
+    grouped = groups.groupby(list(groups), dropna=False, sort=True)
+    return grouped.ngroup().to_numpy(), grouped.size().index.to_frame(index=False)
+
+
+def _keys(values):
+    """ Bucket of each value, signed by the value's sign; magnitudes under 1 share bucket 0 """
+    magnitudes = np.abs(values)
+    buckets = np.ceil(np.log(np.maximum(magnitudes, 1)) / np.log(GAMMA)).astype(np.int64) + 1
+    return np.where(magnitudes < 1, 0, np.sign(values).astype(np.int64) * buckets)
+
+
+def _value(keys):
+    """ Value each bucket stands for, within RELATIVE_ACCURACY of every value in it """
+    magnitudes = 2 * GAMMA ** (np.abs(keys) - 1) / (GAMMA + 1)
+    return np.where(keys == 0, 0, np.sign(keys) * magnitudes)
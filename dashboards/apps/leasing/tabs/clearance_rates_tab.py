@@ -5,10 +5,9 @@ from datetime import datetime, timedelta
 import numpy as np
 
 
-def invh_filters(ih_property_cycle_df):
+def invh_filters(ih_property_cycle_df, ih_cycle_index):
     col_date_range, col_market = st.columns(2)
 
-    ih_property_period_df = ih_property_cycle_df.copy()
     with col_date_range:
         date_range = st.date_input("Pick a period range", 
                                 value=(datetime.now() - timedelta(days=1),  datetime.now()), 
@@ -17,26 +16,45 @@ def invh_filters(ih_property_cycle_df):
             st.stop()
         else: 
             start_date, end_date = date_range[0], date_range[1]
-            ih_property_period_df = ih_property_period_df[(ih_property_period_df['first_pull_date'] <= end_date) & 
-                                                        (ih_property_period_df['last_pull_date'] >= start_date)]
+            # Cycles listed at some point in the period, looked up instead of scanning every cycle
+            ih_property_period_df = ih_property_cycle_df.iloc[ih_cycle_index.overlapping(start_date, end_date)]
     with col_market:
         selected_market = st.selectbox("Select a market", 
                                 options=['All'] + list(ih_property_cycle_df['market_name'].unique()), index=0)
         if selected_market != 'All':
             ih_property_period_df = ih_property_period_df[ih_property_period_df['market_name'] == selected_market]
 
-    return ih_property_period_df, start_date, end_date
+    return ih_property_period_df, start_date, end_date, selected_market
 
 
 
-def clearance_rates(ih_property_period_df, start_date, end_date):
+def listing_inventory(ih_presence_index, start_date, end_date, selected_market):
+    st.subheader("Active Listings")
+
+    # Homes listed each day of the period in the market, read from counts made when the data loaded
+    market = None if selected_market == 'All' else selected_market
+    inventory_df = ih_presence_index.active_inventory(start_date, end_date, market).rename_axis('date').reset_index()
+    st.metric("Active Listings", f"{ih_presence_index.inventory_on(end_date, market):,}", help="Homes listed on the last day of the period range")
+    inventory_chart = alt.Chart(inventory_df).mark_line(color='#15b8a6').encode(
+        x=alt.X('date:T', title=None),
+        y=alt.Y('listings:Q', title='# Homes'),
+        tooltip=['date:T', 'listings:Q']
+    )
+    st.altair_chart(inventory_chart, use_container_width=True)
+
+
+def clearance_rates(ih_cycle_index, ih_property_period_df, start_date, end_date):
     st.subheader("Clearance Rates")
 
-    prelease_df = ih_property_period_df[ih_property_period_df['latest_status'].isin(['Notice Unrented', 'Vacant Unrented Not Ready'])]
-    rent_ready_df = ih_property_period_df[ih_property_period_df['latest_status'].isin(['Vacant Unrented Ready'])]
+    # Cycle rows are numbered by position, so the index's leased positions match the period's labels
+    leased = ih_property_period_df.index.isin(
+        ih_cycle_index.leased_between(start_date, end_date, pd.to_datetime('today').normalize())
+    )
+    prelease = ih_property_period_df['latest_status'].isin(['Notice Unrented', 'Vacant Unrented Not Ready']).to_numpy()
+    rent_ready = ih_property_period_df['latest_status'].isin(['Vacant Unrented Ready']).to_numpy()
     clearance_rates = [
-        len(prelease_df[(prelease_df['vacant_leased']>=start_date) & (prelease_df['vacant_leased']<=end_date)])*100 / len(prelease_df), 
-        len(rent_ready_df[(rent_ready_df['vacant_leased']>=start_date) & (rent_ready_df['vacant_leased']<=end_date)])*100 / len(rent_ready_df)
+        (prelease & leased).sum()*100 / prelease.sum(), 
+        (rent_ready & leased).sum()*100 / rent_ready.sum()
     ]
     col_prelease_clearance_rate, col_rent_ready_clearance_rate = st.columns(2)
     with col_prelease_clearance_rate:
@@ -45,6 +63,26 @@ def clearance_rates(ih_property_period_df, start_date, end_date):
         st.metric("Rent Ready Clearance Rate", f"{clearance_rates[1]:.2f}%", help="% of pre-lease homes (Vacant Unrented Ready) rented in period range")
 
 
+TREND_FREQUENCIES = {'Daily': 'D', 'Weekly': 'W', 'Monthly': 'M'}
+SKETCH_MEASURES = {'days_on_market': 'Days on Market', 'days_on_turn': 'Days on Turn', 'rent_change': 'Rent Change'}
+
+
+def trend_filters():
+    frequency = st.radio("Clearance rate trend", options=list(TREND_FREQUENCIES), horizontal=True)
+    return TREND_FREQUENCIES[frequency]
+
+
+def clearance_rate_trend(ih_clearance_trend_df, selected_market):
+    trend_df = ih_clearance_trend_df[ih_clearance_trend_df['market_name'] == selected_market]
+    trend_chart = alt.Chart(trend_df).mark_line().encode(
+        x=alt.X('period:T', title=None),
+        y=alt.Y('clearance_rate:Q', title='Clearance Rate (%)'),
+        color=alt.Color('status_group:N', scale=alt.Scale(range=['#15b8a6', '#0f5e73']), title=None),
+        tooltip=['period:T', 'status_group', 'listings', 'leased', alt.Tooltip('clearance_rate:Q', format='.2f')]
+    )
+    st.altair_chart(trend_chart, use_container_width=True)
+
+
 def homes_rented_stats(ih_property_period_df, start_date, end_date):
     st.subheader("Homes Rented Stats")
 
@@ -87,23 +125,107 @@ def homes_rented_stats(ih_property_period_df, start_date, end_date):
     
 
 
+def rented_home_percentiles(ih_rented_sketches, start_date, end_date, selected_market):
+    # Sketches of the weeks overlapping the period, merged across markets unless one is selected
+    measure_columns = st.columns(len(SKETCH_MEASURES))
+    for measure_column, (measure, title) in zip(measure_columns, SKETCH_MEASURES.items()):
+        groups = ih_rented_sketches[measure].groups
+        in_period = (groups['week'] <= end_date) & (groups['week'] > start_date - timedelta(days=7))
+        summary = ih_rented_sketches[measure].merge(
+            rows=(in_period & _in_market(groups, selected_market)).to_numpy()
+        ).quantiles([0.5, 0.9]).iloc[0]
+        with measure_column:
+            for percentile in ['p50', 'p90']:
+                st.metric(f"{title} {percentile.upper()}", 
+                          '-' if pd.isna(summary[percentile]) else f"{summary[percentile]:,.0f}", 
+                          help=f"{percentile.upper()} of homes rented in the weeks of the period range")
+
+    measure = st.selectbox("Weekly percentiles", options=list(SKETCH_MEASURES), format_func=SKETCH_MEASURES.get)
+    groups = ih_rented_sketches[measure].groups
+    percentiles_df = ih_rented_sketches[measure].merge(
+        by=['week'], rows=_in_market(groups, selected_market).to_numpy()
+    ).quantiles([0.5, 0.9]).melt(id_vars=['week', 'count'], value_vars=['p50', 'p90'], var_name='percentile')
+    percentiles_chart = alt.Chart(percentiles_df).mark_line().encode(
+        x=alt.X('week:T', title=None),
+        y=alt.Y('value:Q', title=SKETCH_MEASURES[measure]),
+        color=alt.Color('percentile:N', scale=alt.Scale(range=['#15b8a6', '#0f5e73']), title=None),
+        tooltip=['week:T', 'percentile', alt.Tooltip('value:Q', format=',.0f'), 'count']
+    )
+    st.altair_chart(percentiles_chart, use_container_width=True)
 
 
+def comparable_filters(ih_property_period_df):
+    st.subheader("Comparable Homes")
+    col_home, col_miles = st.columns(2)
 
+    # Latest cycle of each home in the period and market
+    homes_df = ih_property_period_df.drop_duplicates('slug', keep='last').set_index('slug')
+    with col_home:
+        slug = st.selectbox("Select a home", options=list(homes_df.index),
+                            format_func=lambda slug: f"{homes_df.at[slug, 'address']}, {homes_df.at[slug, 'city']}")
+    with col_miles:
+        miles = st.slider("Within miles", min_value=0.25, max_value=10.0, value=1.0, step=0.25)
 
+    return homes_df.loc[[slug] if slug is not None else []].reset_index(), miles
 
 
+def comparable_homes(ih_comparable_df):
+    col_count, col_rent, col_dom = st.columns(3)
+    with col_count:
+        st.metric("Comparable Homes", f"{ih_comparable_df['slug'].nunique():,}", help="Homes within range with similar beds, baths and square footage")
+    with col_rent:
+        st.metric("Median Latest Rent", f"${ih_comparable_df['latest_rent'].median():,.0f}" if len(ih_comparable_df) else '-')
+    with col_dom:
+        st.metric("Median Days on Market", f"{ih_comparable_df['days_on_market'].median():,.0f}" if len(ih_comparable_df) else '-')
 
+    st.dataframe(ih_comparable_df[['address', 'city', 'distance_miles', 'beds', 'baths', 'square_footage', 
+                                   'first_pull_date', 'last_pull_date', 'latest_status', 
+                                   'beginning_rent', 'latest_rent', 'vacant_leased', 'days_on_market']], 
+                 hide_index=True)
 
 
+def lease_terms_filters():
+    st.subheader("Lease Terms")
+    # Terms of every pull are only loaded once someone asks for them
+    return st.toggle("Show lease terms", key='lease_terms')
 
 
+def lease_terms(ih_lease_terms_df, ih_property_period_df, start_date, end_date):
+    if 'term' not in ih_lease_terms_df:
+        st.info("No lease terms offered yet")
+        return
 
+    # Terms offered on each home's latest pull in the period range
+    in_period = (
+        ih_lease_terms_df['property_id'].isin(ih_property_period_df['property_id']) &
+        (ih_lease_terms_df['pull_date'] >= start_date) & (ih_lease_terms_df['pull_date'] <= end_date)
+    )
+    period_terms_df = ih_lease_terms_df[in_period.to_numpy()]
+    latest_pull = period_terms_df['pull_date'] == period_terms_df.groupby('property_id')['pull_date'].transform('max')
+    terms_df = period_terms_df[latest_pull.to_numpy()].assign(
+        rent=lambda df: pd.to_numeric(df['rent']),
+        total_monthly_rent=lambda df: pd.to_numeric(df['total_monthly_rent'])
+    )
+    terms_summary_df = terms_df.groupby('term').agg(
+        homes=('property_id', 'nunique'),
+        median_rent=('rent', 'median'),
+        median_total_monthly_rent=('total_monthly_rent', 'median')
+    ).reset_index()
+
+    terms_chart = alt.Chart(terms_summary_df).mark_bar(color='#15b8a6').encode(
+        x=alt.X('term:O', title='Term (Months)', axis=alt.Axis(labelAngle=0)),
+        y=alt.Y('median_rent:Q', title='Median Rent'),
+        tooltip=[
+            alt.Tooltip('term:O', title='Term (Months)'),
+            alt.Tooltip('homes:Q', title='Homes', format=','),
+            alt.Tooltip('median_rent:Q', title='Median Rent', format=',.0f'),
+            alt.Tooltip('median_total_monthly_rent:Q', title='Median Total Monthly Rent', format=',.0f'),
+        ]
+    )
+    st.altair_chart(terms_chart, use_container_width=True)
 
 
-
-
-
-
-
-
+def _in_market(groups, selected_market):
+    if selected_market == 'All':
+        return pd.Series(True, index=groups.index)
+    return groups['market_name'] == selected_market
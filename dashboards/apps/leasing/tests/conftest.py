@@ -0,0 +1,84 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+# Tests import the app's modules by name, like app.py does when run from the app directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warehouse import arrow_to_df
+
+STATUSES = ['Notice Unrented', 'Vacant Unrented Not Ready', 'Vacant Unrented Ready']
+MARKETS = ['Atlanta', 'Dallas', 'Phoenix', None]
+
+
+@pytest.fixture(scope='session')
+def listing_pulls():
+    """ Two pulls a day of a few homes as rows of the leasing query, oldest first. Homes are listed in spells with
+    gaps either side of CYCLE_GAP_DAYS and missed days, change status and rent, and two homes share a slug """
+    rng = np.random.default_rng(0)
+    num_homes, num_days = 24, 90
+    listed = np.zeros((num_homes, num_days), dtype=bool)
+    for home in range(num_homes):
+        day = rng.integers(0, 20)
+        while day < num_days:
+            length = rng.integers(3, 40)
+            listed[home, day:day + length] = rng.random(len(listed[home, day:day + length])) > 0.1
+            day += length + rng.choice([1, 13, 14, 29])
+
+    homes = [{'status': 0, 'rent': 1500.0 + 100 * home, 'available_on': None} for home in range(num_homes)]
+    pulls = []
+    for pull in range(2 * num_days):
+        day = pd.Timestamp('2025-01-01') + pd.Timedelta(days=pull // 2)
+        # The later pull is stamped in New York time, so its string sorts before the earlier pull's
+        pull_timestamp = f'{day.date()}T11:00:00+00:00' if pull % 2 == 0 else f'{day.date()}T09:00:00-04:00'
+        for home in np.flatnonzero(listed[:, pull // 2]).tolist():
+            state = homes[home]
+            if state['available_on'] is None or rng.random() < 0.01:
+                state['status'] = int(rng.integers(0, 3))
+                state['available_on'] = (day + pd.Timedelta(days=int(rng.integers(-5, 30)))).date()
+            elif rng.random() < 0.04:
+                state['status'] = min(state['status'] + 1, 2)
+            if rng.random() < 0.03:
+                state['rent'] -= 50
+            pulls.append({
+                'property_id': None if rng.random() < 0.005 else f'p{home:03d}',
+                'pull_timestamp': pull_timestamp,
+                'pull_date': day.date(),
+                'slug': None if home == 2 and rng.random() < 0.1 else f'home-{home // 2 if home < 2 else home}',
+                'market_name': MARKETS[home % len(MARKETS)],
+                'address_address_1': f'{100 + home} Main St',
+                'address_city': 'Springfield',
+                'address_state': 'TX',
+                'address_zip_code': f'75{home:03d}',
+                'map_location_latitude': 32.7 + home * 0.01,
+                'map_location_longitude': -96.8 - home * 0.01,
+                'status': None if rng.random() < 0.02 else STATUSES[state['status']],
+                'available_on': state['available_on'],
+                'beds': float(2 + home % 3),
+                'baths': 2.0 + home % 2 / 2,
+                'square_footage': float(1400 + 25 * home),
+                'rent': None if rng.random() < 0.02 else state['rent'],
+                'total_monthly_rent': state['rent'] + 45,
+                'is_application_enabled': state['status'] == 2,
+                'is_self_show_enabled': home % 2 == 0,
+                'is_new_construction': False,
+                'is_on_special': False,
+                'is_btr_community': home == 5,
+                'is_exclusive': False,
+                'is_featured_listing': False,
+                'is_model_home': False,
+                'has_virtual_tour': home % 3 == 0,
+                'application_url': f'https://example.com/apply/{home}',
+            })
+    return pulls
+
+
+@pytest.fixture
+def ih_raw_df(listing_pulls):
+    """ The pulls typed and ordered like the leasing query's result """
+    ih_raw_df = arrow_to_df(pa.Table.from_pylist(listing_pulls))
+    return ih_raw_df.sort_values('property_id', kind='stable', ignore_index=True)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cycle_index import CycleIndex
+
+TODAY = pd.Timestamp('2025-06-30')
+
+
+def market_cycles(num_cycles=2000, seed=0):
+    """ Cycles of every length class, some still listed today """
+    rng = np.random.default_rng(seed)
+    first_pull_date = TODAY - pd.to_timedelta(pd.Series(rng.integers(0, 400, num_cycles)), unit='D')
+    lengths = pd.to_timedelta(pd.Series(rng.choice([0, 1, 2, 7, 30, 31, 64, 200], num_cycles)), unit='D')
+    last_pull_date = (first_pull_date + lengths).clip(upper=TODAY)
+    return pd.DataFrame({'first_pull_date': first_pull_date.dt.date, 'last_pull_date': last_pull_date.dt.date})
+
+
+PERIODS = [
+    ('2025-06-29', '2025-06-30'),
+    ('2025-06-30', '2025-07-15'),
+    ('2025-01-01', '2025-01-01'),
+    ('2024-05-01', '2025-06-30'),
+    ('2025-03-10', '2025-04-20'),
+    ('2023-01-01', '2023-12-31'),
+]
+
+
+@pytest.mark.parametrize('start_date, end_date', PERIODS)
+def test_overlapping_matches_date_filter(start_date, end_date):
+    ih_market_cycle_df = market_cycles()
+    start_date, end_date = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+
+    overlapping = (ih_market_cycle_df['first_pull_date'] <= end_date) & (ih_market_cycle_df['last_pull_date'] >= start_date)
+    positions = CycleIndex.from_cycles(ih_market_cycle_df).overlapping(start_date, end_date)
+    assert positions.tolist() == np.flatnonzero(overlapping).tolist()
+
+
+@pytest.mark.parametrize('start_date, end_date', PERIODS)
+def test_leased_between_matches_vacant_leased_filter(start_date, end_date):
+    ih_market_cycle_df = market_cycles()
+    start_date, end_date = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+
+    # Leased the day after the last pull, for cycles no longer listed today
+    vacant_leased = ih_market_cycle_df['last_pull_date'].apply(
+        lambda pull_date: (pd.Timestamp(pull_date) + pd.Timedelta(days=1)).date() if pd.Timestamp(pull_date) < TODAY else None
+    )
+    leased = vacant_leased.notna() & (vacant_leased >= start_date) & (vacant_leased <= end_date)
+    positions = CycleIndex.from_cycles(ih_market_cycle_df).leased_between(start_date, end_date, TODAY)
+    assert positions.tolist() == np.flatnonzero(leased).tolist()
+
+
+def test_empty_index():
+    index = CycleIndex.from_cycles(market_cycles().iloc[:0])
+    assert len(index.overlapping('2025-01-01', '2025-12-31')) == 0
+    assert len(index.leased_between('2025-01-01', '2025-12-31', TODAY)) == 0
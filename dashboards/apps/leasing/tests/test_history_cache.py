@@ -0,0 +1,72 @@
+import itertools
+import json
+
+import pandas as pd
+import pytest
+
+import data
+from warehouse import RAW_SCHEMA, DuckDBWarehouse
+
+INVH_RAW_TABLE = 'homevest-data.sfr_rental_listings.invh_raw'
+
+
+def raw_rows(pull):
+    """ Raw table rows of one pull, with the fields nested in the data JSON where PROPERTY_FIELDS finds them """
+    rows = []
+    for listing in pull:
+        properties = {}
+        for name, path, _ in data.PROPERTY_FIELDS:
+            *parents, key = path[2:].split('.')
+            parent = properties
+            for parent_key in parents:
+                parent = parent.setdefault(parent_key, {})
+            value = listing[name]
+            parent[key] = f'{value}T00:00:00.000Z' if name == 'available_on' and value is not None else value
+        rows.append({
+            'property_id': listing['property_id'],
+            'pull_timestamp': listing['pull_timestamp'],
+            'data': json.dumps(properties),
+        })
+    return rows
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    warehouse = DuckDBWarehouse(str(tmp_path / 'warehouse.duckdb'))
+    warehouse.setup_table(INVH_RAW_TABLE, RAW_SCHEMA)
+    return warehouse
+
+
+def load(warehouse, cache_dir, monkeypatch):
+    monkeypatch.setattr(data, 'HISTORY_CACHE_DIR', str(cache_dir))
+    return data.get_invitation_homes_data.__wrapped__(warehouse)
+
+
+def test_incremental_loads_match_a_full_load(warehouse, listing_pulls, tmp_path, monkeypatch):
+    pulls = [list(pull) for _, pull in itertools.groupby(listing_pulls, key=lambda listing: listing['pull_timestamp'])]
+    loaded = 0
+    # Loads that end on either pull of a day, after one new pull and after many
+    for num_pulls in [5, 6, 7, 30, 31, 95, 140, len(pulls)]:
+        for pull in pulls[loaded:num_pulls]:
+            warehouse.append(INVH_RAW_TABLE, raw_rows(pull))
+        loaded = num_pulls
+
+        incremental = load(warehouse, tmp_path / 'cache', monkeypatch)
+        full = load(warehouse, tmp_path / f'full-{num_pulls}', monkeypatch)
+        pd.testing.assert_frame_equal(incremental[0], full[0])
+        pd.testing.assert_frame_equal(incremental[1], full[1])
+        # Everything but the latest pull is cached, up to the stamp of the pull before it
+        with open(tmp_path / 'cache' / 'manifest.json') as f:
+            assert json.load(f)['watermark'] == pulls[num_pulls - 2][0]['pull_timestamp']
+
+
+def test_empty_history_loads_empty_frames(warehouse, tmp_path, monkeypatch):
+    ih_listing_df, ih_market_cycle_df, ih_presence_index, _, _, ih_clearance_trends, _ = load(
+        warehouse, tmp_path / 'cache', monkeypatch
+    )
+    assert ih_listing_df.empty and ih_market_cycle_df.empty
+    assert list(ih_listing_df.columns) == ['valid_from', 'valid_to'] + data.PROPERTY_COLUMNS[1:]
+    assert list(ih_market_cycle_df.columns) == ['slug', 'cycle_id', 'property_id'] + [name for name, _, _ in data.CYCLE_COLUMNS]
+    assert ih_presence_index.num_days == 0
+    assert all(trend.empty for trend in ih_clearance_trends.values())
+    assert not (tmp_path / 'cache').exists()
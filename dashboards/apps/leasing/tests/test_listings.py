@@ -0,0 +1,50 @@
+import pandas as pd
+
+from data import (
+    LISTING_ATTRIBUTES, PROPERTY_COLUMNS, compact_listings, get_market_cycle_data, get_market_cycles, parse_properties
+)
+from test_market_cycles import assert_same_values, pull_rows, reference_market_cycle_data
+
+
+def reference_compaction(ih_property_df):
+    """ Runs of a property's pulls with the same attributes and no missed day, found by comparing shifted rows """
+    # Strings compare missing values as equal, which != on the values doesn't
+    attributes = ih_property_df[LISTING_ATTRIBUTES].astype(str)
+    changed = (attributes != attributes.shift()).any(axis=1)
+    gap = pd.to_datetime(ih_property_df['valid_from']) - pd.to_datetime(ih_property_df['valid_to'].shift())
+    runs = (changed | (gap > pd.Timedelta(days=1))).cumsum()
+
+    compacted_df = ih_property_df[runs != runs.shift()].reset_index(drop=True)
+    compacted_df['valid_to'] = ih_property_df.groupby(runs)['valid_to'].last().reset_index(drop=True)
+    return compacted_df
+
+
+def listed_days(ih_listing_df):
+    """ Distinct (day, attributes) of every interval's days """
+    days = ih_listing_df.copy()
+    days['day'] = [pd.date_range(start, end).date for start, end in zip(days['valid_from'], days['valid_to'])]
+    days = days.explode('day').drop(columns=['valid_from', 'valid_to'])
+    return set(days.astype(object).where(days.notna(), None).itertuples(index=False))
+
+
+def test_compaction_matches_shifted_row_runs(ih_raw_df):
+    ih_property_df = parse_properties(ih_raw_df)
+    pd.testing.assert_frame_equal(compact_listings(ih_property_df), reference_compaction(ih_property_df))
+
+
+def test_intervals_cover_exactly_the_pulled_days(ih_raw_df):
+    ih_property_df = parse_properties(ih_raw_df)
+    ih_listing_df = compact_listings(ih_property_df)
+    assert len(ih_listing_df) < len(ih_property_df)
+    assert listed_days(ih_listing_df) == listed_days(ih_property_df)
+
+
+def test_market_cycles_of_intervals_match_groupby_over_pulls(ih_raw_df):
+    expected_df = reference_market_cycle_data(pull_rows(ih_raw_df))
+    ih_market_cycle_df, _ = get_market_cycles(compact_listings(parse_properties(ih_raw_df)))
+    assert_same_values(get_market_cycle_data(ih_market_cycle_df), expected_df)
+
+
+def test_compacting_nothing():
+    ih_property_df = parse_properties(pd.DataFrame(columns=PROPERTY_COLUMNS))
+    assert compact_listings(ih_property_df).empty
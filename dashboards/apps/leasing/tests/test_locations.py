@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import COMPARABLE_BATHS, COMPARABLE_BEDS, COMPARABLE_SQUARE_FOOTAGE, get_comparable_homes
+from locations import LocationIndex, haversine_miles
+
+
+def home_cycles(num_homes=1500, seed=0):
+    """ Homes clustered around a few cities, one far north, some without a location """
+    rng = np.random.default_rng(seed)
+    centers = np.array([[32.78, -96.80], [33.45, -112.07], [33.75, -84.39], [61.22, -149.90]])
+    city = rng.integers(0, len(centers), num_homes)
+    latitude = centers[city, 0] + rng.normal(0, 0.05, num_homes)
+    longitude = centers[city, 1] + rng.normal(0, 0.05, num_homes)
+    latitude[rng.random(num_homes) < 0.02] = np.nan
+    return pd.DataFrame({
+        'slug': [f'home-{i}' for i in rng.integers(0, num_homes // 2, num_homes)],
+        'latitude': latitude,
+        'longitude': longitude,
+        'beds': rng.choice([2, 3, 4, np.nan], num_homes),
+        'baths': rng.choice([1.0, 2.0, 2.5, 3.0], num_homes),
+        'square_footage': rng.choice([1200.0, 1500.0, 1800.0, 2400.0, np.nan], num_homes),
+    })
+
+
+def pairs_within(ih_property_cycle_df, subject_df, miles):
+    """ Every subject and home pair within miles, by haversine distance over the cross join """
+    pairs_df = subject_df.reset_index(names='subject').merge(
+        ih_property_cycle_df.reset_index(names='position'), how='cross', suffixes=('_subject', '')
+    )
+    pairs_df['distance_miles'] = haversine_miles(
+        pairs_df['latitude_subject'], pairs_df['longitude_subject'], pairs_df['latitude'], pairs_df['longitude']
+    )
+    return pairs_df[pairs_df['distance_miles'] <= miles]
+
+
+@pytest.mark.parametrize('miles', [0.25, 1, 3.7, 10])
+def test_within_matches_haversine_over_all_homes(miles):
+    ih_property_cycle_df = home_cycles()
+    subject_df = ih_property_cycle_df.iloc[::25].reset_index(drop=True)
+
+    subjects, positions, distances = LocationIndex.from_cycles(ih_property_cycle_df).within(
+        subject_df['latitude'], subject_df['longitude'], miles
+    )
+    actual_df = pd.DataFrame({'subject': subjects, 'position': positions, 'distance_miles': distances})
+    expected_df = pairs_within(ih_property_cycle_df, subject_df, miles)[['subject', 'position', 'distance_miles']]
+    pd.testing.assert_frame_equal(
+        actual_df.sort_values(['subject', 'position'], ignore_index=True),
+        expected_df.sort_values(['subject', 'position'], ignore_index=True)
+    )
+
+
+def test_comparable_homes_match_filtered_pairs():
+    ih_property_cycle_df = home_cycles()
+    subject_df = ih_property_cycle_df.iloc[::25].reset_index(drop=True)
+    ih_location_index = LocationIndex.from_cycles(ih_property_cycle_df)
+    actual_df = get_comparable_homes(ih_property_cycle_df, ih_location_index, subject_df, 1)
+
+    pairs_df = pairs_within(ih_property_cycle_df, subject_df, 1)
+    similar = (pairs_df['slug'] != pairs_df['slug_subject'])
+    for column, tolerance in [('beds', COMPARABLE_BEDS), ('baths', COMPARABLE_BATHS)]:
+        similar &= ((pairs_df[column] - pairs_df[f'{column}_subject']).abs() <= tolerance) | pairs_df[f'{column}_subject'].isna()
+    similar &= (
+        ((pairs_df['square_footage'] - pairs_df['square_footage_subject']).abs() <=
+         pairs_df['square_footage_subject'] * COMPARABLE_SQUARE_FOOTAGE) |
+        pairs_df['square_footage_subject'].isna()
+    )
+    expected_df = pairs_df[similar]
+
+    columns = ['subject', 'distance_miles', 'slug', 'beds', 'baths', 'square_footage']
+    assert len(actual_df) > 0
+    pd.testing.assert_frame_equal(
+        actual_df[columns].sort_values(columns, ignore_index=True),
+        expected_df[columns].sort_values(columns, ignore_index=True)
+    )
+
+
+def test_no_homes_or_no_location():
+    empty_index = LocationIndex.from_cycles(home_cycles().iloc[:0])
+    assert all(len(result) == 0 for result in empty_index.within([32.78], [-96.80], 5))
+    index = LocationIndex.from_cycles(home_cycles())
+    assert all(len(result) == 0 for result in index.within([np.nan], [-96.80], 5))
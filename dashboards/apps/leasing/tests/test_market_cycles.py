@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+
+from data import (
+    advance_market_cycles, append_history, compact_listings, get_market_cycle_data, get_market_cycles, parse_properties
+)
+
+
+def reference_cycle_ids(ih_property_df):
+    """ Pulls with the cycle_id of the groupby implementation get_market_cycles replaced """
+    df = ih_property_df.copy()
+    df['prev_date'] = df.groupby('slug')['pull_date'].shift()
+    df['gap'] = (df['pull_date'] - df['prev_date']).dt.days
+    df['cycle_id'] = df.groupby('slug')['gap'].transform(lambda gap: ((gap > 14) | gap.isna()).cumsum())
+    return df
+
+
+def reference_market_cycle_data(ih_property_df):
+    """ The groupby implementation get_market_cycles replaced, over one row per pull """
+    df = reference_cycle_ids(ih_property_df)
+    df['prev_status'] = df.groupby(['slug', 'cycle_id'])['status'].shift()
+    for name, status, prev_status in [
+        ('date_vacated', 'Vacant Unrented Not Ready', 'Notice Unrented'),
+        ('date_available', 'Vacant Unrented Ready', 'Vacant Unrented Not Ready'),
+    ]:
+        changed = (df['status'] == status) & (df['prev_status'] == prev_status)
+        dates = df[changed].groupby(['slug', 'cycle_id'])['pull_date'].last().rename(name)
+        df = df.merge(dates, on=['slug', 'cycle_id'], how='left')
+
+    grouped_df = df.groupby(['slug', 'cycle_id', 'property_id'])
+    ih_property_cycle_df = pd.DataFrame({
+        'market_name': grouped_df['market_name'].last(),
+        'address': grouped_df['address_address_1'].last(),
+        'city': grouped_df['address_city'].last(),
+        'state': grouped_df['address_state'].last(),
+        'zip_code': grouped_df['address_zip_code'].last(),
+        'beds': grouped_df['beds'].last(),
+        'baths': grouped_df['baths'].last(),
+        'square_footage': grouped_df['square_footage'].last(),
+        'first_pull_date': grouped_df['pull_date'].first(),
+        'last_pull_date': grouped_df['pull_date'].last(),
+        'latest_status': grouped_df['status'].last(),
+        'date_vacated': grouped_df['date_vacated'].last(),
+        'date_available': grouped_df['date_available'].last(),
+        'available_on': grouped_df['available_on'].last(),
+        'beginning_rent': grouped_df['rent'].first(),
+        'latest_rent': grouped_df['rent'].last(),
+        'beginning_total_monthly_rent': grouped_df['total_monthly_rent'].first(),
+        'latest_total_monthly_rent': grouped_df['total_monthly_rent'].last(),
+    }).reset_index()
+
+    today = pd.to_datetime('today').normalize()
+    ih_property_cycle_df['days_on_turn'] = (
+        pd.to_datetime(ih_property_cycle_df['available_on'].fillna(pd.Timestamp.today())) -
+        pd.to_datetime(ih_property_cycle_df['date_vacated'])
+    ).dt.days
+    ih_property_cycle_df['vacant_leased'] = ih_property_cycle_df['last_pull_date'].apply(
+        lambda pull_date: (pd.Timestamp(pull_date) + pd.Timedelta(days=1)).date() if pd.Timestamp(pull_date) < today else None
+    )
+    ih_property_cycle_df['days_on_market'] = (
+        pd.to_datetime(ih_property_cycle_df['vacant_leased'].fillna(pd.Timestamp.today())) -
+        pd.to_datetime(ih_property_cycle_df['available_on'])
+    ).dt.days
+    return ih_property_cycle_df
+
+
+def pull_rows(ih_raw_df):
+    """ Parsed pulls with the one pull_date column the reference reads """
+    return parse_properties(ih_raw_df).rename(columns={'valid_from': 'pull_date'}).drop(columns='valid_to')
+
+
+def assert_same_values(actual_df, expected_df):
+    """ Equal values, with dates, numbers and missing values compared whatever their dtype """
+    def normalize(df):
+        values = df.astype(object).where(df.notna(), None)
+        return values.map(lambda value: (
+            value.date() if isinstance(value, pd.Timestamp) else
+            float(value) if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)) else
+            value
+        ))
+
+    pd.testing.assert_frame_equal(normalize(actual_df[expected_df.columns]), normalize(expected_df))
+
+
+def test_market_cycles_match_groupby(ih_raw_df):
+    expected_df = reference_market_cycle_data(pull_rows(ih_raw_df))
+    ih_market_cycle_df, _ = get_market_cycles(parse_properties(ih_raw_df))
+    assert_same_values(get_market_cycle_data(ih_market_cycle_df), expected_df)
+
+
+def test_cycle_state_is_each_slugs_first_and_last_pull(ih_raw_df):
+    _, ih_cycle_state_df = get_market_cycles(parse_properties(ih_raw_df))
+
+    grouped = reference_cycle_ids(pull_rows(ih_raw_df)).groupby('slug')
+    expected_df = grouped.agg(
+        cycle_id=('cycle_id', 'last'),
+        first_pull_date=('pull_date', 'first'),
+        first_status=('status', lambda status: status.iloc[0]),
+        last_pull_date=('pull_date', 'last'),
+        last_status=('status', lambda status: status.iloc[-1]),
+    )
+    assert_same_values(ih_cycle_state_df.set_index('slug').sort_index(), expected_df)
+
+
+def test_advancing_market_cycles_matches_a_full_recompute(listing_pulls, ih_raw_df):
+    ih_listing_df = compact_listings(parse_properties(ih_raw_df))
+    expected_cycle_df, expected_state_df = get_market_cycles(ih_listing_df)
+
+    # Batches of one pull, of one day and of several weeks, each ending on either pull of a day
+    pull_timestamps = pd.unique(np.array([listing['pull_timestamp'] for listing in listing_pulls]))
+    history_df = ih_market_cycle_df = ih_cycle_state_df = None
+    for batch_timestamps in np.split(pull_timestamps, [1, 2, 4, 5, 40, 41, 120]):
+        batch_raw_df = ih_raw_df[ih_raw_df['pull_timestamp'].isin(batch_timestamps)].reset_index(drop=True)
+        batch_listing_df = compact_listings(parse_properties(batch_raw_df))
+        history_df = append_history(history_df, batch_listing_df)
+        ih_market_cycle_df, ih_cycle_state_df = advance_market_cycles(
+            ih_market_cycle_df, ih_cycle_state_df, batch_listing_df, history_df
+        )
+
+    pd.testing.assert_frame_equal(history_df, ih_listing_df)
+    pd.testing.assert_frame_equal(ih_market_cycle_df, expected_cycle_df)
+    # The state's first pull is the last batch's, so only what the next batch continues from is compared
+    state_columns = ['slug', 'property_id', 'cycle_id', 'last_pull_date', 'last_status']
+    pd.testing.assert_frame_equal(
+        ih_cycle_state_df[state_columns].sort_values('slug', ignore_index=True),
+        expected_state_df[state_columns].sort_values('slug', ignore_index=True)
+    )
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from presence import PresenceIndex
+
+
+def listing_intervals(num_intervals=600, seed=0):
+    """ Intervals over a few slugs, overlapping, repeated, without a market or moving markets, some spanning months """
+    rng = np.random.default_rng(seed)
+    valid_from = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 200, num_intervals), unit='D')
+    valid_to = valid_from + pd.to_timedelta(rng.choice([0, 1, 5, 63, 64, 130], num_intervals), unit='D')
+    return pd.DataFrame({
+        'slug': rng.choice([f'slug-{i}' for i in range(40)] + [None], num_intervals),
+        'market_name': rng.choice(['Atlanta', 'Dallas', 'Phoenix', None], num_intervals),
+        'valid_from': valid_from.date,
+        'valid_to': valid_to.date,
+    })
+
+
+def listed_days(ih_listing_df):
+    """ One row per slug, market and day listed, like the listings before they were compacted into intervals """
+    listings = ih_listing_df[ih_listing_df['slug'].notna()].copy()
+    listings['day'] = [pd.date_range(start, end) for start, end in zip(listings['valid_from'], listings['valid_to'])]
+    return listings.explode('day')
+
+
+def expected_counts(ih_listing_df, market=None):
+    days = listed_days(ih_listing_df)
+    if market is not None:
+        days = days[days['market_name'] == market]
+    return days.groupby('day')['slug'].nunique()
+
+
+@pytest.mark.parametrize('market', [None, 'Atlanta', 'Dallas', 'Phoenix'])
+def test_active_inventory_matches_listed_days(market):
+    ih_listing_df = listing_intervals()
+    index = PresenceIndex.from_intervals(ih_listing_df)
+    start, end = pd.Timestamp('2024-12-25').date(), pd.Timestamp('2025-12-31').date()
+
+    inventory = index.active_inventory(start, end, market)
+    expected = expected_counts(ih_listing_df, market).reindex(pd.date_range(index.start_date, periods=index.num_days), fill_value=0)
+    assert inventory.index.tolist() == expected.index.date.tolist()
+    assert inventory.tolist() == expected.tolist()
+    for day in [start, index.start_date.date(), pd.Timestamp('2025-03-05').date(), end]:
+        assert index.inventory_on(day, market) == expected.get(pd.Timestamp(day), 0)
+
+
+def test_unknown_market_has_no_inventory():
+    index = PresenceIndex.from_intervals(listing_intervals())
+    assert index.active_inventory(market='Nowhere').sum() == 0
+    assert index.inventory_on(index.start_date, 'Nowhere') == 0
+
+
+def test_bitmaps_match_listed_days():
+    ih_listing_df = listing_intervals()
+    index = PresenceIndex.from_intervals(ih_listing_df)
+    days = listed_days(ih_listing_df)
+    expected = np.zeros((len(index.slugs), len(index.bitmaps[0]) * 64), dtype=bool)
+    expected[index.slugs.get_indexer(days['slug']), (days['day'] - index.start_date).dt.days.to_numpy()] = True
+
+    bits = np.unpackbits(index.bitmaps.view(np.uint8), axis=1, bitorder='little').astype(bool)
+    assert np.array_equal(bits, expected)
+
+
+def test_empty_listings():
+    index = PresenceIndex.from_intervals(listing_intervals().iloc[:0])
+    assert index.num_days == 0
+    assert index.active_inventory().empty
+    assert index.inventory_on('2025-01-01') == 0
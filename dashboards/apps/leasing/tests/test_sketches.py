@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import RELATIVE_ACCURACY, QuantileSketch
+
+QUANTILES = [0, 0.1, 0.5, 0.9, 1]
+
+
+def rented_homes(num_homes=3000, seed=0):
+    """ Measures of rented homes per market and week: negative, fractional, zero, large and missing values """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'market_name': rng.choice(['Atlanta', 'Dallas', 'Phoenix', None], num_homes),
+        'week': (pd.Timestamp('2025-01-06') + pd.to_timedelta(7 * rng.integers(0, 8, num_homes), unit='D')).date,
+        'value': np.where(
+            rng.random(num_homes) < 0.05, np.nan,
+            rng.choice([-1, 1], num_homes) * rng.lognormal(3, 2, num_homes) * (rng.random(num_homes) > 0.05)
+        ),
+    })
+
+
+def assert_within_accuracy(sketched, exact):
+    """ Quantiles within RELATIVE_ACCURACY of the exact ones; magnitudes under 1 share the zero bucket """
+    sketched, exact = np.asarray(sketched, dtype=float), np.asarray(exact, dtype=float)
+    assert np.array_equal(np.isnan(sketched), np.isnan(exact))
+    expected = np.where(np.abs(exact) < 1, 0, exact)
+    assert np.all(np.abs(sketched - expected)[~np.isnan(exact)] <= RELATIVE_ACCURACY * np.abs(expected)[~np.isnan(exact)])
+
+
+def expected_quantiles(homes_df, by):
+    """ Exact quantiles at the rank the sketch reads, the lower of two neighbours """
+    grouped = homes_df.groupby(by, dropna=False)['value']
+    expected_df = grouped.count().rename('count').to_frame()
+    for quantile in QUANTILES:
+        expected_df[f'p{round(quantile * 100)}'] = grouped.quantile(quantile, interpolation='lower')
+    return expected_df.reset_index()
+
+
+def test_group_quantiles_match_pandas():
+    homes_df = rented_homes()
+    sketch = QuantileSketch.from_values(homes_df['value'], homes_df[['market_name', 'week']])
+    actual_df = sketch.quantiles(QUANTILES)
+    expected_df = expected_quantiles(homes_df, ['market_name', 'week'])
+
+    pd.testing.assert_frame_equal(actual_df[['market_name', 'week']], expected_df[['market_name', 'week']])
+    assert actual_df['count'].tolist() == expected_df['count'].tolist()
+    for quantile in QUANTILES:
+        assert_within_accuracy(actual_df[f'p{round(quantile * 100)}'], expected_df[f'p{round(quantile * 100)}'])
+
+
+@pytest.mark.parametrize('by', [[], ['market_name'], ['week']])
+def test_merged_sketches_match_pandas_over_the_rows(by):
+    homes_df = rented_homes()
+    sketch = QuantileSketch.from_values(homes_df['value'], homes_df[['market_name', 'week']])
+    rows = (sketch.groups['week'] >= pd.Timestamp('2025-02-03').date()) & (sketch.groups['market_name'] != 'Dallas')
+    merged_df = sketch.merge(by=by, rows=rows.to_numpy()).quantiles(QUANTILES)
+
+    selected_df = homes_df[(homes_df['week'] >= pd.Timestamp('2025-02-03').date()) & (homes_df['market_name'] != 'Dallas')]
+    expected_df = expected_quantiles(selected_df.assign(all=0), by or ['all'])
+    assert merged_df['count'].tolist() == expected_df['count'].tolist()
+    for quantile in QUANTILES:
+        assert_within_accuracy(merged_df[f'p{round(quantile * 100)}'], expected_df[f'p{round(quantile * 100)}'])
+
+
+def test_groups_without_values_have_no_quantiles():
+    homes_df = rented_homes().assign(value=np.nan)
+    quantiles_df = QuantileSketch.from_values(homes_df['value'], homes_df[['market_name']]).quantiles([0.5])
+    assert quantiles_df['count'].tolist() == [0] * 4
+    assert quantiles_df['p50'].isna().all()
+    assert QuantileSketch.from_values(homes_df['value'], homes_df[['market_name']]).merge().quantiles([0.5])['p50'].isna().all()
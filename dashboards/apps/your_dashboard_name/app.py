@@ -1,7 +1,6 @@
 import streamlit as st
-from google.oauth2 import service_account
 
-from data import get_service_account_info, get_data
+from data import get_warehouse, get_data
 
 # Configure page layout
 st.set_page_config(
@@ -12,8 +11,8 @@ st.set_page_config(
 )
 
 # Data Retrieval
-credentials = service_account.Credentials.from_service_account_info(get_service_account_info(local=True))
-data = get_data(credentials)
+warehouse = get_warehouse(local=True)
+data = get_data(warehouse)
 
 # Application
 st.title("Dashboard Name")
@@ -1,6 +1,12 @@
 import json
+import os
+from datetime import timedelta
 import streamlit as st
 import pandas as pd
+from google.oauth2 import service_account
+
+from datasets import dataset
+from warehouse import BigQueryWarehouse, DuckDBWarehouse
 
 
 def get_service_account_info(local=False):
@@ -12,12 +18,20 @@ def get_service_account_info(local=False):
     return service_account_info
 
 
-@st.cache_data
-def get_data(_credentials):
+@st.cache_resource
+def get_warehouse(local=False):
+    if os.environ.get('WAREHOUSE') == 'duckdb':
+        return DuckDBWarehouse(os.environ.get('DUCKDB_PATH', 'local.duckdb'), read_only=True)
+    credentials = service_account.Credentials.from_service_account_info(get_service_account_info(local))
+    return BigQueryWarehouse(project=credentials.project_id, credentials=credentials)
+
+
+@dataset(ttl=timedelta(hours=1))
+def get_data(_warehouse):
     query = """
         SELECT * 
         FROM `_` 
     """
-    data = pd.read_gbq(query, credentials=_credentials)
+    data = _warehouse.query_df(query, cache=True)
     return data
 
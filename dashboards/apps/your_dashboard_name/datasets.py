@@ -0,0 +1,123 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Datasets are reloaded once this fraction of their TTL has passed, so a fresh copy lands before they expire
+REFRESH_AT = 0.8
+# Wait before retrying a failed reload; the last good copy is served meanwhile
+RETRY_SECONDS = 60
+# How often the refresher looks for datasets due a reload
+CHECK_SECONDS = 15
+# Dataset queries started ahead of use that can run at once
+PREFETCH_WORKERS = 4
+
+_datasets = []
+_registry_lock = threading.Lock()
+_refresher = None
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="dataset-prefetch")
+
+
+class Dataset:
+    """Last good result of a loader, reloaded in the background before its TTL runs out"""
+
+    def __init__(self, name, loader, args, ttl):
+        self.name = name
+        self.loader = loader
+        self.args = args
+        self.ttl = ttl.total_seconds()
+        self.load_lock = threading.Lock()
+        # (value, loaded_at), replaced as a whole so readers see the old or the new dataset, never a mix
+        self.snapshot = None
+        self.refresh_due = None
+
+    def get(self):
+        """The current value, loading it first only if it was never loaded; waits for a load already running"""
+        if self.snapshot is None:
+            with self.load_lock:
+                if self.snapshot is None:
+                    self.load()
+        return self.snapshot[0]
+
+    def prefetch(self):
+        """Start the first load on the prefetch pool, so a later get only waits for what's left of it"""
+        if self.snapshot is None:
+            _prefetch_pool.submit(self.get)
+
+    def load(self):
+        value = self.loader(*self.args)
+        loaded_at = time.monotonic()
+        self.snapshot = (value, loaded_at)
+        self.refresh_due = loaded_at + self.ttl * REFRESH_AT
+
+    def refresh(self):
+        with self.load_lock:
+            try:
+                self.load()
+            except Exception as error:
+                print(f"Reloading {self.name} failed, serving the copy loaded {self.age():.0f}s ago: {error}")
+                self.refresh_due = time.monotonic() + RETRY_SECONDS
+
+    def age(self):
+        return time.monotonic() - self.snapshot[1]
+
+
+def dataset(ttl):
+    """Cache a loader's result for all sessions, reloaded in the background before ttl (a timedelta) passes
+
+    Only the first call with a set of arguments waits on the loader; later calls get a view of the last good
+    result, shared by every session. Arguments are the cache key, so pass the warehouse from get_warehouse,
+    which keys by identity.
+    """
+    def decorate(loader):
+        datasets = {}
+
+        def dataset_for(args):
+            with _registry_lock:
+                if args not in datasets:
+                    datasets[args] = Dataset(loader.__name__, loader, args, ttl)
+                    _datasets.append(datasets[args])
+                    _start_refresher()
+                return datasets[args]
+
+        @functools.wraps(loader)
+        def get(*args):
+            return _view(dataset_for(args).get())
+
+        # get.prefetch(*args) starts the query in the background without waiting for it
+        get.prefetch = lambda *args: dataset_for(args).prefetch()
+        return get
+
+    return decorate
+
+
+def _view(value):
+    """Frames as deep copies, so a session writing into one in place (.loc[...] =, fillna(inplace=True)) leaves the
+    shared frame as it was. Arrow-backed columns share their immutable buffers, so mostly numeric columns are copied"""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_view(item) for item in value)
+    if isinstance(value, dict):
+        # Frames keyed by fund, period and so on; other values, like chart specs, are shared as they are
+        return {key: item.copy() if isinstance(item, pd.DataFrame) else item for key, item in value.items()}
+    return value
+
+
+def _start_refresher():
+    global _refresher
+    if _refresher is None:
+        _refresher = threading.Thread(target=_refresh_loop, name="dataset-refresher", daemon=True)
+        _refresher.start()
+
+
+def _refresh_loop():
+    while True:
+        with _registry_lock:
+            datasets = list(_datasets)
+        for dataset in datasets:
+            if dataset.refresh_due is not None and time.monotonic() >= dataset.refresh_due:
+                dataset.refresh()
+        time.sleep(CHECK_SECONDS)
@@ -3,8 +3,8 @@ import math
 from datetime import datetime, timezone
 import requests
 from bs4 import BeautifulSoup
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
+
+from warehouse.warehouse import BigQueryWarehouse, RAW_SCHEMA
 
 class Config:
     # Base URLs and endpoints
@@ -43,25 +43,11 @@ def get_build_id():
         print(f"Error fetching build ID: {e}")
         return None
 
-def setup_bigquery():
-    """Initialize BigQuery table if it doesn't exist"""
-    client = bigquery.Client(project=Config.PROJECT_ID)
-    schema = [
-        bigquery.SchemaField("property_id", "STRING", mode="NULLABLE"),
-        bigquery.SchemaField("pull_timestamp", "STRING", mode="NULLABLE"),
-        bigquery.SchemaField("data", "JSON", mode="NULLABLE"),
-    ]
-    
-    try:
-        client.get_table(Config.TABLE_ID)
-        print(f"Table {Config.TABLE_ID} already exists.")
-    except NotFound:
-        print(f"Creating table {Config.TABLE_ID} with JSON schema...")
-        table = bigquery.Table(Config.TABLE_ID, schema=schema)
-        client.create_table(table)
-        print(f"Table {Config.TABLE_ID} created with JSON schema.")
-    
-    return client
+def setup_warehouse():
+    """Initialize the warehouse table if it doesn't exist"""
+    warehouse = BigQueryWarehouse(project=Config.PROJECT_ID)
+    warehouse.setup_table(Config.TABLE_ID, RAW_SCHEMA)
+    return warehouse
 
 def fetch_properties(build_id, state, page):
     """Fetch properties from API for given state and page"""
@@ -99,7 +85,7 @@ def main():
         raise ValueError("Could not retrieve build ID")
     print(f"Build ID: {build_id}")
     
-    client = setup_bigquery()
+    warehouse = setup_warehouse()
     pull_timestamp = datetime.now(timezone.utc).isoformat()
     inserted_ids = set()
     total_inserted = 0
@@ -123,7 +109,7 @@ def main():
                     new_props = process_properties(props, pull_timestamp, inserted_ids)
                     
                     if new_props:
-                        errors = client.insert_rows_json(Config.TABLE_ID, new_props)
+                        errors = warehouse.append(Config.TABLE_ID, new_props)
                         if errors:
                             print(f"Errors while inserting batch for {state} page {page}: {errors}")
                         else:
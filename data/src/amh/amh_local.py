@@ -3,13 +3,19 @@ import math
 from datetime import datetime, timezone
 import requests
 from bs4 import BeautifulSoup
-import csv
 import os
 
+from warehouse.warehouse import DuckDBWarehouse, RAW_SCHEMA
+
 class Config:
     MAIN_URL = "https://www.amh.com"
     API_URL_TEMPLATE = "https://www.amh.com/_next/data/{build_id}/query.json"
-    CSV_PATH = 'src/amh/amh_properties.csv'
+    
+    # Local DuckDB configuration, same table id as production
+    DUCKDB_PATH = os.environ.get('DUCKDB_PATH', 'local.duckdb')
+    PROJECT_ID = 'homevest-data'
+    DATASET_ID = 'sfr_rental_listings'
+    TABLE_ID = f'{PROJECT_ID}.{DATASET_ID}.amh_raw'
 
     # States for criteria (lowercase, hyphenated where needed)
     STATES = [
@@ -37,28 +43,11 @@ def get_build_id():
         print(f"Error fetching build ID: {e}")
         return None
 
-def setup_csv():
-    """Setup CSV file with headers"""
-    headers = [
-        'property_id',
-        'pull_timestamp',
-        'state',
-        'address',
-        'city',
-        'zip_code',
-        'bedrooms',
-        'bathrooms',
-        'square_feet',
-        'monthly_rent',
-        'latitude',
-        'longitude',
-        'url'
-    ]
-    
-    with open(Config.CSV_PATH, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(headers)
-    
+def setup_warehouse():
+    """Initialize the local DuckDB table if it doesn't exist"""
+    warehouse = DuckDBWarehouse(Config.DUCKDB_PATH)
+    warehouse.setup_table(Config.TABLE_ID, RAW_SCHEMA)
+    return warehouse
 
 def fetch_properties(build_id, state, page):
     """Fetch properties from API for given state and page"""
@@ -73,34 +62,21 @@ def fetch_properties(build_id, state, page):
     response.raise_for_status()
     return response.json()
 
-def process_properties(props, pull_timestamp, state, inserted_ids, csv_path):
-    """Process properties and write them to CSV"""
-    new_props_count = 0
-    with open(csv_path, 'a', newline='') as f:
-        writer = csv.writer(f)
-        for prop in props:
-            prop_id = prop.get('id')
-            if prop_id and prop_id not in inserted_ids:
-                # Extract relevant data from property
-                row = [
-                    prop_id,
-                    pull_timestamp,
-                    state,
-                    prop.get('address', ''),
-                    prop.get('city', ''),
-                    prop.get('zipCode', ''),
-                    prop.get('beds', ''),
-                    prop.get('baths', ''),
-                    prop.get('sqft', ''),
-                    prop.get('price', ''),
-                    prop.get('latitude', ''),
-                    prop.get('longitude', ''),
-                    f"{Config.MAIN_URL}/properties/{prop_id}"
-                ]
-                writer.writerow(row)
-                inserted_ids.add(prop_id)
-                new_props_count += 1
-    return new_props_count
+def process_properties(props, pull_timestamp, inserted_ids):
+    """Process properties and prepare them for insertion"""
+    new_props_to_insert = []
+    for prop in props:
+        prop_id = prop.get('id')
+        if prop_id and prop_id not in inserted_ids:
+            prop['pull_timestamp'] = pull_timestamp
+            row = {
+                "property_id": prop_id,
+                "pull_timestamp": pull_timestamp,
+                "data": json.dumps(prop)
+            }
+            new_props_to_insert.append(row)
+            inserted_ids.add(prop_id)
+    return new_props_to_insert
 
 def main():
     # Initialize
@@ -109,7 +85,7 @@ def main():
         raise ValueError("Could not retrieve build ID")
     print(f"Build ID: {build_id}")
     
-    setup_csv()
+    warehouse = setup_warehouse()
     pull_timestamp = datetime.now(timezone.utc).isoformat()
     inserted_ids = set()
     total_inserted = 0
@@ -130,10 +106,17 @@ def main():
                     data = fetch_properties(build_id, state, page)
                     props = data.get('pageProps', {}).get('results', [])
                     
-                    new_props_count = process_properties(props, pull_timestamp, state, inserted_ids, Config.CSV_PATH)
-                    total_inserted += new_props_count
-                    state_inserted += new_props_count
-                    print(f"Page {page}: Added {new_props_count} properties (state total: {state_inserted})")
+                    new_props = process_properties(props, pull_timestamp, inserted_ids)
+                    
+                    if new_props:
+                        errors = warehouse.append(Config.TABLE_ID, new_props)
+                        if errors:
+                            print(f"Errors while inserting batch for {state} page {page}: {errors}")
+                        else:
+                            batch_size = len(new_props)
+                            total_inserted += batch_size
+                            state_inserted += batch_size
+                            print(f"Page {page}: Added {batch_size} properties (state total: {state_inserted})")
                     
                 except (requests.RequestException, json.JSONDecodeError) as e:
                     print(f"Error processing {state} page {page}: {e}")
@@ -145,8 +128,8 @@ def main():
             print(f"Error processing state {state}: {e}")
             continue
     
-    print(f"\nTotal properties added to CSV: {total_inserted}")
-    print(f"CSV file saved at: {Config.CSV_PATH}")
+    print(f"\nTotal properties added to DuckDB: {total_inserted}")
+    print(f"DuckDB file saved at: {Config.DUCKDB_PATH}")
 
 if __name__ == "__main__":
     main()
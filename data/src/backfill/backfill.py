@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from warehouse.warehouse import BigQueryWarehouse, DuckDBWarehouse
+
+# Typed fields per source: (column, path in the JSON payload, type)
+INVH_FIELDS = [
+    ('slug', ('slug',), 'string'),
+    ('market_name', ('market_name',), 'string'),
+    ('address_address_1', ('address', 'address_1'), 'string'),
+    ('address_city', ('address', 'city'), 'string'),
+    ('address_state', ('address', 'state'), 'string'),
+    ('address_zip_code', ('address', 'zip_code'), 'string'),
+    ('map_location_latitude', ('map_location', 'latitude'), 'float'),
+    ('map_location_longitude', ('map_location', 'longitude'), 'float'),
+    ('status', ('status',), 'string'),
+    ('available_on', ('available_on',), 'date'),
+    ('beds', ('beds',), 'float'),
+    ('baths', ('baths',), 'float'),
+    ('square_footage', ('square_footage',), 'float'),
+    ('rent', ('rent',), 'float'),
+    ('total_monthly_rent', ('total_monthly_rent',), 'float'),
+    ('is_application_enabled', ('is_application_enabled',), 'bool'),
+    ('is_self_show_enabled', ('is_self_show_enabled',), 'bool'),
+    ('is_new_construction', ('is_new_construction',), 'bool'),
+    ('is_on_special', ('is_on_special',), 'bool'),
+    ('is_btr_community', ('is_btr_community',), 'bool'),
+    ('is_exclusive', ('is_exclusive',), 'bool'),
+    ('is_featured_listing', ('is_featured_listing',), 'bool'),
+    ('is_model_home', ('is_model_home',), 'bool'),
+    ('has_virtual_tour', ('has_virtual_tour',), 'bool'),
+    ('application_url', ('application_url',), 'string'),
+]
+
+AMH_FIELDS = [
+    ('address', ('address',), 'string'),
+    ('city', ('city',), 'string'),
+    ('zip_code', ('zipCode',), 'string'),
+    ('beds', ('beds',), 'float'),
+    ('baths', ('baths',), 'float'),
+    ('square_feet', ('sqft',), 'float'),
+    ('monthly_rent', ('price',), 'float'),
+    ('latitude', ('latitude',), 'float'),
+    ('longitude', ('longitude',), 'float'),
+]
+
+ARROW_TYPES = {
+    'string': pa.string(),
+    'float': pa.float64(),
+    'bool': pa.bool_(),
+    'date': pa.date32(),
+}
+
+
+class Config:
+    PROJECT_ID = 'homevest-data'
+    DATASET_ID = 'sfr_rental_listings'
+    OUTPUT_DIR = os.environ.get('BACKFILL_DIR', 'backfill')
+
+    SOURCES = {
+        'invh': {'table': 'invh_raw', 'fields': INVH_FIELDS},
+        'amh': {'table': 'amh_raw', 'fields': AMH_FIELDS},
+    }
+
+    # Bump when parsing rules change so every typed partition is rebuilt
+    PARSER_VERSION = 1
+
+    # Raw partitions exported ahead of the parse workers
+    MAX_PENDING_PER_WORKER = 2
+
+
+def table_id(source):
+    return f"{Config.PROJECT_ID}.{Config.DATASET_ID}.{Config.SOURCES[source]['table']}"
+
+
+def partition_path(source, stage, pull_date):
+    return os.path.join(Config.OUTPUT_DIR, source, stage, pull_date.isoformat())
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, '_manifest.json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_partition(path, table, manifest):
+    """Write data then manifest, each atomically, so a partition with a manifest is always complete"""
+    os.makedirs(path, exist_ok=True)
+    tmp_path = os.path.join(path, 'data.parquet.tmp')
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, os.path.join(path, 'data.parquet'))
+
+    tmp_path = os.path.join(path, '_manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(path, '_manifest.json'))
+
+
+def list_partitions(warehouse, source, start=None, end=None):
+    """Per-day row count and latest pull, used to detect new or changed days"""
+    params = {name: value for name, value in [('start', start), ('end', end)] if value is not None}
+    filters = {'start': "DATE(pull_timestamp) >= @start", 'end': "DATE(pull_timestamp) <= @end"}
+    where = " AND ".join(filters[name] for name in params) or "TRUE"
+    query = f"""
+        SELECT
+            DATE(pull_timestamp) AS pull_date,
+            COUNT(*) AS num_rows,
+            MAX(pull_timestamp) AS max_pull_timestamp
+        FROM `{table_id(source)}`
+        WHERE {where}
+        GROUP BY 1
+        ORDER BY 1
+    """
+    partitions = warehouse.query_arrow(query, params).to_pylist()
+    for partition in partitions:
+        partition['fingerprint'] = f"{partition['num_rows']}:{partition['max_pull_timestamp']}"
+    return partitions
+
+
+def export_partition(warehouse, source, pull_date):
+    """Export one day of raw rows with the payload as a JSON string"""
+    query = f"""
+        SELECT
+            property_id,
+            pull_timestamp,
+            TO_JSON_STRING(data) AS data
+        FROM `{table_id(source)}`
+        WHERE DATE(pull_timestamp) = @pull_date
+    """
+    return warehouse.query_arrow(query, {'pull_date': pull_date})
+
+
+def extract(payload, path):
+    for key in path:
+        if not isinstance(payload, dict):
+            return None
+        payload = payload.get(key)
+    return payload
+
+
+def convert(value, field_type):
+    if value is None or value == '':
+        return None
+    if field_type == 'float':
+        return float(value)
+    if field_type == 'bool':
+        return bool(value)
+    if field_type == 'date':
+        # ISO timestamps like '2025-08-06T00:00:00.000Z' keep their UTC calendar date
+        return date.fromisoformat(str(value)[:10])
+    return str(value)
+
+
+def parse_partition(source, pull_date, raw_path, typed_path, manifest):
+    """Parse one raw partition into typed columns; runs in a worker process"""
+    fields = Config.SOURCES[source]['fields']
+    raw = pq.read_table(os.path.join(raw_path, 'data.parquet'))
+
+    values = {name: [] for name, _, _ in fields}
+    for data in raw.column('data').to_pylist():
+        payload = orjson.loads(data) if data else {}
+        for name, path, field_type in fields:
+            values[name].append(convert(extract(payload, path), field_type))
+
+    typed = pa.table({
+        'pull_date': pa.array([pull_date] * raw.num_rows, pa.date32()),
+        'property_id': raw.column('property_id'),
+        'pull_timestamp': raw.column('pull_timestamp'),
+        **{name: pa.array(values[name], ARROW_TYPES[field_type]) for name, _, field_type in fields},
+    })
+    write_partition(typed_path, typed, manifest)
+    return raw.num_rows
+
+
+def backfill(warehouse, source, start=None, end=None, workers=None):
+    """Export and parse every new or changed day; returns False if any day failed"""
+    partitions = list_partitions(warehouse, source, start, end)
+    print(f"{source}: {len(partitions)} days of raw history")
+
+    counts = {'exported': 0, 'parsed': 0, 'up to date': 0, 'failed': 0}
+
+    def report(future, pull_date):
+        try:
+            num_rows = future.result()
+            counts['parsed'] += 1
+            print(f"Parsed {source} {pull_date}: {num_rows} rows")
+        except Exception as e:
+            counts['failed'] += 1
+            print(f"Error parsing {source} {pull_date}: {e}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Export in this process while workers parse, with a bounded number of days in flight
+        max_pending = (workers or os.cpu_count() or 1) * Config.MAX_PENDING_PER_WORKER
+        pending = {}
+        for partition in partitions:
+            pull_date = partition['pull_date']
+            raw_path = partition_path(source, 'raw', pull_date)
+            typed_path = partition_path(source, 'typed', pull_date)
+            raw_manifest = {'fingerprint': partition['fingerprint']}
+            typed_manifest = {**raw_manifest, 'parser_version': Config.PARSER_VERSION}
+
+            if read_manifest(typed_path) == typed_manifest:
+                counts['up to date'] += 1
+                continue
+
+            if read_manifest(raw_path) != raw_manifest:
+                try:
+                    write_partition(raw_path, export_partition(warehouse, source, pull_date), raw_manifest)
+                    counts['exported'] += 1
+                except Exception as e:
+                    counts['failed'] += 1
+                    print(f"Error exporting {source} {pull_date}: {e}")
+                    continue
+
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report(future, pending.pop(future))
+            future = pool.submit(parse_partition, source, pull_date, raw_path, typed_path, typed_manifest)
+            pending[future] = pull_date
+
+        for future in wait(pending).done:
+            report(future, pending[future])
+
+    print(f"{source}: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+    return counts['failed'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-parse raw listing history into typed, date-partitioned Parquet")
+    parser.add_argument('sources', nargs='*', default=list(Config.SOURCES), choices=list(Config.SOURCES))
+    parser.add_argument('--start', type=date.fromisoformat, help="First pull date (YYYY-MM-DD)")
+    parser.add_argument('--end', type=date.fromisoformat, help="Last pull date (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, default=None, help="Parse processes (default: CPU count)")
+    parser.add_argument('--output', default=Config.OUTPUT_DIR, help="Output directory")
+    parser.add_argument('--duckdb', metavar='PATH', help="Read from a local DuckDB file instead of BigQuery")
+    args = parser.parse_args()
+
+    Config.OUTPUT_DIR = args.output
+    if args.duckdb:
+        warehouse = DuckDBWarehouse(args.duckdb, read_only=True)
+    else:
+        warehouse = BigQueryWarehouse(project=Config.PROJECT_ID)
+
+    ok = True
+    for source in args.sources:
+        ok = backfill(warehouse, source, args.start, args.end, args.workers) and ok
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 import json
 import requests
 from datetime import datetime, timezone
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
+
+from warehouse.warehouse import BigQueryWarehouse, RAW_SCHEMA
 
 # Configuration
 class Config:
@@ -31,25 +31,11 @@ class Config:
         'US': (36.8904, -95.9673),
     }
 
-def setup_bigquery():
-    """Initialize BigQuery table if it doesn't exist"""
-    client = bigquery.Client(project=Config.PROJECT_ID)
-    schema = [
-        bigquery.SchemaField("property_id", "STRING", mode="NULLABLE"),
-        bigquery.SchemaField("pull_timestamp", "STRING", mode="NULLABLE"),
-        bigquery.SchemaField("data", "JSON", mode="NULLABLE"),
-    ]
-    
-    try:
-        client.get_table(Config.TABLE_ID)
-        print(f"Table {Config.TABLE_ID} already exists.")
-    except NotFound:
-        print(f"Creating table {Config.TABLE_ID} with JSON schema...")
-        table = bigquery.Table(Config.TABLE_ID, schema=schema)
-        client.create_table(table)
-        print(f"Table {Config.TABLE_ID} created with JSON schema.")
-    
-    return client
+def setup_warehouse():
+    """Initialize the warehouse table if it doesn't exist"""
+    warehouse = BigQueryWarehouse(project=Config.PROJECT_ID)
+    warehouse.setup_table(Config.TABLE_ID, RAW_SCHEMA)
+    return warehouse
 
 def fetch_properties(lat, lng, offset=0):
     """Fetch properties from API for given coordinates"""
@@ -69,7 +55,7 @@ def fetch_properties(lat, lng, offset=0):
     return response.json()
 
 def main():
-    client = setup_bigquery()
+    warehouse = setup_warehouse()
     pull_timestamp = datetime.now(timezone.utc).isoformat()
     inserted_ids = set()
     
@@ -96,7 +82,7 @@ def main():
                         market_inserted_ids.add(prop_id)
                 
                 if new_props:
-                    errors = client.insert_rows_json(Config.TABLE_ID, new_props)
+                    errors = warehouse.append(Config.TABLE_ID, new_props)
                     if errors:
                         print(f"Errors while inserting batch at offset {offset}: {errors}")
                 
@@ -1,14 +1,21 @@
 import json
+import os
 import requests
-import csv
 from datetime import datetime, timezone
 
+from warehouse.warehouse import DuckDBWarehouse, RAW_SCHEMA
+
 # Configuration
 class Config:
     API_BASE_URL = "https://www.invitationhomes.com/property/api/geo-search"
     DELTA_LAT = 12.5
     DELTA_LONG = 29.1
-    CSV_PATH = 'src/invh/invh.csv'
+    
+    # Local DuckDB configuration, same table id as production
+    DUCKDB_PATH = os.environ.get('DUCKDB_PATH', 'local.duckdb')
+    PROJECT_ID = 'homevest-data'
+    DATASET_ID = 'sfr_rental_listings'
+    TABLE_ID = f'{PROJECT_ID}.{DATASET_ID}.invh_raw'
     
     API_PARAMS = {
         'baths_min': 1,
@@ -26,12 +33,11 @@ class Config:
         'US': (36.8904, -95.9673),
     }
 
-def setup_csv():
-    """Initialize CSV file with headers"""
-    fieldnames = ['property_id', 'pull_timestamp', 'data']
-    with open(Config.CSV_PATH, 'w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+def setup_warehouse():
+    """Initialize the local DuckDB table if it doesn't exist"""
+    warehouse = DuckDBWarehouse(Config.DUCKDB_PATH)
+    warehouse.setup_table(Config.TABLE_ID, RAW_SCHEMA)
+    return warehouse
 
 def fetch_properties(lat, lng, offset=0):
     """Fetch properties from API for given coordinates"""
@@ -51,7 +57,7 @@ def fetch_properties(lat, lng, offset=0):
     return response.json()
 
 def main():
-    setup_csv()
+    warehouse = setup_warehouse()
     pull_timestamp = datetime.now(timezone.utc).isoformat()
     inserted_ids = set()
     
@@ -78,9 +84,9 @@ def main():
                         market_inserted_ids.add(prop_id)
                 
                 if new_props:
-                    with open(Config.CSV_PATH, 'a', newline='') as csvfile:
-                        writer = csv.DictWriter(csvfile, fieldnames=['property_id', 'pull_timestamp', 'data'])
-                        writer.writerows(new_props)
+                    errors = warehouse.append(Config.TABLE_ID, new_props)
+                    if errors:
+                        print(f"Errors while inserting batch at offset {offset}: {errors}")
                 
                 print(f"Offset: {offset}, Total: {total}, Inserted: {len(new_props)}, Total Inserted: {len(inserted_ids)}")
 
@@ -97,6 +103,7 @@ def main():
     
     print()
     print(f"Total properties inserted: {len(inserted_ids)}")
+    print(f"DuckDB file saved at: {Config.DUCKDB_PATH}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import hashlib
 import json
+import sys
 from datetime import datetime
 import pytz
 
@@ -74,9 +75,8 @@ except NotFound:
     client.create_table(table)
     print(f"Table {table_id} created with JSON schema.")
 
-# Collect unique properties across all markets (dict keyed by unique ID)
-unique_properties = {}
-inserted_ids = set()  # Track inserted to avoid any re-inserts
+# Track only the IDs seen so far; payloads are released once serialized
+inserted_ids = set()
 
 # Add timestamp once, for consistency across the entire pull
 pull_timestamp = datetime.now(pytz.timezone('America/New_York')).isoformat()
@@ -130,20 +130,20 @@ for market, (lat, lng) in markets.items():
         new_props_to_insert = []
         for prop in props:
             prop_id = prop.get('property_id')
-            if prop_id and prop_id not in unique_properties:
+            dedupe_id = sys.intern(str(prop_id))  # Interned so repeated IDs share one string
+            if prop_id and dedupe_id not in inserted_ids:
                 prop['pull_timestamp'] = pull_timestamp  # Add to the data blob
                 # prop.pop('photos', None)  # Uncomment if needed
                 # prop.pop('terms', None)   # Uncomment if needed
-                unique_properties[prop_id] = prop
-                if prop_id not in inserted_ids:
-                    # Wrap for JSON column: extract key fields, stringify 'data' as JSON
-                    row = {
-                        "property_id": prop_id,
-                        "pull_timestamp": pull_timestamp,
-                        "data": json.dumps(prop)  # Convert dict to JSON string for the JSON column
-                    }
-                    new_props_to_insert.append(row)
-                    inserted_ids.add(prop_id)
+                # Wrap for JSON column: extract key fields, stringify 'data' as JSON
+                row = {
+                    "property_id": prop_id,
+                    "pull_timestamp": pull_timestamp,
+                    "data": json.dumps(prop)  # Convert dict to JSON string for the JSON column
+                }
+                new_props_to_insert.append(row)
+                inserted_ids.add(dedupe_id)
+        del props, data, response
         
         # Insert the new unique properties from this batch
         if new_props_to_insert:
@@ -154,11 +154,12 @@ for market, (lat, lng) in markets.items():
                 batch_size = len(new_props_to_insert)
                 total_inserted += batch_size
                 print(f"Successfully inserted {batch_size} new unique properties from offset {offset} (total inserted so far: {total_inserted})")
+        del new_props_to_insert
         
         if current_offset + current_count >= total or current_count == 0:
             break
         offset += current_limit  # Use the effective limit from response
     
-    print(f"Completed collection for {market} (total unique so far: {len(unique_properties)})")
+    print(f"Completed collection for {market} (total unique so far: {len(inserted_ids)})")
 
 print(f"Successfully inserted a total of {total_inserted} unique properties to {table_id}")
\ No newline at end of file
@@ -1,12 +1,14 @@
+import itertools
 import json
+import sys
 from datetime import datetime, timezone
 import time
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 
+from warehouse.warehouse import BigQueryWarehouse, RAW_SCHEMA
+
 class Config:
     # API and website configuration
     API_BASE_URL = "https://rentprogress.com/bin/progress-residential/property-search.state-{state}.page-1.rows-10000.nr-1.json"
@@ -24,6 +26,8 @@ class Config:
     PROJECT_ID = 'homevest-data'
     DATASET_ID = 'sfr_rental_listings'
     TABLE_ID = f'{PROJECT_ID}.{DATASET_ID}.progress_raw_test'
+    # Rows serialized and inserted at a time, so a state's rows are never all held at once
+    INSERT_BATCH_SIZE = 500
     
     # Selenium configuration
     CHROME_OPTIONS = [
@@ -32,25 +36,11 @@ class Config:
         "user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36"
     ]
 
-def setup_bigquery():
-    """Initialize BigQuery table if it doesn't exist"""
-    client = bigquery.Client(project=Config.PROJECT_ID)
-    schema = [
-        bigquery.SchemaField("property_id", "STRING", mode="NULLABLE"),
-        bigquery.SchemaField("pull_timestamp", "STRING", mode="NULLABLE"),
-        bigquery.SchemaField("data", "JSON", mode="NULLABLE"),
-    ]
-
-    try:
-        client.get_table(Config.TABLE_ID)
-        print(f"Table {Config.TABLE_ID} already exists.")
-    except NotFound:
-        print(f"Creating table {Config.TABLE_ID} with JSON schema...")
-        table = bigquery.Table(Config.TABLE_ID, schema=schema)
-        client.create_table(table)
-        print(f"Table {Config.TABLE_ID} created with JSON schema.")
-    
-    return client
+def setup_warehouse():
+    """Initialize the warehouse table if it doesn't exist"""
+    warehouse = BigQueryWarehouse(project=Config.PROJECT_ID)
+    warehouse.setup_table(Config.TABLE_ID, RAW_SCHEMA)
+    return warehouse
 
 def setup_selenium():
     """Initialize Selenium WebDriver with proper configuration"""
@@ -94,46 +84,54 @@ def fetch_properties(driver, state_abbr, is_first_request=False):
         print(f"Error for state {state_abbr}: {e}")
         return [], 0
 
+def insert_state(warehouse, driver, state_abbr, pull_timestamp, seen_ids, is_first_request=False):
+    """Fetch a state's properties and insert the ones not seen earlier in the run, a batch at a time; the fetched
+    properties are released when this returns. Returns the number of rows inserted"""
+    props, count = fetch_properties(driver, state_abbr, is_first_request=is_first_request)
+    print(f"Fetched for state {state_abbr}: got {len(props)} properties, total available: {count}")
+
+    inserted = 0
+    for batch in itertools.batched(iter_new_rows(props, pull_timestamp, seen_ids), Config.INSERT_BATCH_SIZE):
+        errors = warehouse.append(Config.TABLE_ID, list(batch))
+        if errors:
+            print(f"Encountered errors while inserting batch for state {state_abbr}: {errors}")
+        else:
+            inserted += len(batch)
+    return inserted
+
+def iter_new_rows(props, pull_timestamp, seen_ids):
+    """Yield serialized rows for properties not seen earlier in the run, keeping only their IDs"""
+    for prop in props:
+        prop_id = prop.get('propertyId')
+        if not prop_id:
+            continue
+        key = sys.intern(str(prop_id))
+        if key in seen_ids:
+            continue
+        seen_ids.add(key)
+        yield {
+            "property_id": prop_id,
+            "pull_timestamp": pull_timestamp,
+            "data": json.dumps(prop)
+        }
+
 def main():
-    client = setup_bigquery()
+    warehouse = setup_warehouse()
     driver = setup_selenium()
     
     pull_timestamp = datetime.now(timezone.utc).isoformat()
-    unique_properties = {}
-    inserted_ids = set()
+    seen_ids = set()
     total_inserted = 0
     
     try:
         for i, state_abbr in enumerate(Config.STATES):
-            props, count = fetch_properties(driver, state_abbr, is_first_request=(i==0))
-            current_count = len(props)
-            print(f"Fetched for state {state_abbr}: got {current_count} properties, total available: {count}")
-            
-            new_props_to_insert = []
-            for prop in props:
-                prop_id = prop.get('propertyId')
-                if prop_id and prop_id not in unique_properties:
-                    unique_properties[prop_id] = prop
-                    if prop_id not in inserted_ids:
-                        row = {
-                            "property_id": prop_id,
-                            "pull_timestamp": pull_timestamp,
-                            "data": json.dumps(prop)
-                        }
-                        new_props_to_insert.append(row)
-                        inserted_ids.add(prop_id)
-            
-            if new_props_to_insert:
-                errors = client.insert_rows_json(Config.TABLE_ID, new_props_to_insert)
-                if errors:
-                    print(f"Encountered errors while inserting batch for state {state_abbr}: {errors}")
-                else:
-                    batch_size = len(new_props_to_insert)
-                    total_inserted += batch_size
-                    print(f"Successfully inserted {batch_size} new unique properties for state {state_abbr} "
-                          f"(total inserted so far: {total_inserted})")
+            inserted = insert_state(warehouse, driver, state_abbr, pull_timestamp, seen_ids, is_first_request=(i==0))
+            if inserted:
+                total_inserted += inserted
+                print(f"Successfully inserted {inserted} new unique properties for state {state_abbr} "
+                      f"(total inserted so far: {total_inserted})")
             
-            print(f"Completed collection for state {state_abbr} (total unique so far: {len(unique_properties)})")
+            print(f"Completed collection for state {state_abbr} (total unique so far: {len(seen_ids)})")
     
     finally:
         driver.quit()
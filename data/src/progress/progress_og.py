@@ -1,4 +1,5 @@
 import json
+import sys
 from datetime import datetime, timezone
 import time
 from google.cloud import bigquery
@@ -59,9 +60,8 @@ try:
 except Exception as e:
     print(f"Error visiting main page: {e}")
 
-# Collect unique properties across all states (dict keyed by unique ID)
-unique_properties = {}
-inserted_ids = set()  # Track inserted to avoid any re-inserts
+# Track only the IDs seen so far; payloads are released once serialized
+inserted_ids = set()
 
 # Add timestamp once, for consistency across the entire pull
 pull_timestamp = datetime.now(timezone.utc).isoformat()
@@ -98,17 +98,17 @@ for state_abbr in states:
     new_props_to_insert = []
     for prop in props:
         prop_id = prop.get('propertyId')
-        if prop_id and prop_id not in unique_properties:
-            unique_properties[prop_id] = prop
-            if prop_id not in inserted_ids:
-                # Wrap for JSON column: extract key fields, stringify 'data' as JSON
-                row = {
-                    "property_id": prop_id,
-                    "pull_timestamp": pull_timestamp,
-                    "data": json.dumps(prop)  # Convert dict to JSON string for the JSON column
-                }
-                new_props_to_insert.append(row)
-                inserted_ids.add(prop_id)
+        dedupe_id = sys.intern(str(prop_id))  # Interned so repeated IDs share one string
+        if prop_id and dedupe_id not in inserted_ids:
+            # Wrap for JSON column: extract key fields, stringify 'data' as JSON
+            row = {
+                "property_id": prop_id,
+                "pull_timestamp": pull_timestamp,
+                "data": json.dumps(prop)  # Convert dict to JSON string for the JSON column
+            }
+            new_props_to_insert.append(row)
+            inserted_ids.add(dedupe_id)
+    del props, data, body
     
     # Insert the new unique properties from this batch
     if new_props_to_insert:
@@ -119,8 +119,9 @@ for state_abbr in states:
             batch_size = len(new_props_to_insert)
             total_inserted += batch_size
             print(f"Successfully inserted {batch_size} new unique properties for state {state_abbr} (total inserted so far: {total_inserted})")
+    del new_props_to_insert
     
-    print(f"Completed collection for state {state_abbr} (total unique so far: {len(unique_properties)})")
+    print(f"Completed collection for state {state_abbr} (total unique so far: {len(inserted_ids)})")
 
 driver.quit()
 
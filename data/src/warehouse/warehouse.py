@@ -0,0 +1,262 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+
+import pyarrow as pa
+
+# The authoritative copy is data/src/warehouse/warehouse.py. Each dashboard app keeps an identical copy since it is
+# deployed on its own, so change that one and copy it over the others
+
+# Query results saved by query_df(cache=True), reused while their tables are unchanged; mount a volume here to
+# keep them across container restarts
+QUERY_CACHE_DIR = os.environ.get("QUERY_CACHE_DIR", ".cache/queries")
+
+# `project.dataset.table` reference in a query
+_TABLE_ID = re.compile(r"`([\w-]+\.)?([\w-]+)\.([\w-]+)`")
+
+# Column schema for the raw listings tables (name, BigQuery type)
+RAW_SCHEMA = [
+    ("property_id", "STRING"),
+    ("pull_timestamp", "STRING"),
+    ("data", "JSON"),
+]
+
+
+class Warehouse(ABC):
+    """Table setup, bulk append and query-to-Arrow over a SQL warehouse"""
+
+    @abstractmethod
+    def setup_table(self, table_id, schema):
+        """Create the table if it doesn't exist"""
+
+    @abstractmethod
+    def append(self, table_id, rows):
+        """Append a batch of row dicts and return a list of errors"""
+
+    @abstractmethod
+    def query_arrow(self, query, params=None):
+        """Run a query and return the result as a pyarrow Table"""
+
+    def table_version(self, table_id):
+        """Cheap marker that changes whenever the table's data does, or None if the table can't be tracked"""
+        return None
+
+    def query_df(self, query, params=None, cache=False):
+        """Run a query and return a DataFrame with Arrow-backed strings and pd.read_gbq dtypes otherwise
+
+        With cache, the result is saved to QUERY_CACHE_DIR and read back from there while every table the query
+        reads has the same version, so only the table metadata is fetched.
+        """
+        return arrow_to_df(self.cached_query_arrow(query, params) if cache else self.query_arrow(query, params))
+
+    def cached_query_arrow(self, query, params=None):
+        table_ids = _table_ids(query)
+        versions = [self.table_version(table_id) for table_id in table_ids]
+        if not table_ids or None in versions:
+            return self.query_arrow(query, params)
+
+        key = hashlib.sha256(json.dumps([query, params or {}], sort_keys=True, default=str).encode()).hexdigest()
+        path = os.path.join(QUERY_CACHE_DIR, f"{key}.arrow")
+        version = json.dumps(dict(zip(table_ids, versions)), sort_keys=True)
+        table = _read_cached_result(path, version)
+        if table is None:
+            table = self.query_arrow(query, params)
+            _write_cached_result(path, table, version)
+        return table
+
+
+class BigQueryWarehouse(Warehouse):
+    def __init__(self, project=None, credentials=None):
+        from google.cloud import bigquery
+        from google.cloud import bigquery_storage
+
+        self.client = bigquery.Client(project=project, credentials=credentials)
+        # Storage Read API client, downloads results as Arrow record batches over parallel streams
+        self.read_client = bigquery_storage.BigQueryReadClient(credentials=credentials)
+
+    def setup_table(self, table_id, schema):
+        from google.cloud import bigquery
+        from google.cloud.exceptions import NotFound
+
+        try:
+            self.client.get_table(table_id)
+            print(f"Table {table_id} already exists.")
+        except NotFound:
+            print(f"Creating table {table_id} with JSON schema...")
+            table = bigquery.Table(table_id, schema=[
+                bigquery.SchemaField(name, field_type, mode="NULLABLE") for name, field_type in schema
+            ])
+            self.client.create_table(table)
+            print(f"Table {table_id} created with JSON schema.")
+
+    def append(self, table_id, rows):
+        return self.client.insert_rows_json(table_id, rows)
+
+    def table_version(self, table_id):
+        table = self.client.get_table(table_id)
+        # Views and rows still in the streaming buffer change without moving the modified time
+        if table.table_type != "TABLE" or table.streaming_buffer is not None:
+            return None
+        return table.modified.isoformat()
+
+    def query_arrow(self, query, params=None):
+        from google.cloud import bigquery
+
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter(name, _bigquery_type(value), value)
+            for name, value in (params or {}).items()
+        ])
+        rows = self.client.query(query, job_config=job_config).result()
+        # Results with ORDER BY are read over a single stream; sort client-side for large results
+        return rows.to_arrow(bqstorage_client=self.read_client)
+
+
+class DuckDBWarehouse(Warehouse):
+    """Local warehouse in a single DuckDB file, addressed with BigQuery table ids"""
+
+    # BigQuery functions and types used by our queries that DuckDB spells differently
+    MACROS = [
+        "CREATE TEMP MACRO format_timestamp(fmt, ts) AS strftime(ts, fmt)",
+        "CREATE TEMP MACRO json_query(j, path) AS json_extract(j, path)",
+        "CREATE TEMP MACRO json_value(j, path) AS json_extract_string(j, path)",
+        "CREATE TEMP MACRO to_json_string(j) AS CAST(j AS VARCHAR)",
+        # TIMESTAMP( is a type keyword in DuckDB, so _to_duckdb_sql renames the function to this
+        "CREATE TEMP MACRO parse_timestamp(s) AS CAST(s AS TIMESTAMPTZ)",
+        "CREATE TEMP TYPE FLOAT64 AS DOUBLE",
+    ]
+    TYPES = {
+        "STRING": "VARCHAR",
+        "JSON": "JSON",
+        "INT64": "BIGINT",
+        "FLOAT64": "DOUBLE",
+        "BOOL": "BOOLEAN",
+        "DATE": "DATE",
+        "TIMESTAMP": "TIMESTAMPTZ",
+    }
+
+    def __init__(self, path, read_only=False):
+        import duckdb
+
+        self.path = path
+        self.conn = duckdb.connect(path, read_only=read_only)
+
+    def cursor(self):
+        """New cursor on the shared connection, safe to use from another thread"""
+        cursor = self.conn.cursor()
+        for macro in self.MACROS:
+            cursor.execute(macro)
+        return cursor
+
+    def setup_table(self, table_id, schema):
+        dataset, table = _split_table_id(table_id)
+        columns = ", ".join(f'"{name}" {self.TYPES[field_type]}' for name, field_type in schema)
+        with self.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{dataset}"')
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS "{dataset}"."{table}" ({columns})')
+        print(f"Table {table_id} ready in DuckDB.")
+
+    def append(self, table_id, rows):
+        dataset, table = _split_table_id(table_id)
+        with self.cursor() as cursor:
+            cursor.register("_append_rows", pa.Table.from_pylist(rows))
+            cursor.execute(f'INSERT INTO "{dataset}"."{table}" BY NAME SELECT * FROM _append_rows')
+        return []
+
+    def table_version(self, table_id):
+        # Tables share one file, so any write to the file changes every table's version
+        if not os.path.exists(self.path):
+            return None
+        wal_path = f"{self.path}.wal"
+        return f"{os.path.getmtime(self.path)}:{os.path.getmtime(wal_path) if os.path.exists(wal_path) else 0}"
+
+    def query_arrow(self, query, params=None):
+        with self.cursor() as cursor:
+            return cursor.execute(_to_duckdb_sql(query), params or {}).fetch_record_batch().read_all()
+
+
+def arrow_to_df(table):
+    """Convert a pyarrow Table with the same dtypes as query_df"""
+    # Release Arrow buffers column by column as they are converted
+    return table.to_pandas(types_mapper=_pandas_dtype, split_blocks=True, self_destruct=True)
+
+
+def _read_cached_result(path, version):
+    """The result saved at path if it was saved with version, else None"""
+    try:
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            if (reader.schema.metadata or {}).get(b"table_versions") != version.encode():
+                return None
+            return reader.read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def _write_cached_result(path, table, version):
+    """Save a result with its table versions, replacing the old file in one step so readers never see half of it"""
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"table_versions": version.encode()})
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with pa.OSFile(temp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temp_path, path)
+    except OSError as error:
+        print(f"Could not save query result to {path}: {error}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _table_ids(query):
+    """Every `project.dataset.table` the query reads"""
+    return sorted({match.group(0).strip("`") for match in _TABLE_ID.finditer(query)})
+
+
+def _split_table_id(table_id):
+    """'project.dataset.table' -> ('dataset', 'table')"""
+    return tuple(table_id.strip("`").split(".")[-2:])
+
+
+def _to_duckdb_sql(query):
+    """Rewrite `project.dataset.table` references, @params, SAFE_CAST and TIMESTAMP() for DuckDB"""
+    query = _TABLE_ID.sub(lambda match: f'"{match.group(2)}"."{match.group(3)}"', query)
+    query = re.sub(r"\bSAFE_CAST\(", "TRY_CAST(", query)
+    query = re.sub(r"\bTIMESTAMP\(", "parse_timestamp(", query)
+    return re.sub(r"@(\w+)", r"$\1", query)
+
+
+def _pandas_dtype(arrow_type):
+    import db_dtypes
+    import numpy as np
+    import pandas as pd
+
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        # Missing values are NaN, so comparisons still give plain boolean masks
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    if pa.types.is_date32(arrow_type):
+        return db_dtypes.DateDtype()
+    if pa.types.is_time64(arrow_type):
+        return db_dtypes.TimeDtype()
+    if pa.types.is_int64(arrow_type):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    return None
+
+
+def _bigquery_type(value):
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime.datetime):
+        return "TIMESTAMP"
+    if isinstance(value, datetime.date):
+        return "DATE"
+    return "STRING"